@@ -0,0 +1,448 @@
+"""
+Webots .motion 文件 (#WEBOTS_MOTION,V1.0) 的解析、校验、时长表和动作衔接点计算, 各 Player 和 sim2d 共用。
+关键帧读成 numpy 数组 (times: 每帧秒数, values: 帧数 × 关节数)。
+
+文件格式: 第一行 "#WEBOTS_MOTION,V1.0,关节1,关节2,...",
+之后每行一个关键帧 "mm:ss:mmm,姿态名,值1,值2,..." (值为 "*" 表示该关节这一帧不控制)。
+
+衔接 (chaining): 一个移动动作播完时如果下一个还是移动动作, 不从第 0 帧重新起步,
+而是从下一个动作里与当前姿态最接近的早期关键帧接着播 (同一个动作就是步态循环的起点)。
+
+抢占 (preemption): 移动动作播放中来了踢球 / STOP, 不等整段播完, 在下一个安全帧 (双脚支撑) 就切过去。
+双脚支撑按两腿膝关节角几乎相同判断 (单脚支撑时摆动腿会明显屈膝)。
+移动动作之间也可以抢占 (PREEMPT_LOCO), 但只在下一个动作里有和当前姿态对得上的关键帧时。
+
+动作索引: 每个动作目录下缓存一份 .motion_index.json (名字、时长、关节、是否循环、校验出的问题),
+文件的 mtime / 大小没变就直接用, 不用每次启动都解析全部动作文件; LazyMotions 第一次用到某个动作才创建 Motion。
+Player 的动作时长都从这里来 (duration_table), 不再手写估计值。
+
+校验: 关节名和角度范围对照 defendertest/utils/kinematics_constants.py 的上下限,
+关节速度 (相邻关键帧) 对照 NAO 电机的最大速度 MAX_VELOCITY (tools/motion_compiler.py 生成变速动作时用)。
+write_motion 按同样的格式写回 (create_stand_file 和 motion_compiler 的输出)。
+命令行: python controllers/common/motion_file.py 目录或文件... 打印时长表和问题。
+"""
+import importlib.util
+import json
+import os
+import sys
+
+import numpy as np
+
+ENTRY_WINDOW = 1.0   # 只在动作开头这么多秒里找衔接帧 (起步过渡段)，更靠后的帧会跳过整步
+ENTRY_TOL = 0.05     # 衔接帧与上一个动作末帧的关节角最大差 (rad)，超过就从头播
+SAFE_TOL = 0.03      # 左右膝关节角差小于此值 (rad) 的关键帧算双脚支撑，可以在这一帧抢占
+SAFE_JOINTS = ("LKneePitch", "RKneePitch")
+
+INDEX_FILE = ".motion_index.json"
+INDEX_VERSION = 2
+LOOP_SUFFIX = "Loop"  # 文件名以 Loop 结尾的动作循环播放 (MotionLibrary 的约定)
+
+KINEMATICS_CONSTANTS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    "..", "defendertest", "utils", "kinematics_constants.py")
+# 超出上下限这么多 (rad) 才算问题: kinematics_constants 的肘关节上下限是 ±0.0349, 而自带动作里肘关节都是 0
+LIMIT_TOL = 0.04
+# kinematics_constants 里没有上下限、但确实是 NAO 的关节 (手指)
+UNLIMITED_JOINTS = tuple(f"{side}Phalanx{i}" for side in "LR" for i in range(1, 9))
+
+# NAO 各关节电机的最大速度 (rad/s, Webots Nao.proto 的 maxVelocity)，键是去掉 L / R 的关节名
+MAX_VELOCITY = {
+    "HeadYaw": 8.26797, "HeadPitch": 7.19407,
+    "ShoulderPitch": 8.26797, "ShoulderRoll": 7.19407, "ElbowYaw": 8.26797, "ElbowRoll": 7.19407,
+    "WristYaw": 24.6229, "Hand": 8.33,
+    "HipYawPitch": 4.16174, "HipRoll": 4.16174, "HipPitch": 6.40239,
+    "KneePitch": 6.40239, "AnklePitch": 6.40239, "AnkleRoll": 4.16174,
+}
+
+# NAO_LOCO_PREEMPT 取值
+PREEMPT_OFF = 0      # 不抢占, 新指令等当前动作整段播完
+PREEMPT_ATOMIC = 1   # 只为非移动指令 (踢球 / STOP) 抢占
+PREEMPT_LOCO = 2     # 换别的移动动作也抢占 (姿态对得上时)
+
+
+def parse_time(stamp):
+    """"mm:ss:mmm" -> 秒"""
+    mm, ss, ms = stamp.split(":")
+    return int(mm) * 60 + int(ss) + int(ms) / 1000.0
+
+
+def format_time(t):
+    """秒 -> "mm:ss:mmm" 字符串"""
+    ms = int(round(t * 1000))
+    return f"{ms // 60000:02d}:{ms // 1000 % 60:02d}:{ms % 1000:03d}"
+
+
+class MotionClip:
+    """
+    一个 .motion 文件: joints 关节名, times 每帧时间 (秒, 形状 (帧数,)),
+    values 每帧关节角 (形状 (帧数, 关节数), 这一帧不控制的关节是 NaN), poses 每帧的姿态名,
+    problems 解析时发现的格式问题。
+    """
+
+    def __init__(self, name, joints, times, values, problems=(), poses=None):
+        self.name = name
+        self.joints = list(joints)
+        self.times = np.asarray(times, dtype=float)
+        self.values = np.asarray(values, dtype=float).reshape(len(self.times), len(self.joints))
+        self.col = {j: i for i, j in enumerate(self.joints)}
+        self.problems = list(problems)
+        self.poses = list(poses) if poses is not None else [f"Pose{i + 1}" for i in range(len(self.times))]
+
+    @property
+    def duration(self):
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def pose(self, i):
+        """第 i 帧的 {关节: 角度} (不控制的关节不出现)"""
+        return {j: float(v) for j, v in zip(self.joints, self.values[i]) if v == v}
+
+    def final_pose(self):
+        return self.pose(-1) if len(self.times) else {}
+
+    def frame_at(self, t):
+        """离 t 秒最近的关键帧下标"""
+        i = int(np.searchsorted(self.times, t))
+        if i > 0 and (i == len(self.times) or t - self.times[i - 1] <= self.times[i] - t): i -= 1
+        return i
+
+    def safe_frames(self, tol=SAFE_TOL):
+        """每个关键帧是否双脚支撑 (没有膝关节数据的动作全部不安全)"""
+        lk, rk = SAFE_JOINTS
+        if lk not in self.col or rk not in self.col: return np.zeros(len(self.times), dtype=bool)
+        return np.abs(self.values[:, self.col[lk]] - self.values[:, self.col[rk]]) < tol
+
+    def match_time(self, pose, window=ENTRY_WINDOW, tol=ENTRY_TOL):
+        """
+        开头 window 秒内与姿态 pose 最接近 (共同关节的最大角差) 的关键帧时间 (秒),
+        差值超过 tol 或没有共同关节就返回 None。
+        """
+        common = [j for j in pose if j in self.col]
+        n = int(np.searchsorted(self.times, window, side="right"))
+        if not common or not n: return None
+        d = np.abs(self.values[:n, [self.col[j] for j in common]] - np.array([pose[j] for j in common]))
+        d = np.where(np.isnan(d), -np.inf, d).max(axis=1) # 这一帧不控制的关节不算
+        d[d == -np.inf] = np.inf
+        i = int(np.argmin(d))
+        return float(self.times[i]) if d[i] < tol else None
+
+    def entry_time(self, pose, window=ENTRY_WINDOW, tol=ENTRY_TOL):
+        """从姿态 pose 接着播本动作时的起点 (秒)，没有对得上的关键帧就是 0 (从头播)"""
+        t = self.match_time(pose, window, tol)
+        return 0.0 if t is None else t
+
+
+def load_motion(path):
+    """
+    解析 .motion 文件。不是 motion 文件或没有关键帧时抛 ValueError；
+    某一行的值个数和关节数对不上、时间倒退之类的问题记在 problems 里 (值补 NaN / 截断)。
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    with open(path) as f:
+        lines = f.read().splitlines()
+    if not lines or not lines[0].startswith("#WEBOTS_MOTION"):
+        raise ValueError(f"{path}: not a Webots motion file")
+    joints = lines[0].strip().split(",")[2:]
+    n = len(joints)
+    times, rows, poses, problems = [], [], [], []
+    for k, ln in enumerate(lines[1:], 2):
+        ln = ln.strip()
+        if not ln[:1].isdigit(): continue
+        cols = ln.split(",")
+        t = parse_time(cols[0])
+        if times and t < times[-1]: problems.append(f"line {k}: time {cols[0]} goes backwards")
+        vals = [float(v) if v not in ("*", "") else np.nan for v in cols[2:]]
+        if len(vals) != n:
+            problems.append(f"line {k}: {len(vals)} values for {n} joints")
+            vals = (vals + [np.nan] * n)[:n]
+        times.append(t)
+        rows.append(vals)
+        poses.append(cols[1] if len(cols) > 1 else "")
+    if not times:
+        raise ValueError(f"{path}: no keyframes")
+    return MotionClip(name, joints, times, rows, problems, poses)
+
+
+def format_value(v):
+    """关节角 -> 文件里的写法 (最多 4 位小数，不控制的写 "*")"""
+    if v != v: return "*"
+    s = f"{v:.4f}".rstrip("0").rstrip(".")
+    return "0" if s in ("-0", "") else s
+
+
+def write_motion(path, clip):
+    """按 #WEBOTS_MOTION,V1.0 格式写出 clip (每行 "mm:ss:mmm,姿态名,值...")"""
+    lines = ["#WEBOTS_MOTION,V1.0," + ",".join(clip.joints)]
+    for t, pose, row in zip(clip.times, clip.poses, clip.values):
+        lines.append(",".join([format_time(t), pose] + [format_value(v) for v in row]))
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def max_velocity(joint):
+    """关节的最大速度 (rad/s)，不认识的关节返回 None (不检查)"""
+    return MAX_VELOCITY.get(joint[1:] if joint[:1] in "LR" and joint[1:] in MAX_VELOCITY else joint)
+
+
+def velocity_usage(clip):
+    """
+    每个关节相邻关键帧之间需要的最大角速度占电机最大速度的比例 {关节: (比例, 出现的时间 秒)}，
+    >1 表示电机跟不上。这一帧不控制的关节跳过 (和前后控制它的帧比)。
+    """
+    usage = {}
+    for i, j in enumerate(clip.joints):
+        vmax = max_velocity(j)
+        if vmax is None: continue
+        v = clip.values[:, i]
+        ok = ~np.isnan(v)
+        t, v = clip.times[ok], v[ok]
+        if len(t) < 2: continue
+        dt = np.diff(t)
+        w = np.where(dt > 0, np.abs(np.diff(v)) / np.where(dt > 0, dt, 1.0), np.where(np.diff(v) != 0, np.inf, 0.0))
+        k = int(np.argmax(w))
+        usage[j] = (float(w[k] / vmax), float(t[k + 1]))
+    return usage
+
+
+_limits = None
+
+def joint_limits(path=KINEMATICS_CONSTANTS):
+    """kinematics_constants.py 里的 {关节: (下限, 上限)}，读不到返回 {} (不校验范围)"""
+    global _limits
+    if _limits is None or path != KINEMATICS_CONSTANTS:
+        try:
+            spec = importlib.util.spec_from_file_location("kinematics_constants", path)
+            mod = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(mod)
+            names = vars(mod)
+            limits = {k[:-4]: (names[k[:-4] + "Low"], v) for k, v in names.items()
+                      if k.endswith("High") and k[:-4] + "Low" in names}
+        except (OSError, ImportError, SyntaxError):
+            limits = {}
+        if path != KINEMATICS_CONSTANTS: return limits
+        _limits = limits
+    return _limits
+
+
+def validate(clip, limits=None, tol=LIMIT_TOL):
+    """格式问题 + 不认识的关节名 + 超出上下限的关节角，返回问题描述列表 (空 = 没问题)"""
+    limits = joint_limits() if limits is None else limits
+    problems = list(clip.problems)
+    if not limits: return problems
+    for i, j in enumerate(clip.joints):
+        if j not in limits:
+            if j not in UNLIMITED_JOINTS: problems.append(f"unknown joint {j}")
+            continue
+        lo, hi = limits[j]
+        v = clip.values[:, i]
+        bad = (v < lo - tol) | (v > hi + tol)
+        if bad.any():
+            k = int(np.argmax(bad))
+            problems.append(f"{j} outside [{lo:g}, {hi:g}] in {int(bad.sum())} frames "
+                            f"(first at {clip.times[k]:.2f}s: {v[k]:.3f})")
+    return problems
+
+
+def clip_info(path):
+    """索引条目: {"duration", "joints", "loop", "frames", "problems"}"""
+    clip = load_motion(path)
+    return {"duration": clip.duration, "joints": clip.joints, "loop": clip.name.endswith(LOOP_SUFFIX),
+            "frames": len(clip.times), "problems": validate(clip)}
+
+
+def load_index(motion_dir, write=True):
+    """
+    动作目录的索引 {名字: {"file", "duration", "joints", "loop", "frames", "problems", "mtime", "size"}}。
+    缓存文件里 mtime / 大小对得上的条目直接用，其余重新解析；有变化时写回缓存 (写不了就算了)。
+    不是 motion 文件的不在索引里。
+    """
+    try:
+        files = sorted(fn for fn in os.listdir(motion_dir) if fn.endswith(".motion"))
+    except OSError:
+        return {}
+    cache_path = os.path.join(motion_dir, INDEX_FILE)
+    try:
+        with open(cache_path) as f: data = json.load(f)
+        cached = data["motions"] if data.get("version") == INDEX_VERSION else {}
+    except (OSError, ValueError, KeyError, AttributeError):
+        cached = {}
+    index, dirty = {}, len(cached) != len(files)
+    for fn in files:
+        name = os.path.splitext(fn)[0]
+        try:
+            st = os.stat(os.path.join(motion_dir, fn))
+        except OSError:
+            dirty = True
+            continue
+        e = cached.get(name)
+        if e and e.get("file") == fn and e.get("mtime") == st.st_mtime_ns and e.get("size") == st.st_size:
+            index[name] = e
+            continue
+        dirty = True
+        try:
+            info = clip_info(os.path.join(motion_dir, fn))
+        except (OSError, ValueError):
+            continue
+        index[name] = dict(info, file=fn, mtime=st.st_mtime_ns, size=st.st_size)
+    if dirty and write:
+        # 几个 Player 同时启动: 先写临时文件再改名，不会读到写了一半的缓存
+        tmp = f"{cache_path}.{os.getpid()}"
+        try:
+            with open(tmp, "w") as f: json.dump({"version": INDEX_VERSION, "motions": index}, f)
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    return index
+
+
+def duration_table(motion_dir, files=None, index=None):
+    """
+    动作时长表 (秒, 取最后一个关键帧): files 为 {键: 动作文件名 (不含扩展名)} 时按键返回，否则按动作名。
+    目录里没有的动作不在表里。index: 已经读好的 load_index(motion_dir) (不给就现读)。
+    """
+    if index is None: index = load_index(motion_dir)
+    if files is None: return {name: e["duration"] for name, e in index.items()}
+    return {key: index[name]["duration"] for key, name in files.items() if name in index}
+
+
+def report_problems(tag, motion_dir, names, index=None):
+    """启动时打印用到的动作的校验问题 (index 同 duration_table)"""
+    if index is None: index = load_index(motion_dir)
+    for name in names:
+        for p in index.get(name, {}).get("problems", ()): print(f"[{tag}] motion {name}: {p}")
+
+
+class LazyMotions:
+    """
+    {键: 动作文件路径}，第一次 [键] 时才用 factory(路径) 创建 Motion (之后复用)，
+    setup(键, motion) 在创建后调用一次 (比如 setLoop)。in / len / 遍历只看键，不创建。
+    """
+
+    def __init__(self, paths, factory, setup=None):
+        self.paths = dict(paths)
+        self.factory = factory
+        self.setup = setup
+        self.cache = {}
+
+    def add(self, key, path):
+        self.paths[key] = path
+        self.cache.pop(key, None)
+
+    def __getitem__(self, key):
+        m = self.cache.get(key)
+        if m is None:
+            m = self.factory(self.paths[key])
+            if self.setup: self.setup(key, m)
+            self.cache[key] = m
+        return m
+
+    def get(self, key, default=None):
+        return self[key] if key in self.paths else default
+
+    def __contains__(self, key):
+        return key in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def keys(self):
+        return self.paths.keys()
+
+    def loaded(self):
+        """已经创建了的 Motion 个数"""
+        return len(self.cache)
+
+
+class ChainTable:
+    """
+    一组动作之间的衔接起点: entry(前一个, 下一个) -> 下一个动作从第几秒开始播。
+    clips: {指令: MotionClip}，读不到文件的指令不在表里 (衔接时从头播)。
+    """
+
+    def __init__(self, clips):
+        self.clips = clips
+        self.table = {}
+        for a, ca in clips.items():
+            end = ca.final_pose()
+            for b, cb in clips.items():
+                self.table[(a, b)] = cb.entry_time(end)
+        self.safe = {cmd: c.safe_frames() for cmd, c in clips.items()}
+        self._entry_at = {}
+
+    @classmethod
+    def from_files(cls, files, motion_dir):
+        """files: {指令: 动作文件名 (不含扩展名)}"""
+        clips = {}
+        for cmd, name in files.items():
+            try:
+                clips[cmd] = load_motion(os.path.join(motion_dir, name + ".motion"))
+            except (OSError, ValueError, IndexError):
+                pass
+        return cls(clips)
+
+    def entry(self, prev, nxt):
+        return self.table.get((prev, nxt), 0.0)
+
+    def loop_start(self, cmd):
+        """同一个动作连续播放时的循环起点 (步态循环开始的那一帧)"""
+        return self.entry(cmd, cmd)
+
+    def is_safe(self, cmd, t):
+        """动作 cmd 播到 t 秒时 (最近的关键帧) 能不能抢占"""
+        c = self.clips.get(cmd)
+        return c is not None and len(c.times) > 0 and bool(self.safe[cmd][c.frame_at(t)])
+
+    def entry_at(self, prev, t, nxt):
+        """prev 播到 t 秒时切到移动动作 nxt 的起播时间，姿态对不上返回 None"""
+        c = self.clips.get(prev)
+        if c is None or nxt not in self.clips: return None
+        key = (prev, c.frame_at(t), nxt)
+        if key not in self._entry_at:
+            self._entry_at[key] = self.clips[nxt].match_time(c.pose(key[1]))
+        return self._entry_at[key]
+
+    def preempt_entry(self, cur, t, nxt, mode):
+        """移动动作 cur 播到 t 秒时能否让位给 nxt: 不能返回 None，能返回 nxt 的起播时间"""
+        if mode == PREEMPT_OFF or not self.is_safe(cur, t): return None
+        if nxt not in self.clips: return 0.0 # 踢球 / STOP: 从头播
+        if mode < PREEMPT_LOCO: return None
+        return self.entry_at(cur, t, nxt)
+
+    def duration(self, cmd, default=None):
+        c = self.clips.get(cmd)
+        return c.duration if c else default
+
+
+def preempt_mode():
+    """NAO_LOCO_PREEMPT: 0 关闭，1 只为踢球 / STOP 抢占 (默认)，2 移动动作之间也抢占"""
+    try:
+        return min(max(int(os.environ.get("NAO_LOCO_PREEMPT", PREEMPT_ATOMIC)), PREEMPT_OFF), PREEMPT_LOCO)
+    except ValueError:
+        return PREEMPT_ATOMIC
+
+
+def chain_enabled():
+    """NAO_LOCO_CHAIN: 0 关闭移动动作衔接 (每个动作播完 + 缓冲后从头播)，默认开启"""
+    return os.environ.get("NAO_LOCO_CHAIN", "1").strip() != "0"
+
+
+def main(paths):
+    """打印动作目录 / 文件的时长表和校验问题，有问题时返回 1"""
+    bad = 0
+    for path in paths:
+        if os.path.isdir(path):
+            entries = sorted(load_index(path).items())
+        else:
+            name = os.path.splitext(os.path.basename(path))[0]
+            entries = [(name, dict(clip_info(path), file=os.path.basename(path)))]
+        for name, e in entries:
+            print(f"{name:<24} {e['duration']:7.3f}s {e['frames']:5d} frames {len(e['joints']):3d} joints"
+                  f"{'  loop' if e['loop'] else ''}")
+            for p in e["problems"]: print(f"    ! {p}")
+            bad += bool(e["problems"])
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,109 @@
+"""
+网络相关的公共配置与 socket 工具 (Supervisor 和所有 Player 共用)
+"""
+import os
+import socket
+import sys
+
+LOCAL_HOST = "127.0.0.1"
+
+# ================= 命名空间 =================
+# 同一台机器上并行跑多场比赛时, 每场一个命名空间编号 (0, 1, 2, ...):
+#   环境变量 NAO_NAMESPACE=N, 或 controllerArgs 里加一项 "--ns=N" (优先)
+# 所有端口整体偏移 N * NS_PORT_STRIDE, unix socket 路径和 shm 名字也带上编号。
+# 步长 20 保证各场的 Player 端口 / batch 端口 / Supervisor 端口互不重叠 (N < 95)。
+NS_PORT_STRIDE = 20
+MAX_NAMESPACE = 94
+
+
+def namespace_from(argv=None, env=None):
+    argv = sys.argv[1:] if argv is None else argv
+    env = os.environ if env is None else env
+    raw = env.get("NAO_NAMESPACE", "0")
+    for a in argv:
+        if a.startswith("--ns="): raw = a[len("--ns="):]
+    try:
+        ns = int(raw)
+    except ValueError:
+        return 0
+    return ns if 0 <= ns <= MAX_NAMESPACE else 0
+
+
+NAMESPACE = namespace_from()
+PORT_OFFSET = NAMESPACE * NS_PORT_STRIDE
+
+
+def tag(name):
+    """带命名空间的端点名 (用于 unix socket 文件名 / shm 段名)"""
+    return f"{NAMESPACE}_{name}" if NAMESPACE else name
+
+
+# 每个 Player 自己监听的端口 (收 Supervisor 命令)
+PORT = {rid: port + PORT_OFFSET for rid, port in {
+    "B1": 10001, "B2": 10002, "B3": 10003, "B4": 10004,
+    "R1": 10011, "R2": 10012, "R3": 10013, "R4": 10014,
+}.items()}
+# Supervisor 用来收 DONE/READY 的端口
+SUPERVISOR_PORT = 12000 + PORT_OFFSET
+
+# batch 模式: 所有机器人的指令合成一帧, 发到本机回环上的组播地址
+# (各命名空间共用组播地址, 靠端口区分)
+BATCH_GROUP = "239.255.43.1"
+BATCH_PORT = 10100 + PORT_OFFSET
+
+# Supervisor 的发送模式: "unicast" (每个机器人一个端口, 默认) 或 "batch"
+CMD_MODE_UNICAST = "unicast"
+CMD_MODE_BATCH = "batch"
+
+
+# 相同的移动指令只在变化时发送, 每 N 个 tick 补发一次保活 (0 = 关闭抑制, 每帧都发)
+DEFAULT_KEEPALIVE_TICKS = 8
+# Player 收到移动指令后保持执行的时长 = 保活周期 * 该系数 (允许丢一两个保活包)
+HOLD_FACTOR = 2.5
+
+
+def keepalive_ticks():
+    try:
+        return max(0, int(os.environ.get("NAO_KEEPALIVE_TICKS", DEFAULT_KEEPALIVE_TICKS)))
+    except ValueError:
+        return DEFAULT_KEEPALIVE_TICKS
+
+
+def hold_sec(time_step_ms):
+    """Player 端: 没有新包时继续执行上一条移动指令的最长时间 (秒)"""
+    return max(keepalive_ticks(), 1) * time_step_ms / 1000.0 * HOLD_FACTOR
+
+
+def cmd_mode():
+    mode = os.environ.get("NAO_CMD_MODE", CMD_MODE_UNICAST).strip().lower()
+    return mode if mode in (CMD_MODE_UNICAST, CMD_MODE_BATCH) else CMD_MODE_UNICAST
+
+
+def open_batch_sender():
+    """组播发送端: 只走回环网卡, 不出本机"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(LOCAL_HOST))
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 0)
+    return sock
+
+
+def open_batch_receiver():
+    """
+    组播接收端: 所有 Player 绑定同一个端口并加入组播组。
+    系统不支持回环组播时返回 None (此时只能用 unicast 模式)。
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", BATCH_PORT))
+        mreq = socket.inet_aton(BATCH_GROUP) + socket.inet_aton(LOCAL_HOST)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        sock.setblocking(False)
+        return sock
+    except OSError as e:
+        print(f"batch receiver unavailable: {e}")
+        sock.close()
+        return None
@@ -0,0 +1,183 @@
+"""
+Supervisor <-> Player 指令协议 (二进制 + JSON 兜底)
+
+二进制指令帧 (小端, 定长 16 字节):
+    magic(u8) | version(u8) | opcode(u8) | slot(u8) | seq(u32) | sim_time(f64)
+
+- magic 固定为 0xA5, JSON 帧总以 '{' 开头, 因此接收端看第一个字节即可区分两种格式。
+- seq 是每个机器人独立递增的序列号, 放在固定偏移处,
+  接收端可以只读 seq (peek_seq) 就丢弃过期包, 不必解析整个包体。
+- 版本协商: Player 在 READY 事件里带上 "proto" 字段 (自己支持的最高版本),
+  Supervisor 取双方较小值; 对方没带 (旧版本 Player) 就继续用 JSON。
+
+批量帧 (batch 模式, 一个 tick 所有机器人的指令合成一个数据报, 发到组播端口):
+    magic(u8) | version(u8) | 0xFF(u8) | count(u8) | tick(u32) | sim_time(f64)
+    + count * [ slot(u8) | opcode(u8) | seq(u32) ]
+每个 Player 按自己的 slot 取出对应条目, seq 仍然是该机器人自己的序列号。
+"""
+import json
+import struct
+from enum import IntEnum
+
+MAGIC = 0xA5
+PROTO_JSON = 0     # 旧的 JSON 格式
+PROTO_BINARY = 1   # 当前二进制格式版本
+PROTO_VERSION = PROTO_BINARY
+
+# 机器人 ID <-> 槽位 (slot) 映射, 顺序与 Supervisor 的 BLUE_DEFS + RED_DEFS 一致
+ROBOT_IDS = ["B1", "B2", "B3", "B4", "R1", "R2", "R3", "R4"]
+SLOT = {rid: i for i, rid in enumerate(ROBOT_IDS)}
+
+
+class Op(IntEnum):
+    STOP = 0
+    FWD = 1
+    BWD = 2
+    TURN_L = 3
+    TURN_R = 4
+    SIDE_L = 5
+    SIDE_R = 6
+    KICK_L = 7
+    KICK_R = 8
+    GETUP_FRONT = 9
+    GETUP_BACK = 10
+
+
+# 高位表示 INTERRUPT_ 前缀 (立即打断当前动作)
+INTERRUPT_FLAG = 0x80
+
+CMD_HEADER = struct.Struct("<BBBBId")
+SEQ_FIELD = struct.Struct("<I")
+SEQ_OFFSET = 4
+
+FRAME_BATCH = 0xFF                 # 批量帧占用 opcode 位置的标记
+BATCH_ENTRY = struct.Struct("<BBI")
+MAX_BATCH = 32
+
+# 指令字符串 <-> opcode 查找表 (启动时生成一次)
+CMD_TO_OP = {}
+for _op in Op:
+    CMD_TO_OP[_op.name] = int(_op)
+    CMD_TO_OP["INTERRUPT_" + _op.name] = int(_op) | INTERRUPT_FLAG
+OP_TO_CMD = {v: k for k, v in CMD_TO_OP.items()}
+
+
+def cmd_to_op(cmd):
+    """指令字符串 -> opcode, 未知指令按 STOP 处理"""
+    return CMD_TO_OP.get(cmd, int(Op.STOP))
+
+
+def op_to_cmd(op):
+    return OP_TO_CMD.get(op, "STOP")
+
+
+def is_binary(data):
+    return len(data) >= CMD_HEADER.size and data[0] == MAGIC
+
+
+def encode_cmd(seq, rid, cmd, t=0.0):
+    """打包一条二进制指令"""
+    return CMD_HEADER.pack(MAGIC, PROTO_BINARY, cmd_to_op(cmd), SLOT.get(rid, 0xFF), seq, t)
+
+
+def encode_cmd_json(seq, rid, cmd):
+    """旧格式 (JSON)，用于没有协商出二进制版本的 Player"""
+    return json.dumps({"seq": seq, "id": rid, "cmd": cmd}).encode("utf-8")
+
+
+class BatchEncoder:
+    """把一个 tick 内所有机器人的指令打包进同一个预分配的缓冲区"""
+
+    def __init__(self, capacity=len(ROBOT_IDS)):
+        self.capacity = min(capacity, MAX_BATCH)
+        self.buf = bytearray(CMD_HEADER.size + BATCH_ENTRY.size * self.capacity)
+        self.count = 0
+        self.tick = 0
+
+    def add(self, seq, rid, cmd):
+        if self.count >= self.capacity: return False
+        BATCH_ENTRY.pack_into(self.buf, CMD_HEADER.size + BATCH_ENTRY.size * self.count,
+                              SLOT.get(rid, 0xFF), cmd_to_op(cmd), seq)
+        self.count += 1
+        return True
+
+    def flush(self, t=0.0):
+        """封帧并返回数据报; 本 tick 没有指令时返回 None"""
+        if self.count == 0: return None
+        self.tick += 1
+        CMD_HEADER.pack_into(self.buf, 0, MAGIC, PROTO_BINARY, FRAME_BATCH, self.count, self.tick, t)
+        data = bytes(self.buf[:CMD_HEADER.size + BATCH_ENTRY.size * self.count])
+        self.count = 0
+        return data
+
+
+def is_batch(data):
+    return is_binary(data) and data[2] == FRAME_BATCH
+
+
+def find_batch_entry(data, slot):
+    """在批量帧中查找 slot 对应条目的偏移, 找不到返回 -1"""
+    n = min(data[3], (len(data) - CMD_HEADER.size) // BATCH_ENTRY.size)
+    off = CMD_HEADER.size
+    for _ in range(n):
+        if data[off] == slot: return off
+        off += BATCH_ENTRY.size
+    return -1
+
+
+def peek_seq(data, slot=None):
+    """只读取序列号, 不解析包体; 无法识别 (或批量帧里没有自己) 的包返回 -1"""
+    if is_binary(data):
+        if data[2] != FRAME_BATCH:
+            return SEQ_FIELD.unpack_from(data, SEQ_OFFSET)[0]
+        off = find_batch_entry(data, slot) if slot is not None else -1
+        return SEQ_FIELD.unpack_from(data, off + 2)[0] if off >= 0 else -1
+    try:
+        return json.loads(data.decode("utf-8")).get("seq", -1)
+    except Exception:
+        return -1
+
+
+def decode_cmd(data, slot=None):
+    """解析一条指令 (二进制或 JSON), 返回与旧 JSON 格式相同字段的 dict"""
+    if is_binary(data):
+        _magic, _ver, op, n, seq, t = CMD_HEADER.unpack_from(data)
+        if op == FRAME_BATCH:
+            off = find_batch_entry(data, slot) if slot is not None else -1
+            if off < 0: return None
+            slot, op, seq = BATCH_ENTRY.unpack_from(data, off)
+        else:
+            slot = n
+        rid = ROBOT_IDS[slot] if slot < len(ROBOT_IDS) else ""
+        return {"seq": seq, "id": rid, "cmd": op_to_cmd(op), "t": t}
+    return json.loads(data.decode("utf-8"))
+
+
+def negotiate(peer_version):
+    """根据 READY 里对方声明的版本, 选出双方都支持的格式"""
+    try:
+        v = int(peer_version)
+    except (TypeError, ValueError):
+        return PROTO_JSON
+    return max(PROTO_JSON, min(v, PROTO_VERSION))
+
+
+def latest_cmd(datagrams, latest_seq, slot=None):
+    """
+    从一批积压的数据报中挑出 seq 最大且比 latest_seq 新的一条。
+    二进制包只看 seq 头, 只有最终选中的那条才会完整解析。
+    slot 用于在批量帧中定位自己的条目。
+    返回 (msg 或 None, 新的 latest_seq)
+    """
+    best = None
+    for data in datagrams:
+        seq = peek_seq(data, slot)
+        if seq > latest_seq:
+            latest_seq = seq
+            best = data
+    if best is None:
+        return None, latest_seq
+    try:
+        return decode_cmd(best, slot), latest_seq
+    except Exception:
+        return None, latest_seq
@@ -0,0 +1,278 @@
+"""
+Supervisor <-> Player 通信传输层
+
+每个进程打开一个以自己名字命名的端点 ("SUP" 或 机器人 ID), 然后:
+    link.send(dest, data)          发给某个端点
+    link.broadcast(dests, data)    发给一组端点 (batch 帧)
+    link.recv_all()                非阻塞读空收件箱, 返回数据报列表
+
+三种后端, 通过 NAO_TRANSPORT 环境变量 (或 open_transport 的 backend 参数) 选择:
+    udp   AF_INET UDP, 127.0.0.1 + 固定端口 (原来的行为, 默认)
+    unix  AF_UNIX 数据报 socket, 文件放在临时目录
+    shm   multiprocessing.shared_memory 单写单读环形缓冲区, 收发都不走系统调用
+
+其他进程内后端 (例如 tools/sim2d 的无界面仿真) 可以用 register_backend 注册。
+
+所有后端都是"尽力而为"语义 (和 UDP 一样): 对端不存在或缓冲区满时直接丢包。
+"""
+import os
+import socket
+import struct
+import tempfile
+from multiprocessing import shared_memory
+
+import net
+import protocol
+
+SUPERVISOR = "SUP"
+BACKEND_UDP = "udp"
+BACKEND_UNIX = "unix"
+BACKEND_SHM = "shm"
+BACKENDS = (BACKEND_UDP, BACKEND_UNIX, BACKEND_SHM)
+
+RECV_SIZE = 4096
+
+# 注册的额外后端: 名字 -> factory(name, batch)
+_EXTRA_BACKENDS = {}
+
+
+def register_backend(backend, factory):
+    _EXTRA_BACKENDS[backend] = factory
+
+
+def backend_from_env():
+    b = os.environ.get("NAO_TRANSPORT", BACKEND_UDP).strip().lower()
+    return b if b in BACKENDS or b in _EXTRA_BACKENDS else BACKEND_UDP
+
+
+def peers_of(name):
+    """某个端点会收到哪些端点发来的数据 (shm 需要为每个发送方准备一个环)"""
+    return list(protocol.ROBOT_IDS) if name == SUPERVISOR else [SUPERVISOR]
+
+
+class Transport:
+    """传输层基类"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def send(self, dest, data):
+        raise NotImplementedError
+
+    def broadcast(self, dests, data):
+        """默认实现: 逐个发送 (UDP 后端会改用组播, 一次系统调用)"""
+        for d in dests: self.send(d, data)
+
+    def recv_all(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+# ================= UDP =================
+class UdpTransport(Transport):
+    def __init__(self, name, batch=False):
+        super().__init__(name)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((net.LOCAL_HOST, self.port_of(name)))
+        self.sock.setblocking(False)
+        self.rx_socks = [self.sock]
+        # Player 端: 加入 batch 组播组; Supervisor 端: 组播发送 socket (首次 broadcast 时创建)
+        if batch:
+            s = net.open_batch_receiver()
+            if s: self.rx_socks.append(s)
+        self.sock_batch = None
+
+    @staticmethod
+    def port_of(name):
+        return net.SUPERVISOR_PORT if name == SUPERVISOR else net.PORT[name]
+
+    def send(self, dest, data):
+        try:
+            self.sock.sendto(data, (net.LOCAL_HOST, self.port_of(dest)))
+            return True
+        except OSError:
+            return False
+
+    def broadcast(self, dests, data):
+        if self.sock_batch is None: self.sock_batch = net.open_batch_sender()
+        try: self.sock_batch.sendto(data, (net.BATCH_GROUP, net.BATCH_PORT))
+        except OSError: pass
+
+    def recv_all(self):
+        out = []
+        for s in self.rx_socks:
+            # 非阻塞读到 EAGAIN 为止, 不再每个包调用一次 select
+            while True:
+                try: out.append(s.recv(RECV_SIZE))
+                except (BlockingIOError, InterruptedError): break
+                except OSError: break
+        return out
+
+    def close(self):
+        for s in self.rx_socks + ([self.sock_batch] if self.sock_batch else []):
+            s.close()
+
+
+# ================= AF_UNIX =================
+def unix_path(name):
+    return os.path.join(tempfile.gettempdir(), f"nao_{net.tag(name)}.sock")
+
+
+class UnixTransport(Transport):
+    def __init__(self, name):
+        super().__init__(name)
+        self.path = unix_path(name)
+        if os.path.exists(self.path): os.unlink(self.path) # 上次异常退出留下的
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.setblocking(False)
+
+    def send(self, dest, data):
+        try:
+            self.sock.sendto(data, unix_path(dest))
+            return True
+        except OSError: # 对端还没起来 / 接收队列满
+            return False
+
+    def recv_all(self):
+        out = []
+        while True:
+            try: out.append(self.sock.recv(RECV_SIZE))
+            except (BlockingIOError, InterruptedError): break
+            except OSError: break
+        return out
+
+    def close(self):
+        self.sock.close()
+        try: os.unlink(self.path)
+        except OSError: pass
+
+
+# ================= 共享内存环形缓冲区 =================
+def _attach_untracked(name, size):
+    """
+    写端连接对端创建的共享内存段。不能交给 resource_tracker 管理,
+    否则写端退出时 tracker 会把读端的段删掉 (Python < 3.13 的已知问题)。
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=False, size=size, track=False)
+    except TypeError: # Python < 3.13 没有 track 参数
+        from multiprocessing import resource_tracker
+        register = resource_tracker.register
+        resource_tracker.register = lambda *args, **kwargs: None
+        try:
+            return shared_memory.SharedMemory(name=name, create=False, size=size)
+        finally:
+            resource_tracker.register = register
+
+
+class ShmRing:
+    """
+    单写单读环形缓冲区 (一个发送方 -> 一个接收方)。
+    布局: [0] 写计数 u64 (只有写端改) | [64] 读计数 u64 (只有读端改) | [128..] 定长槽位
+    每个槽位: 长度 u16 + 数据。写端先写数据再推进写计数, 读端看到计数后再读数据。
+    """
+    COUNTER = struct.Struct("<Q")
+    LEN = struct.Struct("<H")
+    W_OFF = 0
+    R_OFF = 64
+    DATA_OFF = 128
+    SLOT_SIZE = 256
+    CAPACITY = 64
+    SIZE = DATA_OFF + SLOT_SIZE * CAPACITY
+
+    def __init__(self, name, owner):
+        self.name = name
+        self.owner = owner # 读端负责创建 / 删除
+        if owner:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=self.SIZE)
+                self.COUNTER.pack_into(self.shm.buf, self.W_OFF, 0)
+                self.COUNTER.pack_into(self.shm.buf, self.R_OFF, 0)
+            except FileExistsError:
+                # 上次留下的段: 直接复用, 把读计数追到写计数 (丢掉旧数据)
+                self.shm = shared_memory.SharedMemory(name=name, create=False, size=self.SIZE)
+                w = self.COUNTER.unpack_from(self.shm.buf, self.W_OFF)[0]
+                self.COUNTER.pack_into(self.shm.buf, self.R_OFF, w)
+        else:
+            self.shm = _attach_untracked(name, self.SIZE)
+        self.buf = self.shm.buf
+
+    def push(self, data):
+        n = len(data)
+        if n > self.SLOT_SIZE - self.LEN.size: return False
+        w = self.COUNTER.unpack_from(self.buf, self.W_OFF)[0]
+        r = self.COUNTER.unpack_from(self.buf, self.R_OFF)[0]
+        if w - r >= self.CAPACITY: return False # 满了, 丢包
+        off = self.DATA_OFF + (w % self.CAPACITY) * self.SLOT_SIZE
+        self.LEN.pack_into(self.buf, off, n)
+        self.buf[off + 2:off + 2 + n] = data
+        self.COUNTER.pack_into(self.buf, self.W_OFF, w + 1)
+        return True
+
+    def pop_all(self, out):
+        r = self.COUNTER.unpack_from(self.buf, self.R_OFF)[0]
+        w = self.COUNTER.unpack_from(self.buf, self.W_OFF)[0]
+        while r < w:
+            off = self.DATA_OFF + (r % self.CAPACITY) * self.SLOT_SIZE
+            n = self.LEN.unpack_from(self.buf, off)[0]
+            out.append(bytes(self.buf[off + 2:off + 2 + n]))
+            r += 1
+        self.COUNTER.pack_into(self.buf, self.R_OFF, r)
+
+    def close(self):
+        self.buf = None
+        self.shm.close()
+        if self.owner:
+            try: self.shm.unlink()
+            except FileNotFoundError: pass
+
+
+def shm_name(src, dst):
+    return f"nao_{net.tag(src)}_{dst}"
+
+
+class ShmTransport(Transport):
+    def __init__(self, name):
+        super().__init__(name)
+        # 收件环: 每个可能的发送方一个
+        self.rx = [ShmRing(shm_name(p, name), owner=True) for p in peers_of(name)]
+        self.tx = {} # dest -> ShmRing (对端创建后才能连上)
+
+    def _tx_ring(self, dest):
+        ring = self.tx.get(dest)
+        if ring is None:
+            try: ring = ShmRing(shm_name(self.name, dest), owner=False)
+            except FileNotFoundError: return None
+            self.tx[dest] = ring
+        return ring
+
+    def send(self, dest, data):
+        ring = self._tx_ring(dest)
+        return ring.push(data) if ring else False
+
+    def recv_all(self):
+        out = []
+        for ring in self.rx: ring.pop_all(out)
+        return out
+
+    def close(self):
+        for ring in self.rx + list(self.tx.values()): ring.close()
+
+
+def open_transport(name, backend=None, batch=False):
+    """
+    打开名为 name 的端点。
+    batch=True 表示该端点需要接收 batch 组播帧 (Player 端)。
+    """
+    backend = backend or backend_from_env()
+    if backend in _EXTRA_BACKENDS:
+        return _EXTRA_BACKENDS[backend](name, batch)
+    if backend == BACKEND_UNIX:
+        return UnixTransport(name)
+    if backend == BACKEND_SHM:
+        return ShmTransport(name)
+    return UdpTransport(name, batch=batch)
@@ -1,4 +1,8 @@
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import motion_file
 
 def generate_motion_file():
     # 1. 定义 Webots NAO 机器人所有关键关节的标准顺序
@@ -23,24 +27,13 @@ def generate_motion_file():
         "RShoulderPitch": 1.5, "RShoulderRoll": -0.1, "RElbowYaw": 0.0, "RElbowRoll": 0.0
     }
 
-    # 3. 构建文件内容
-    # 第一行：固定表头
-    header = "#WEBOTS_MOTION,V1.0," + ",".join(joint_names)
-    
-    # 构建数据行
-    values = []
-    for name in joint_names:
-        # 如果字典里有这个关节，就用字典的值，否则用 0.0
-        val = target_poses.get(name, 0.0)
-        values.append(str(val))
-    
-    data_str = ",".join(values)
+    # 3. 构建关键帧
+    # 如果字典里有这个关节，就用字典的值，否则用 0.0
+    values = [target_poses.get(name, 0.0) for name in joint_names]
 
     # 生成两帧数据（第0秒和第1秒保持动作不变）
-    line1 = "00:00:000," + data_str
-    line2 = "00:01:000," + data_str
-
-    content = f"{header}\n{line1}\n{line2}"
+    # 和 tools/motion_compiler.py 一样用 motion_file.write_motion 写，每行 "时间,姿态名,值..." (以前漏了姿态名这一列)
+    clip = motion_file.MotionClip("Stand", joint_names, [0.0, 1.0], [values, values], poses=["Pose1", "Pose2"])
 
     # 4. 写入文件
     file_path = "motions/Stand.motion"
@@ -49,8 +42,7 @@ def generate_motion_file():
     if not os.path.exists("motions"):
         os.makedirs("motions")
 
-    with open(file_path, "w", encoding="utf-8", newline='\n') as f:
-        f.write(content)
+    motion_file.write_motion(file_path, clip)
     
     print(f"✅ 成功生成文件: {os.path.abspath(file_path)}")
     print("现在你可以在 Webots 中直接使用 Stand.motion 了！")
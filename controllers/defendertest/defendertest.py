@@ -1,19 +1,22 @@
 from controller import Robot, Motion
-import socket, json, select, sys
+import json, sys, os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol
+import net
+import transport
+import motion_file
 
 TIME_STEP = 32
-PORT_MAP = {
-    "B1": 10001, "B2": 10002, "B3": 10003, "B4": 10004,
-    "R1": 10011, "R2": 10012, "R3": 10013, "R4": 10014,
-}
-SUPERVISOR_HOST = "127.0.0.1"
-SUPERVISOR_PORT = 12000
+PORT_MAP = net.PORT
+READY_RETRY_SEC = 0.5 # 收到第一条指令前定期重发 READY
 MOTION_PATH_PREFIX = "motions/" # 请确保路径正确
 
 def safe_get_duration(m: Motion, default_sec: float) -> float:
+    # Webots 的 getDuration() 返回毫秒
     try:
         d = m.getDuration()
-        if d and d > 0.01: return float(d)
+        if d and d > 10: return d / 1000.0
     except: pass
     return float(default_sec)
 
@@ -23,31 +26,37 @@ class NaoClient:
         self.rid = sys.argv[1] if len(sys.argv) > 1 else "B2"
         if self.rid not in PORT_MAP: self.rid = "B2"
         
-        self.sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock_rx.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock_rx.bind(("127.0.0.1", PORT_MAP[self.rid]))
-        self.sock_rx.setblocking(False)
-        self.sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-        print(f"[{self.rid}] Player listening on {PORT_MAP[self.rid]}")
-
-        # 动作定义
-        self.motion = {
-            "FWD": Motion(MOTION_PATH_PREFIX + "Forwards50.motion"),
-            "BWD": Motion(MOTION_PATH_PREFIX + "Backwards.motion"),
-            "TURN_L": Motion(MOTION_PATH_PREFIX + "TurnLeftSmall.motion"),
-            "TURN_R": Motion(MOTION_PATH_PREFIX + "TurnRightSmall.motion"),
-            "SIDE_L": Motion(MOTION_PATH_PREFIX + "SidestepLeft.motion"),
-            "SIDE_R": Motion(MOTION_PATH_PREFIX + "SidestepRight.motion"),
-            "KICK_L": Motion(MOTION_PATH_PREFIX + "Shoot.motion"),
-            "STAND": Motion(MOTION_PATH_PREFIX + "Stand.motion"),
-            "GETUP_FRONT": Motion(MOTION_PATH_PREFIX + "GetUpFront.motion"),
-            "GETUP_BACK": Motion(MOTION_PATH_PREFIX + "GetUpBack.motion"),
+        self.slot = protocol.SLOT[self.rid]
+        self.link = transport.open_transport(self.rid, batch=True)
+
+        print(f"[{self.rid}] Player listening via {type(self.link).__name__}")
+
+        # 动作定义 (第一次用到才创建 Motion)
+        self.motion_files = {
+            "FWD": MOTION_PATH_PREFIX + "Forwards50.motion",
+            "BWD": MOTION_PATH_PREFIX + "Backwards.motion",
+            "TURN_L": MOTION_PATH_PREFIX + "TurnLeftSmall.motion",
+            "TURN_R": MOTION_PATH_PREFIX + "TurnRightSmall.motion",
+            "SIDE_L": MOTION_PATH_PREFIX + "SideStepLeft.motion",
+            "SIDE_R": MOTION_PATH_PREFIX + "SideStepRight.motion",
+            "KICK_L": MOTION_PATH_PREFIX + "Shoot.motion",
+            "STAND": MOTION_PATH_PREFIX + "Stand.motion",
+            "GETUP_FRONT": MOTION_PATH_PREFIX + "GetUpFront.motion",
+            "GETUP_BACK": MOTION_PATH_PREFIX + "GetUpBack.motion",
         }
+        self.motion = motion_file.LazyMotions(self.motion_files, Motion)
+        # 动作时长 (秒，来自动作目录的索引)
+        names = {cmd: os.path.splitext(os.path.basename(p))[0] for cmd, p in self.motion_files.items()}
+        index = motion_file.load_index(MOTION_PATH_PREFIX)
+        self.durations = motion_file.duration_table(MOTION_PATH_PREFIX, names, index)
+        motion_file.report_problems(self.rid, MOTION_PATH_PREFIX, names.values(), index)
         
         # 连续动作 (不需要汇报DONE，循环播放)
         self.continuous_motions = ["FWD", "BWD", "TURN_L", "TURN_R", "SIDE_L", "SIDE_R", "STAND"]
 
+        # 没有新包时，连续动作保持执行的时长 (与 Supervisor 的保活周期对应)
+        self.hold_sec = max(0.5, net.hold_sec(TIME_STEP))
+
         self.latest_seq = -1
         self.pending_cmd = None
         self.current_action = None
@@ -55,22 +64,18 @@ class NaoClient:
 
         # 启动握手
         self.send_event("READY", action="")
+        self.next_ready_time = READY_RETRY_SEC
 
     def send_event(self, event, action=""):
         msg = {"id": self.rid, "event": event, "action": action}
-        try: self.sock_tx.sendto(json.dumps(msg).encode(), (SUPERVISOR_HOST, SUPERVISOR_PORT))
+        if event == "READY": msg["proto"] = protocol.PROTO_VERSION
+        try: self.link.send(transport.SUPERVISOR, json.dumps(msg).encode())
         except: pass
 
     def poll_cmd(self):
-        r, _, _ = select.select([self.sock_rx], [], [], 0)
-        if not r: return None
-        try:
-            data, _ = self.sock_rx.recvfrom(4096)
-            msg = json.loads(data.decode())
-            if msg.get("seq", -1) <= self.latest_seq: return None
-            self.latest_seq = msg["seq"]
-            return msg
-        except: return None
+        # 读空缓冲区，只解析 seq 最新的一条 (过期包只看 seq 头)
+        msg, self.latest_seq = protocol.latest_cmd(self.link.recv_all(), self.latest_seq, self.slot)
+        return msg
 
     def start_action(self, cmd):
         now = self.robot.getTime()
@@ -78,7 +83,7 @@ class NaoClient:
         # 优化：如果是连续动作且正在做，只刷新超时，不打断
         if cmd in self.continuous_motions and self.current_action == cmd:
             if cmd in self.motion: self.motion[cmd].setLoop(True)
-            self.action_end_time = now + 0.5 # 续命 0.5s
+            self.action_end_time = now + self.hold_sec # 续命 (保活周期内不会超时)
             return
 
         # 停止旧动作 (STAND除外，为了平滑可以保留一瞬间)
@@ -103,10 +108,10 @@ class NaoClient:
         m.setLoop(loop)
         m.play()
 
-        dur = safe_get_duration(m, 1.0)
+        dur = self.durations.get(cmd) or safe_get_duration(m, 1.0)
         # 连续动作设置个短时间，依赖 start_action 不断刷新来维持
         # 原子动作 (KICK) 设置真实时长
-        self.action_end_time = now + (0.5 if loop else dur + 0.05)
+        self.action_end_time = now + (self.hold_sec if loop else dur + 0.05)
 
     def run(self):
         # 初始站立
@@ -116,6 +121,9 @@ class NaoClient:
             self.current_action = "STAND"
 
         while self.robot.step(TIME_STEP) != -1:
+            if self.latest_seq < 0 and self.robot.getTime() >= self.next_ready_time:
+                self.send_event("READY", action="")
+                self.next_ready_time = self.robot.getTime() + READY_RETRY_SEC
             msg = self.poll_cmd()
             if msg:
                 cmd = msg.get("cmd", "STOP")
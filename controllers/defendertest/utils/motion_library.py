@@ -13,35 +13,53 @@
 # limitations under the License.
 
 import os
+import sys
 from controller import Motion
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'common'))
+import motion_file
+
+# the controller's own motions folder ('../../motions/' from the Cyberbotics sample does not exist in this project)
+MOTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'motions')
+
 
 class MotionLibrary:
-    def __init__(self):
-        """Initializes the motion library with the motions in the motions folder."""
-        self.motions = {}
-        motion_dir = '../../motions/'
-        for motion_file in os.listdir(motion_dir):
-            motion_path = os.path.join(motion_dir, motion_file)
-            motion_name, ext = os.path.splitext(motion_file)
-            if ext != '.motion':
-                continue
-            motion = Motion(motion_path)
-            # if the file ends with "Loop", it is played on loop
-            if motion_name.endswith('Loop'):
-                motion.setLoop(True)
-            self.motions[motion_name] = motion
+    def __init__(self, motion_dir=MOTION_DIR):
+        """Indexes the motions in the motions folder. Motion objects are created on first use."""
+        self.index = motion_file.load_index(motion_dir)
+        self.motions = motion_file.LazyMotions(
+            {name: os.path.join(motion_dir, e['file']) for name, e in self.index.items()},
+            Motion, self._setup)
+        self.loops = {name for name, e in self.index.items() if e['loop']}
+
+    def _setup(self, name, motion):
+        # if the file ends with "Loop", it is played on loop
+        if name in self.loops:
+            motion.setLoop(True)
 
     def add(self, name, motion_path, loop=False):
         """Adds a custom motion to the library."""
-        self.motions[name] = Motion(motion_path)
+        self.motions.add(name, motion_path)
+        self.index.pop(name, None)
         if loop:
-            self.motions[name].setLoop(loop)
+            self.loops.add(name)
+        else:
+            self.loops.discard(name)
 
     def get(self, name):
         """Returns the motion with the given name."""
         return self.motions[name]
 
+    def duration(self, name):
+        """Returns the duration of the motion in seconds, from the index (None for custom motions)."""
+        e = self.index.get(name)
+        return e['duration'] if e else None
+
+    def joints(self, name):
+        """Returns the joint names controlled by the motion, from the index (None for custom motions)."""
+        e = self.index.get(name)
+        return e['joints'] if e else None
+
     def play(self, name):
         """Plays the motion with the given name."""
         self.motions[name].play()
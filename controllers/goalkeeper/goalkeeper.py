@@ -1,25 +1,28 @@
 from controller import Robot, Motion
-import socket, json, select, sys
+import json, sys, os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol
+import net
+import transport
+import motion_file
 
 # ================= 配置区 =================
 TIME_STEP = 32
 
 # 必须与 TeamSupervisor 中的端口对应
-PORT_MAP = {
-    "B1": 10001, "B2": 10002, "B3": 10003, "B4": 10004,
-    "R1": 10011, "R2": 10012, "R3": 10013, "R4": 10014,
-}
+PORT_MAP = net.PORT
 
-SUPERVISOR_HOST = "127.0.0.1"
-SUPERVISOR_PORT = 12000
+READY_RETRY_SEC = 0.5 # 收到第一条指令前定期重发 READY
 
 # 动作文件路径 (根据你之前的代码，你确认有这些文件)
 MOTION_PATH_PREFIX = "motions/" 
 
 def safe_get_duration(m: Motion, default_sec: float) -> float:
+    # Webots 的 getDuration() 返回毫秒
     try:
         d = m.getDuration()
-        if d and d > 0.01: return float(d)
+        if d and d > 10: return d / 1000.0
     except: pass
     return float(default_sec)
 
@@ -34,18 +37,18 @@ class GoalkeeperClient:
             print(f"Warning: Unknown ID {self.rid}, fallback to B4")
             self.rid = "B4"
 
-        # 3. UDP 网络初始化 (监听裁判指令)
-        self.sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock_rx.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock_rx.bind(("127.0.0.1", PORT_MAP[self.rid]))
-        self.sock_rx.setblocking(False)
-        self.sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # 3. 通信端点初始化 (监听裁判指令, NAO_TRANSPORT=udp/unix/shm)
+        self.slot = protocol.SLOT[self.rid]
+        self.link = transport.open_transport(self.rid, batch=True)
 
-        print(f"[{self.rid}] Goalkeeper Client listening on port {PORT_MAP[self.rid]}")
+        print(f"[{self.rid}] Goalkeeper Client listening via {type(self.link).__name__}")
 
         # 4. 加载动作 (只加载你确认有的)
         # 即使 Supervisor 发了 DIVE，如果我们没有文件，这里不加载就不会报错(只是不执行)
-        self.motion = {}
+        # 第一次用到才创建 Motion；动作目录的索引用来跳过不存在的文件
+        self.motion_index = motion_file.load_index(MOTION_PATH_PREFIX)
+        self.motion = motion_file.LazyMotions({}, Motion)
+        self.durations = {} # 指令 -> 动作时长 (秒，来自索引)
         self.load_motion_safe("FWD", "Forwards50.motion") # 对应 Supervisor 的 "FWD"
         self.load_motion_safe("forward", "Forwards50.motion") # 兼容旧名
         
@@ -58,11 +61,11 @@ class GoalkeeperClient:
         self.load_motion_safe("TURN_R", "TurnRightSmall.motion")
         self.load_motion_safe("turn_right", "TurnRightSmall.motion")
 
-        self.load_motion_safe("SIDE_L", "SidestepLeft.motion")
-        self.load_motion_safe("strafe_left", "SidestepLeft.motion")
+        self.load_motion_safe("SIDE_L", "SideStepLeft.motion")
+        self.load_motion_safe("strafe_left", "SideStepLeft.motion")
 
-        self.load_motion_safe("SIDE_R", "SidestepRight.motion")
-        self.load_motion_safe("strafe_right", "SidestepRight.motion")
+        self.load_motion_safe("SIDE_R", "SideStepRight.motion")
+        self.load_motion_safe("strafe_right", "SideStepRight.motion")
         
         # 删除了 Stand, DiveLeft, DiveRight, GetUp 等缺失的动作
         
@@ -70,6 +73,9 @@ class GoalkeeperClient:
         self.continuous_motions = ["FWD", "BWD", "TURN_L", "TURN_R", "SIDE_L", "SIDE_R", 
                                    "forward", "backward", "turn_left", "turn_right", "strafe_left", "strafe_right"]
 
+        # 没有新包时，连续动作保持执行的时长 (与 Supervisor 的保活周期对应)
+        self.hold_sec = max(0.5, net.hold_sec(TIME_STEP))
+
         self.latest_seq = -1
         self.pending_cmd = None
         self.current_action = None
@@ -77,31 +83,27 @@ class GoalkeeperClient:
 
         # 告诉 Supervisor 我准备好了
         self.send_event("READY", action="")
+        self.next_ready_time = READY_RETRY_SEC
 
     def load_motion_safe(self, key, filename):
-        try:
-            # 尝试加载
-            self.motion[key] = Motion(MOTION_PATH_PREFIX + filename)
-        except Exception:
-            # 如果加载失败(文件不存在)，静默跳过，不报错
-            pass
+        # 文件不存在 (不在索引里) 就静默跳过，不报错
+        name = os.path.splitext(filename)[0]
+        if name in self.motion_index:
+            self.motion.add(key, MOTION_PATH_PREFIX + filename)
+            self.durations[key] = self.motion_index[name]["duration"]
+            for p in self.motion_index[name]["problems"]: print(f"[{self.rid}] motion {name}: {p}")
 
     def send_event(self, event, action=""):
         msg = {"id": self.rid, "event": event, "action": action, "t": self.robot.getTime()}
-        try: self.sock_tx.sendto(json.dumps(msg).encode(), (SUPERVISOR_HOST, SUPERVISOR_PORT))
+        if event == "READY": msg["proto"] = protocol.PROTO_VERSION
+        try: self.link.send(transport.SUPERVISOR, json.dumps(msg).encode())
         except: pass
 
     def poll_cmd(self):
-        """接收 UDP 指令"""
-        r, _, _ = select.select([self.sock_rx], [], [], 0)
-        if not r: return None
-        try:
-            data, _ = self.sock_rx.recvfrom(4096)
-            msg = json.loads(data.decode())
-            if msg.get("seq", -1) <= self.latest_seq: return None
-            self.latest_seq = msg["seq"]
-            return msg
-        except: return None
+        """接收指令"""
+        # 读空缓冲区，只解析 seq 最新的一条 (过期包只看 seq 头)
+        msg, self.latest_seq = protocol.latest_cmd(self.link.recv_all(), self.latest_seq, self.slot)
+        return msg
 
     def start_action(self, cmd):
         now = self.robot.getTime()
@@ -109,7 +111,7 @@ class GoalkeeperClient:
         # 1. 连续动作续命逻辑
         if cmd in self.continuous_motions and self.current_action == cmd:
             if cmd in self.motion: self.motion[cmd].setLoop(True)
-            self.action_end_time = now + 0.5 
+            self.action_end_time = now + self.hold_sec
             return
 
         # 2. 停止当前动作
@@ -139,11 +141,16 @@ class GoalkeeperClient:
         m.setLoop(loop)
         m.play()
 
-        dur = safe_get_duration(m, 1.0)
-        self.action_end_time = now + (0.5 if loop else dur + 0.05)
+        dur = self.durations.get(cmd) or safe_get_duration(m, 1.0)
+        self.action_end_time = now + (self.hold_sec if loop else dur + 0.05)
 
     def run(self):
         while self.robot.step(TIME_STEP) != -1:
+            # 0. 还没收到过指令就定期重发 READY
+            if self.latest_seq < 0 and self.robot.getTime() >= self.next_ready_time:
+                self.send_event("READY", action="")
+                self.next_ready_time = self.robot.getTime() + READY_RETRY_SEC
+
             # 1. 读取指令
             msg = self.poll_cmd()
             if msg:
@@ -1,35 +1,56 @@
 from controller import Robot, Motion
-import socket, json, select, sys
+import json, sys, os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol
+import net
+import transport
+import motion_file
 
 TIME_STEP = 32
 
 # 每个 Player 自己监听的端口（收 Supervisor 命令）
-PORT_MAP = {
-    "B1": 10001, "B2": 10002, "B3": 10003, "B4": 10004,
-    "R1": 10011, "R2": 10012, "R3": 10013, "R4": 10014,
+PORT_MAP = net.PORT
+
+# 收到第一条指令之前，每隔多久重发一次 READY (Supervisor 可能比我们晚启动)
+READY_RETRY_SEC = 0.5
+
+# 可以"保持执行"的移动指令: Supervisor 只在指令变化 (或保活) 时发包
+LOCO_CMDS = ("FWD", "BWD", "TURN_L", "TURN_R", "SIDE_L", "SIDE_R")
+
+MOTION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "motions")
+# 指令 -> 动作文件名
+MOTION_FILES = {
+    "FWD": "Forwards50",
+    "BWD": "Backwards",
+    "TURN_L": "TurnLeftSmall",
+    "TURN_R": "TurnRightSmall",
+    # === 新增：左右横移 ===
+    "SIDE_L": "SideStepLeft",
+    "SIDE_R": "SideStepRight",
+    "KICK_L": "Shoot",
+    "GETUP_FRONT": "GetUpFront",
+    "GETUP_BACK": "GetUpBack",
 }
 
-# Supervisor 用来收 DONE 的端口
-SUPERVISOR_HOST = "127.0.0.1"
-SUPERVISOR_PORT = 12000
-
 def safe_get_duration(m: Motion, default_sec: float) -> float:
-    """安全获取动作时长，防止读取失败"""
+    """安全获取动作时长 (秒)，防止读取失败。Webots 的 getDuration() 返回的是毫秒"""
     try:
         d = m.getDuration()
-        if d and d > 0.01:
-            return float(d)
+        if d and d > 10:
+            return d / 1000.0
     except Exception:
         pass
     return float(default_sec)
 
 class NaoPlayer:
-    def __init__(self):
-        self.robot = Robot()
+    def __init__(self, rid=None, robot=None, motion_factory=None, link=None):
+        """Webots 下都用默认值; tools/sim2d 传入机器人 ID、自己的 Robot / Motion 替身和进程内传输端点"""
+        self.robot = robot or Robot()
 
         # 1. 确定 Robot ID
         # 优先从命令行参数获取 (Webots controllerArgs)
-        self.rid = sys.argv[1] if len(sys.argv) > 1 else "B1"
+        self.rid = rid or (sys.argv[1] if len(sys.argv) > 1 else "B1")
         
         # 如果参数不对，尝试使用机器人名称 (DEF name)
         if self.rid not in PORT_MAP:
@@ -40,46 +61,34 @@ class NaoPlayer:
                 print(f"Unknown robot id: {self.rid}, fallback to B1")
                 self.rid = "B1"
 
-        # 2. 初始化 UDP 接收端 (收指令)
-        self.sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock_rx.bind(("127.0.0.1", PORT_MAP[self.rid]))
-        self.sock_rx.setblocking(False)
-
-        # 3. 初始化 UDP 发送端 (发 DONE/READY)
-        self.sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-        print(f"[{self.rid}] listening UDP on port {PORT_MAP[self.rid]}")
-
-        # 4. 加载动作文件 (确保 motions 文件夹下有这些文件)
-        self.motion = {
-            "FWD": Motion("motions/Forwards50.motion"),
-            "BWD": Motion("motions/Backwards.motion"),
-            "TURN_L": Motion("motions/TurnLeftSmall.motion"),
-            "TURN_R": Motion("motions/TurnRightSmall.motion"),
-            
-            # === 新增：左右横移 ===
-            "SIDE_L": Motion("motions/SideStepLeft.motion"),
-            "SIDE_R": Motion("motions/SideStepRight.motion"),
-            
-            "KICK_L": Motion("motions/Shoot.motion"),
-            "GETUP_FRONT": Motion("motions/GetUpFront.motion"),
-            "GETUP_BACK": Motion("motions/GetUpBack.motion"),
-        }
-
-        # 5. 设置默认时长 (用于 getDuration 失败时的兜底)
-        self.default_duration = {
-            "FWD": 0.55,
-            "BWD": 0.55,
-            "TURN_L": 0.45,
-            "TURN_R": 0.45,
-            "SIDE_L": 0.60, # 侧移通常较慢
-            "SIDE_R": 0.60,
-            "KICK_L": 1.20,
-            "GETUP_FRONT": 4.00, # 爬起动作较长
-            "GETUP_BACK": 4.00,
-        }
-
-        # 安全保险丝：任何动作最长不超过这个秒数 (防止死锁)
+        # 2. 初始化通信端点 (收指令 + 发 DONE/READY, NAO_TRANSPORT=udp/unix/shm)
+        # batch 模式下 Supervisor 把全部指令合成一帧，这里按自己的 slot 取
+        self.slot = protocol.SLOT[self.rid]
+        self.link = link or transport.open_transport(self.rid, batch=True)
+
+        print(f"[{self.rid}] listening via {type(self.link).__name__}")
+
+        # 4. 登记动作文件 (确保 motions 文件夹下有这些文件)，第一次播放时才创建 Motion
+        self.motion = motion_file.LazyMotions(
+            {cmd: f"{MOTION_DIR}/{name}.motion" for cmd, name in MOTION_FILES.items()}, motion_factory or Motion)
+
+        # 移动动作衔接 (NAO_LOCO_CHAIN，默认开): 同一个移动指令还在继续就从步态循环起点接着播，
+        # 换成别的移动动作也在动作边界直接衔接，不等缓冲、不从站立姿态重新起步
+        self.chain = motion_file.chain_enabled()
+        # 移动动作抢占 (NAO_LOCO_PREEMPT): 走路中来了踢球 / STOP，在下一个双脚支撑帧就切过去
+        self.preempt = motion_file.preempt_mode()
+        # 衔接表要完整解析 6 个移动动作文件，衔接和抢占都关掉时不建
+        self.chain_table = None
+        if self.chain or self.preempt:
+            self.chain_table = motion_file.ChainTable.from_files(
+                {cmd: MOTION_FILES[cmd] for cmd in LOCO_CMDS}, MOTION_DIR)
+
+        # 5. 动作时长表 (秒，动作文件最后一个关键帧，缓存在动作目录的索引里)，顺便打印动作文件的校验问题
+        index = motion_file.load_index(MOTION_DIR)
+        self.durations = motion_file.duration_table(MOTION_DIR, MOTION_FILES, index)
+        motion_file.report_problems(self.rid, MOTION_DIR, MOTION_FILES.values(), index)
+
+        # 安全保险丝：时长表里没有的动作最长按这个秒数算 (防止死锁)
         self.max_action_sec = 6.0
 
         # 状态变量
@@ -88,46 +97,38 @@ class NaoPlayer:
         self.current_action = None
         self.action_end_time = 0.0  
 
+        # 移动指令保持: 最近一条移动指令，在 hold_until 之前播完会自动续播
+        self.hold_sec = net.hold_sec(TIME_STEP)
+        self.hold_cmd = None
+        self.hold_until = 0.0
+
         # 启动时发送 READY 信号
         self.send_event("READY", action="")
+        self.next_ready_time = READY_RETRY_SEC
 
     def send_event(self, event: str, action: str):
         """发送状态给 Supervisor"""
         msg = {"id": self.rid, "event": event, "action": action, "t": self.robot.getTime()}
+        if event == "READY":
+            msg["proto"] = protocol.PROTO_VERSION # 握手时声明支持的协议版本
         try:
-            self.sock_tx.sendto(json.dumps(msg).encode("utf-8"), (SUPERVISOR_HOST, SUPERVISOR_PORT))
+            self.link.send(transport.SUPERVISOR, json.dumps(msg).encode("utf-8"))
         except Exception as e:
             print(f"Socket send error: {e}")
 
     def poll_cmd(self):
         """
-        【关键修复】从 UDP 缓冲区读取所有积压的命令，只返回最新的一条 (seq 最大的)。
+        【关键修复】从接收缓冲区读取所有积压的命令，只返回最新的一条 (seq 最大的)。
         这能彻底解决高频发送下的动作延迟问题。
         """
-        latest_msg = None
-        
-        while True:
-            # 检查是否有数据可读
-            r, _, _ = select.select([self.sock_rx], [], [], 0)
-            if not r:
-                break # 缓冲区已空
-            
-            try:
-                data, _ = self.sock_rx.recvfrom(4096)
-                msg = json.loads(data.decode("utf-8"))
-                seq = msg.get("seq", -1)
-                
-                # 只有序列号更新的指令才有效
-                if seq > self.latest_seq:
-                    self.latest_seq = seq
-                    latest_msg = msg
-            except Exception:
-                pass
+        datagrams = self.link.recv_all() # 非阻塞读空
         
+        # 只有序列号更新的指令才有效 (过期包只读 seq 头，不解析包体)
+        latest_msg, self.latest_seq = protocol.latest_cmd(datagrams, self.latest_seq, self.slot)
         return latest_msg
 
-    def start_action(self, cmd: str):
-        """开始执行一个动作"""
+    def start_action(self, cmd: str, at: float = 0.0):
+        """开始执行一个动作 (at: 从动作的第几秒开始播，衔接时用)"""
         now = self.robot.getTime()
 
         # 处理 STOP
@@ -152,16 +153,25 @@ class NaoPlayer:
         # 播放动作
         self.current_action = cmd
         m = self.motion[cmd]
+
+        if (self.chain or at > 0.0) and cmd in LOCO_CMDS:
+            # 衔接 / 抢占: 显式定位播放位置 (上一轮可能还没播完)，结束时间就是动作本身的结束，不加缓冲
+            m.setTime(int(round(at * 1000)))
+            m.play()
+            self.action_end_time = now + max(0.0, self.action_duration(cmd, m) - at)
+            return
         
         # 这里的 play() 是非阻塞的，Webots 会在后台播放
         m.play()
 
-        # 计算结束时间
-        dur = safe_get_duration(m, self.default_duration.get(cmd, 1.0))
-        dur = min(float(dur), self.max_action_sec) # 限制最大时长
-        
         # +0.05 是为了留一点缓冲时间
-        self.action_end_time = now + dur + 0.05
+        self.action_end_time = now + self.action_duration(cmd, m) + 0.05
+
+    def action_duration(self, cmd: str, m: Motion) -> float:
+        """动作时长 (秒): 时长表里的精确值，没有才问 Webots (并限制最大时长)"""
+        dur = self.durations.get(cmd)
+        if dur is None: dur = min(safe_get_duration(m, 1.0), self.max_action_sec)
+        return dur
 
     def interrupt_action(self, cmd: str):
         """
@@ -169,6 +179,7 @@ class NaoPlayer:
         """
         # 清空等待队列
         self.pending_cmd = None
+        self.hold_cmd = None
 
         # 尝试停止当前动作
         try:
@@ -190,44 +201,97 @@ class NaoPlayer:
             return
             
         now = self.robot.getTime()
+        if (self.preempt and self.current_action in LOCO_CMDS
+                and self.pending_cmd is not None and self.pending_cmd != self.current_action):
+            t = self.motion[self.current_action].getTime() / 1000.0
+            at = self.chain_table.preempt_entry(self.current_action, t, self.pending_cmd, self.preempt)
+            if at is not None:
+                self.preempt_action(at)
+                return
         if now >= self.action_end_time:
             finished = self.current_action
             self.current_action = None
             # 告诉 Supervisor 我做完了
             self.send_event("DONE", action=finished)
+            if self.chain and finished in LOCO_CMDS: self.chain_next(finished, now)
+
+    def preempt_action(self, at):
+        """当前移动动作在安全帧让位给等待中的指令 (移动指令从 at 秒开始播)"""
+        finished = self.current_action
+        m = self.motion[finished]
+        m.stop()
+        m.setTime(0) # 下次从头播，不接着这次停下的位置
+        self.current_action = None
+        self.send_event("DONE", action=finished)
+        cmd, self.pending_cmd = self.pending_cmd, None
+        self.start_action(cmd, at)
+
+    def next_loco(self, now):
+        """接下来要播的移动指令 (等待中的，或仍在保持期内的上一条)，没有返回 None"""
+        if self.pending_cmd is not None:
+            return self.pending_cmd if self.pending_cmd in LOCO_CMDS else None
+        if self.hold_cmd is not None and now < self.hold_until: return self.hold_cmd
+        return None
+
+    def chain_next(self, finished, now):
+        """移动动作刚播完: 下一个还是移动动作就在这个边界直接接上 (从衔接帧开始)"""
+        cmd = self.next_loco(now)
+        if cmd is None: return
+        self.pending_cmd = None
+        self.start_action(cmd, self.chain_table.entry(finished, cmd))
 
     def run(self):
         """主循环"""
         while self.robot.step(TIME_STEP) != -1:
-            # 1. 接收命令 (只取最新)
-            msg = self.poll_cmd()
-            if msg:
-                cmd = msg.get("cmd", "STOP")
-                cmd = cmd if cmd else "STOP"
-
-                # === 紧急打断逻辑 ===
-                if cmd.startswith("INTERRUPT_"):
-                    cmd2 = cmd.replace("INTERRUPT_", "")
-                    # 如果是已知动作或STOP，立即执行
-                    if cmd2 in self.motion or cmd2 == "STOP":
-                        self.interrupt_action(cmd2)
-                    else:
-                        self.interrupt_action("STOP")
-                    # 打断后，本帧不再处理 Pending 逻辑
-                    continue
-
-                # 普通指令存入 Pending
-                self.pending_cmd = cmd
-
-            # 2. 更新当前动作状态 (检查是否结束)
-            self.update_action()
-
-            # 3. 如果当前空闲，且有等待执行的指令 -> 开始执行
-            # 这保证了动作是串行的，不会还没走完就踢球
-            if self.current_action is None and self.pending_cmd is not None:
-                cmd = self.pending_cmd
-                self.pending_cmd = None
-                self.start_action(cmd)
+            self.control_step()
+
+    def control_step(self):
+        """一个控制周期: 握手、收指令、更新 / 开始动作"""
+        # 0. 握手: 还没收到过指令就定期重发 READY
+        if self.latest_seq < 0 and self.robot.getTime() >= self.next_ready_time:
+            self.send_event("READY", action="")
+            self.next_ready_time = self.robot.getTime() + READY_RETRY_SEC
+
+        # 1. 接收命令 (只取最新)
+        msg = self.poll_cmd()
+        if msg:
+            cmd = msg.get("cmd", "STOP")
+            cmd = cmd if cmd else "STOP"
+
+            # === 紧急打断逻辑 ===
+            if cmd.startswith("INTERRUPT_"):
+                cmd2 = cmd.replace("INTERRUPT_", "")
+                # 如果是已知动作或STOP，立即执行
+                if cmd2 in self.motion or cmd2 == "STOP":
+                    self.interrupt_action(cmd2)
+                else:
+                    self.interrupt_action("STOP")
+                # 打断后，本帧不再处理 Pending 逻辑
+                return
+
+            # 普通指令存入 Pending
+            self.pending_cmd = cmd
+
+            # 移动指令: 刷新保持时间；其他指令取消保持
+            if cmd in LOCO_CMDS:
+                self.hold_cmd = cmd
+                self.hold_until = self.robot.getTime() + self.hold_sec
+            else:
+                self.hold_cmd = None
+
+        # 2. 更新当前动作状态 (检查是否结束)
+        self.update_action()
+
+        # 3. 如果当前空闲，且有等待执行的指令 -> 开始执行
+        # 这保证了动作是串行的，不会还没走完就踢球
+        if self.current_action is None and self.pending_cmd is not None:
+            cmd = self.pending_cmd
+            self.pending_cmd = None
+            self.start_action(cmd)
+        # 没有新包，但上一条移动指令仍在保持期内 -> 继续走
+        elif (self.current_action is None and self.hold_cmd is not None
+              and self.robot.getTime() < self.hold_until):
+            self.start_action(self.hold_cmd)
 
 if __name__ == "__main__":
     NaoPlayer().run()
\ No newline at end of file
@@ -0,0 +1,102 @@
+import math
+from history import RESET_JUMP
+
+# ================= 滤波参数 =================
+ROLL_DAMPING = 0.5     # 滚动摩擦: 速度按 exp(-ROLL_DAMPING * t) 衰减 (1/s)
+ACCEL_NOISE = 1.0      # 过程噪声: 未建模加速度 (被踢 / 被推) 的标准差 (m/s^2)
+MEAS_NOISE = 0.01      # 观测噪声 (m)
+MIN_SPEED = 0.05       # 低于此速度认为球没在滚，不做截球预测 (m/s)
+MAX_HORIZON = 5.0      # 只预测这么多秒以内的到达
+
+
+class BallPredictor:
+    """
+    球的轨迹预测: 匀速 + 滚动摩擦 (速度指数衰减) 的卡尔曼滤波。
+    每个 tick 调用一次 update(t, x, y)；历史观测存在共用的 WorldHistory 环形缓冲区里 (球那一列)。
+    x / y 两个方向的模型相同，共用一个 2x2 协方差，全部用 Python float 计算。
+    """
+
+    def __init__(self, history=None):
+        self.history = history
+        self.reset()
+
+    def __len__(self):
+        """上次重置以来的观测数"""
+        return self.count
+
+    def reset(self):
+        """丢掉滤波状态"""
+        self.count = 0
+        self.last_t = None
+        self.x = self.y = self.vx = self.vy = 0.0
+        # 协方差 [[p_pp, p_pv], [p_pv, p_vv]]
+        self.p_pp, self.p_pv, self.p_vv = MEAS_NOISE ** 2, 0.0, 1.0
+
+    def samples(self):
+        """按时间顺序返回重置以来的 (t, xy) (来自 WorldHistory，最多 HISTORY_SIZE 个)"""
+        t, xy = self.history.track(self.history.ball)
+        n = min(self.count, len(t))
+        return t[len(t) - n:], xy[len(t) - n:]
+
+    def update(self, t, x, y):
+        """加入一次观测: 先按模型外推到 t，再用观测修正"""
+        if self.last_t is None or math.hypot(x - self.x, y - self.y) > RESET_JUMP:
+            self.reset()
+            self.x, self.y, self.last_t = x, y, t
+            self.count = 1
+            return
+        dt = t - self.last_t
+        if dt <= 0: return
+        self.last_t = t
+        self.count += 1
+
+        # --- 预测 ---
+        d = math.exp(-ROLL_DAMPING * dt)
+        g = (1.0 - d) / ROLL_DAMPING
+        self.x += g * self.vx
+        self.y += g * self.vy
+        self.vx *= d
+        self.vy *= d
+        # P = F P F^T + Q, F = [[1, g], [0, d]]
+        pp = self.p_pp + 2 * g * self.p_pv + g * g * self.p_vv
+        pv = d * self.p_pv + g * d * self.p_vv
+        vv = d * d * self.p_vv
+        q = ACCEL_NOISE ** 2
+        pp += q * dt ** 4 / 4
+        pv += q * dt ** 3 / 2
+        vv += q * dt ** 2
+
+        # --- 修正 (只观测位置) ---
+        s = pp + MEAS_NOISE ** 2
+        k_p, k_v = pp / s, pv / s
+        ex, ey = x - self.x, y - self.y
+        self.x += k_p * ex
+        self.y += k_p * ey
+        self.vx += k_v * ex
+        self.vy += k_v * ey
+        self.p_pp = (1 - k_p) * pp
+        self.p_pv = (1 - k_p) * pv
+        self.p_vv = vv - k_v * pv
+
+    def velocity(self):
+        return self.vx, self.vy
+
+    def position_at(self, dt):
+        """dt 秒后的位置 (按摩擦模型外推)"""
+        g = (1.0 - math.exp(-ROLL_DAMPING * dt)) / ROLL_DAMPING
+        return self.x + g * self.vx, self.y + g * self.vy
+
+    def intercept(self, line_x):
+        """
+        球到达竖线 x = line_x 时的 (y, 到达时间)。
+        球没在动 / 往反方向滚 / 在到达前就停下 / 超过 MAX_HORIZON 时返回 None。
+        """
+        if self.count == 0 or math.hypot(self.vx, self.vy) < MIN_SPEED: return None
+        dx = line_x - self.x
+        if dx * self.vx <= 0: return None
+        # x(t) - x0 = vx * (1 - e^{-ct}) / c  =>  1 - e^{-ct} = dx * c / vx
+        frac = dx * ROLL_DAMPING / self.vx
+        if frac >= 1.0: return None
+        tta = -math.log(1.0 - frac) / ROLL_DAMPING
+        if tta > MAX_HORIZON: return None
+        return self.y + self.vy * frac / ROLL_DAMPING, tta
@@ -0,0 +1,92 @@
+import math
+import os
+
+# ================= 滞回参数 =================
+TURN_EXIT_RATIO = 0.5     # 已经在转身时，朝向误差降到 进入阈值 × 这个比例 以下才停 (进入阈值见 action_to_target)
+FLIP_MARGIN = 0.5         # 误差在 ±π 附近 (差 FLIP_MARGIN 以内) 时保持原来的转向，不左右来回换
+FWD_ENTER = 0.15          # 离目标超过此距离 (m) 开始直行
+FWD_EXIT = 0.10           # 已经在直行时，离目标小于此距离才停
+SIDE_ENTER = 0.05         # 横向偏差超过此值 (m) 开始侧移
+SIDE_EXIT = 0.03          # 已经在侧移时，横向偏差小于此值才停
+# 每类指令最短保持时间 (秒)，期间换成别的移动指令会被挡住 (Player 每换一个动作都要从头播放)
+MIN_DWELL = {"TURN": 0.5, "FWD": 0.5, "SIDE": 0.5, "STOP": 0.0}
+# 原子动作永远不挡 (踢球时机很关键)，也不受上一条指令的保持时间限制
+ATOMIC_CMDS = ("KICK_L", "KICK_R")
+
+
+def filter_enabled_from_env():
+    """NAO_CMD_FILTER: 1 开启指令滞回，默认关闭 (固定阈值；还没在 Webots 里量过效果)"""
+    return os.environ.get("NAO_CMD_FILTER", "0").strip() not in ("", "0")
+
+
+def cmd_class(cmd):
+    if cmd in ("TURN_L", "TURN_R"): return "TURN"
+    if cmd in ("SIDE_L", "SIDE_R"): return "SIDE"
+    return cmd
+
+
+# ===== action_to_target 里的阈值 (hyst 为 None 时就是原来的固定阈值) =====
+def turn_limit(threshold, hyst):
+    if hyst is not None and hyst.cmd in ("TURN_L", "TURN_R"): return threshold * TURN_EXIT_RATIO
+    return threshold
+
+def turn_cmd(err, hyst):
+    if hyst is not None and hyst.cmd in ("TURN_L", "TURN_R") and abs(err) > math.pi - FLIP_MARGIN:
+        return hyst.cmd
+    return "TURN_L" if err > 0 else "TURN_R"
+
+def fwd_limit(hyst):
+    return FWD_EXIT if hyst is not None and hyst.cmd == "FWD" else FWD_ENTER
+
+def side_limit(cmd, hyst):
+    return SIDE_EXIT if hyst is not None and hyst.cmd == cmd else SIDE_ENTER
+
+
+class CmdState:
+    """
+    一个机器人的指令滞回状态: 最近一次输出的指令和它开始的时间。
+    action_to_target 按它选进入 / 退出阈值；filter() 在策略出结果之后挡住保持时间不够的切换。
+    """
+
+    def __init__(self):
+        self.cmd = "STOP"
+        self.since = -math.inf
+        self.stats = {"switches": 0, "prevented": 0}
+
+    def reset(self):
+        """动作被打断 (摔倒起身) 后从头开始"""
+        self.cmd = "STOP"
+        self.since = -math.inf
+
+    def filter(self, cmd, now):
+        """策略给出的指令 -> 实际发出的指令"""
+        if cmd == self.cmd: return cmd
+        if cmd not in ATOMIC_CMDS and self.cmd not in ATOMIC_CMDS:
+            if now - self.since < MIN_DWELL.get(cmd_class(self.cmd), 0.0):
+                self.stats["prevented"] += 1
+                return self.cmd
+        self.cmd = cmd
+        self.since = now
+        self.stats["switches"] += 1
+        return cmd
+
+
+class CommandFilter:
+    """Supervisor / 回放持有: 每个机器人一个 CmdState"""
+
+    def __init__(self, n_robots, enabled=None):
+        self.enabled = filter_enabled_from_env() if enabled is None else enabled
+        self.states = [CmdState() for _ in range(n_robots)]
+
+    def state(self, slot):
+        """关闭时返回 None (策略用固定阈值，不做保持)"""
+        return self.states[slot] if self.enabled else None
+
+    def reset(self, slot):
+        self.states[slot].reset()
+
+    def stats(self):
+        out = {"switches": 0, "prevented": 0}
+        for st in self.states:
+            for k, v in st.stats.items(): out[k] += v
+        return out
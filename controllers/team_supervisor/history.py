@@ -0,0 +1,108 @@
+import numpy as np
+
+# ================= 历史参数 =================
+HISTORY_SIZE = 32         # 每个实体保留最近多少个 tick 的位置
+FIT_WINDOW = 8            # 估计速度 / 加速度用最近多少个点 (约 0.25 s)
+RESET_JUMP = 1.0          # 相邻两 tick 跳变超过此距离视为瞬移 (进球重置 / 手动摆放)，该实体历史清空
+OBSTACLE_LOOKAHEAD = 0.5  # 避障时把其他机器人外推多少秒 (0 = 按当前位置，原来的行为)
+
+
+class WorldHistory:
+    """
+    所有实体 (8 个机器人 + 球) 最近 HISTORY_SIZE 个 tick 的位置，预分配的 numpy 环形缓冲区。
+    实体编号: 0..n-1 为机器人槽位 (与 WorldSnapshot 一致)，n (= self.ball) 为球。
+    push() 每 tick 一次，O(1)，不增长任何列表；
+    速度 / 加速度用最近 FIT_WINDOW 个点做二次最小二乘拟合，所有实体一次解出，每 tick 最多算一次 (缓存)。
+    """
+
+    def __init__(self, n_robots, size=HISTORY_SIZE, window=FIT_WINDOW):
+        self.n_robots = n_robots
+        self.ball = n_robots
+        self.size = size
+        self.window = min(window, size)
+        self.t = np.zeros(size)
+        self.pos = np.zeros((size, n_robots + 1, 2))
+        self.head = 0    # 下一个写入位置
+        self.count = 0
+        self._fit = None # (velocity, acceleration) 缓存，push 时失效
+        self._tau = None # 上次拟合用的相对时间及其伪逆: tick 间隔不变时直接复用
+        self._pinv = None
+
+    def __len__(self):
+        return self.count
+
+    def push(self, t, robot_pos, ball):
+        i = self.head
+        self.t[i] = t
+        self.pos[i, :self.n_robots] = robot_pos
+        self.pos[i, self.ball] = ball
+        if self.count:
+            # 瞬移的实体: 整列填成新位置，速度从 0 重新估计
+            prev = self.pos[(i - 1) % self.size]
+            jump = np.hypot(*(self.pos[i] - prev).T) > RESET_JUMP
+            if jump.any(): self.pos[:, jump] = self.pos[i, jump]
+        self.head = (i + 1) % self.size
+        if self.count < self.size: self.count += 1
+        self._fit = None
+
+    def latest(self):
+        """最新一帧所有实体的位置 (E, 2)，只读视图"""
+        return self.pos[(self.head - 1) % self.size]
+
+    def track(self, e):
+        """实体 e 的历史 (t, xy)，按时间顺序 (拷贝)"""
+        idx = np.arange(self.head - self.count, self.head) % self.size
+        return self.t[idx], self.pos[idx, e]
+
+    def fit(self):
+        """
+        最近 window 个点拟合 p(tau) = p0 + v * tau + a * tau^2 / 2 (tau 相对最新一帧)，
+        返回 (速度 (E, 2), 加速度 (E, 2))。点数不够时退化为差分 / 0。
+        """
+        if self._fit is not None: return self._fit
+        n = min(self.count, self.window)
+        shape = self.pos.shape[1:]
+        if n < 2:
+            self._fit = (np.zeros(shape), np.zeros(shape))
+            return self._fit
+        idx = np.arange(self.head - n, self.head) % self.size
+        tau = self.t[idx] - self.t[idx[-1]]
+        y = self.pos[idx].reshape(n, -1)
+        if n < 3:
+            dt = tau[-1] - tau[0]
+            vel = (y[-1] - y[0]) / dt if dt > 0 else np.zeros_like(y[0])
+            self._fit = (vel.reshape(shape), np.zeros(shape))
+            return self._fit
+        if self._tau is None or len(self._tau) != n or np.abs(self._tau - tau).max() > 1e-9:
+            a = np.stack([np.ones(n), tau, 0.5 * tau * tau], axis=1)
+            self._tau, self._pinv = tau, np.linalg.pinv(a)
+        coef = self._pinv @ y
+        self._fit = (coef[1].reshape(shape), coef[2].reshape(shape))
+        return self._fit
+
+    def velocity(self):
+        return self.fit()[0]
+
+    def acceleration(self):
+        return self.fit()[1]
+
+    def extrapolate(self, dt, use_accel=False):
+        """所有实体 dt 秒后的位置 (E, 2)；默认只用速度 (加速度噪声大，外推久了会发散)"""
+        vel, acc = self.fit()
+        out = self.latest() + vel * dt
+        if use_accel: out += 0.5 * dt * dt * acc
+        return out
+
+    def robot_positions_ahead(self, dt=OBSTACLE_LOOKAHEAD):
+        """机器人 dt 秒后的位置 (n, 2)，用于避障"""
+        return self.extrapolate(dt)[:self.n_robots]
+
+    def observe(self, world, ball_pred=None, lookahead=OBSTACLE_LOOKAHEAD):
+        """
+        每个 tick 在世界快照定稿后 (进球重置之后) 调用一次:
+        快照进入历史，球预测器更新，快照里的避障障碍物换成 lookahead 秒后的外推位置。
+        Supervisor 和离线回放都走这里，保证两边的时序状态一致。
+        """
+        self.push(world.time, world.pos, world.ball)
+        if ball_pred is not None: ball_pred.update(world.time, *world.ball_xy())
+        if lookahead > 0: world.predict_obstacles(self.robot_positions_ahead(lookahead))
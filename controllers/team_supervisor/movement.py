@@ -1,5 +1,35 @@
 import math
-from utils import norm2, normalize, wrap_pi
+import numpy as np
+from utils import norm2, normalize, wrap_pi, norm2_arr, normalize_arr, wrap_pi_arr
+from planner import PLAN_MIN_DIST, segment_blocked
+from cmd_filter import turn_limit, turn_cmd, fwd_limit, side_limit
+
+AVOID_RADIUS = 0.5    
+REPULSION_FORCE = 0.8 
+
+def obstacle_vectors(my_x, my_y, obstacles, radius=None):
+    """
+    返回 (push, dist): push[k] = 我 - 障碍物k，dist[k] 为其长度。
+    如果障碍物集合就是以我为原点从快照距离矩阵中取出的 (ObstacleSet)，直接复用那一行；
+    给了 radius 且集合带空间哈希时，只返回附近格子里的障碍物 (radius 以内的一个不少)。
+    """
+    if getattr(obstacles, "origin", None) == (my_x, my_y):
+        idx = obstacles.near(my_x, my_y, radius) if radius is not None else None
+        if idx is None: return obstacles.push, obstacles.dist
+        return obstacles.push[idx].reshape(-1, 2), obstacles.dist[idx]
+    pos = np.asarray(obstacles, dtype=float).reshape(-1, 2)
+    push = np.array((my_x, my_y)) - pos
+    return push, np.hypot(push[:, 0], push[:, 1])
+
+def apf_repulsion(push, dist):
+    """向量化的斥力合力: 半径 AVOID_RADIUS 内的障碍物按距离线性衰减"""
+    if len(dist) == 0: return 0.0, 0.0
+    m = (dist < AVOID_RADIUS) & (dist > 0.01)
+    if not m.any(): return 0.0, 0.0
+    d = dist[m]
+    w = REPULSION_FORCE * (1.0 - d / AVOID_RADIUS) / d # 强度 / 距离 = 单位向量再乘强度
+    rep = (push[m] * w[:, None]).sum(axis=0)
+    return float(rep[0]), float(rep[1])
 
 # === 避障向量计算 (保持不变) ===
 def get_avoidance_heading(my_x, my_y, target_x, target_y, obstacles):
@@ -12,31 +42,26 @@ def get_avoidance_heading(my_x, my_y, target_x, target_y, obstacles):
 
     attr_x, attr_y = normalize(dx_goal, dy_goal)
 
-    # 计算斥力
-    rep_x, rep_y = 0.0, 0.0
-    AVOID_RADIUS = 0.5    
-    REPULSION_FORCE = 0.8 
-
-    for (ox, oy) in obstacles:
-        dist_obs = norm2(my_x - ox, my_y - oy)
-        if dist_obs < AVOID_RADIUS and dist_obs > 0.01:
-            push_x = my_x - ox
-            push_y = my_y - oy
-            strength = REPULSION_FORCE * (1.0 - dist_obs / AVOID_RADIUS)
-            px, py = normalize(push_x, push_y)
-            rep_x += px * strength
-            rep_y += py * strength
+    # 计算斥力 (所有障碍物一次性在 numpy 里求和)
+    rep_x, rep_y = apf_repulsion(*obstacle_vectors(my_x, my_y, obstacles, AVOID_RADIUS))
 
     final_x = attr_x + rep_x
     final_y = attr_y + rep_y
     return math.atan2(final_y, final_x)
 
 # === 生成移动指令 (调整了优先级顺序) ===
-def action_to_target(my_x, my_y, my_theta, tx, ty, face_theta, obstacles, use_avoidance=True, is_dribbling=False, can_strafe=False):
+def action_to_target(my_x, my_y, my_theta, tx, ty, face_theta, obstacles, use_avoidance=True, is_dribbling=False, can_strafe=False, nav=None, hyst=None):
+    """hyst: 该机器人的 cmd_filter.CmdState (可选)，给了就按上一条指令用进入 / 退出两套阈值"""
     dist = norm2(tx - my_x, ty - my_y)
 
     # 1. 计算目标航向
-    if use_avoidance:
+    # 给了 nav (planner.NavState) 且直线被挡住时，朝全局规划路径上的航点走；否则照旧用势场
+    waypoint = None
+    if nav is not None and use_avoidance and dist > PLAN_MIN_DIST and segment_blocked(my_x, my_y, tx, ty, obstacles):
+        waypoint = nav.waypoint(my_x, my_y, tx, ty)
+    if waypoint is not None:
+        target_heading = math.atan2(waypoint[1] - my_y, waypoint[0] - my_x)
+    elif use_avoidance:
         target_heading = get_avoidance_heading(my_x, my_y, tx, ty, obstacles)
     else:
         target_heading = math.atan2(ty - my_y, tx - my_x)
@@ -62,12 +87,12 @@ def action_to_target(my_x, my_y, my_theta, tx, ty, face_theta, obstacles, use_av
 
     # 优先级 1: 转向逻辑 (Heading)
     # 必须最先判断：如果脸都没对准，往前走或者侧移都没意义，容易走偏
-    if abs(heading_err) > angle_threshold: 
-        return "TURN_L" if heading_err > 0 else "TURN_R"
+    if abs(heading_err) > turn_limit(angle_threshold, hyst): 
+        return turn_cmd(heading_err, hyst)
     
     # 优先级 2: 前进逻辑 (Forward)
     # 先大步流星走到目标附近。只要距离大于 15cm，就优先直走。
-    if dist > 0.15: 
+    if dist > fwd_limit(hyst): 
         return "FWD" 
 
     # 优先级 3: 侧移逻辑 (Strafing)
@@ -77,15 +102,76 @@ def action_to_target(my_x, my_y, my_theta, tx, ty, face_theta, obstacles, use_av
     
     if can_strafe and dist < STRAFE_LIMIT_DIST:
         # 此时已经很近了，如果发现左右还没对准 (偏差 > 5cm)，再用侧移微调
-        if local_y > 0.05:
+        if local_y > side_limit("SIDE_L", hyst):
             return "SIDE_L"
-        if local_y < -0.05:
+        if local_y < -side_limit("SIDE_R", hyst):
             return "SIDE_R"
 
     # 优先级 4: 原地调整朝向 (Facing)
     # 最后一步：位置都对准了，调整身体朝向（例如看向球）
     face_err = wrap_pi(face_theta - my_theta)
-    if abs(face_err) > angle_threshold: 
-        return "TURN_L" if face_err > 0 else "TURN_R"
+    if abs(face_err) > turn_limit(angle_threshold, hyst): 
+        return turn_cmd(face_err, hyst)
         
-    return "STOP"
\ No newline at end of file
+    return "STOP"
+
+# ===== 批量版本 (struct-of-arrays，逐行结果与上面的标量版本相同，不含 nav 规划) =====
+# 指令编码: 批量函数返回 CMD_NAMES 里的下标 (int8 数组)，cmd_names() 转回字符串
+CMD_NAMES = ("STOP", "FWD", "TURN_L", "TURN_R", "SIDE_L", "SIDE_R", "KICK_L")
+CMD_STOP, CMD_FWD, CMD_TURN_L, CMD_TURN_R, CMD_SIDE_L, CMD_SIDE_R, CMD_KICK_L = range(len(CMD_NAMES))
+_CMD_NAMES_ARR = np.array(CMD_NAMES)
+
+def cmd_names(codes):
+    return _CMD_NAMES_ARR[codes]
+
+def apf_repulsion_arr(my_x, my_y, obst_pos, obst_mask):
+    """
+    每行一个机器人: obst_pos (K, 2) 或 (N, K, 2)，obst_mask (N, K) 为该行的障碍物集合 (排除自己)。
+    按障碍物顺序逐个累加，与标量版 (只含生效的障碍物) 的求和顺序一致。
+    """
+    push_x = my_x[:, None] - obst_pos[..., 0]
+    push_y = my_y[:, None] - obst_pos[..., 1]
+    dist = np.hypot(push_x, push_y)
+    m = obst_mask & (dist < AVOID_RADIUS) & (dist > 0.01)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(m, REPULSION_FORCE * (1.0 - dist / AVOID_RADIUS) / dist, 0.0)
+    rep_x = np.zeros(len(my_x))
+    rep_y = np.zeros(len(my_x))
+    for k in np.flatnonzero(m.any(axis=0)):
+        mk = m[:, k]
+        rep_x[mk] += push_x[mk, k] * w[mk, k]
+        rep_y[mk] += push_y[mk, k] * w[mk, k]
+    return rep_x, rep_y
+
+def avoidance_heading_arr(my_x, my_y, target_x, target_y, obst_pos, obst_mask):
+    dx_goal = target_x - my_x
+    dy_goal = target_y - my_y
+    attr_x, attr_y = normalize_arr(dx_goal, dy_goal)
+    rep_x, rep_y = apf_repulsion_arr(my_x, my_y, obst_pos, obst_mask)
+    near = norm2_arr(dx_goal, dy_goal) < 0.2
+    return np.where(near, np.arctan2(dy_goal, dx_goal), np.arctan2(attr_y + rep_y, attr_x + rep_x))
+
+def action_to_target_arr(my_x, my_y, my_theta, tx, ty, face_theta, obst_pos, obst_mask,
+                         use_avoidance=True, is_dribbling=False, can_strafe=False):
+    """action_to_target 的批量版，返回指令编码数组"""
+    dist = norm2_arr(tx - my_x, ty - my_y)
+    if use_avoidance:
+        target_heading = avoidance_heading_arr(my_x, my_y, tx, ty, obst_pos, obst_mask)
+    else:
+        target_heading = np.arctan2(ty - my_y, tx - my_x)
+    heading_err = wrap_pi_arr(target_heading - my_theta)
+    local_y = -(tx - my_x) * np.sin(my_theta) + (ty - my_y) * np.cos(my_theta)
+    face_err = wrap_pi_arr(face_theta - my_theta)
+    angle_threshold = 0.20 if is_dribbling else 0.60
+
+    out = np.full(len(my_x), CMD_STOP, dtype=np.int8)
+    out[np.abs(face_err) > angle_threshold] = CMD_TURN_R
+    out[(np.abs(face_err) > angle_threshold) & (face_err > 0)] = CMD_TURN_L
+    if can_strafe:
+        close = dist < 0.4
+        out[close & (local_y < -0.05)] = CMD_SIDE_R
+        out[close & (local_y > 0.05)] = CMD_SIDE_L
+    out[dist > 0.15] = CMD_FWD
+    turn = np.abs(heading_err) > angle_threshold
+    out[turn] = np.where(heading_err[turn] > 0, CMD_TURN_L, CMD_TURN_R)
+    return out
@@ -0,0 +1,309 @@
+import heapq
+import math
+import numpy as np
+
+# ================= 栅格参数 =================
+GRID_RES = 0.2            # 栅格边长 (m)
+GRID_X = (-5.0, 5.0)      # 覆盖范围: 9x6 m 场地 + 场外一圈
+GRID_Y = (-3.6, 3.6)
+INFLATE = 0.35            # 每个机器人按这个半径膨胀成障碍 (两个机器人半径 + 余量)
+NEAR_CELLS = 3            # 变化的障碍格离缓存路径不超过这么多格才重新规划
+LOOKAHEAD_CELLS = 3       # 沿路径往前取第几个格子作为航点
+PLAN_MIN_DIST = 0.5       # 离目标比这近就不用规划器 (直接走)
+CLEARANCE = 0.3           # 直线路径上离障碍物比这近才算被挡住
+MAX_EXPAND = 4000         # 单次搜索最多展开的格子数 (防止卡住一个 tick)
+
+NX = int(round((GRID_X[1] - GRID_X[0]) / GRID_RES))
+NY = int(round((GRID_Y[1] - GRID_Y[0]) / GRID_RES))
+INF = float("inf")
+SQRT2 = math.sqrt(2.0)
+
+
+def to_cell(x, y):
+    ix = min(NX - 1, max(0, int((x - GRID_X[0]) / GRID_RES)))
+    iy = min(NY - 1, max(0, int((y - GRID_Y[0]) / GRID_RES)))
+    return iy * NX + ix
+
+
+def cell_center(c):
+    iy, ix = divmod(c, NX)
+    return GRID_X[0] + (ix + 0.5) * GRID_RES, GRID_Y[0] + (iy + 0.5) * GRID_RES
+
+
+def _build_neighbors():
+    """每个格子的 8 邻居及移动代价 (格子为单位)"""
+    out = []
+    for c in range(NX * NY):
+        iy, ix = divmod(c, NX)
+        nb = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                if dx == 0 and dy == 0: continue
+                jx, jy = ix + dx, iy + dy
+                if 0 <= jx < NX and 0 <= jy < NY:
+                    nb.append((jy * NX + jx, SQRT2 if dx and dy else 1.0))
+        out.append(nb)
+    return out
+
+
+NEIGHBORS = _build_neighbors()
+
+# 膨胀圆盘的格子偏移
+_R = int(math.ceil(INFLATE / GRID_RES))
+DISC = np.array([(dy, dx) for dy in range(-_R, _R + 1) for dx in range(-_R, _R + 1)
+                 if math.hypot(dx, dy) * GRID_RES <= INFLATE])
+
+
+def segment_blocked(x0, y0, x1, y1, obstacles, clearance=CLEARANCE):
+    """从 (x0, y0) 到 (x1, y1) 的直线是否从某个障碍物旁边 clearance 以内经过"""
+    pos = np.asarray(obstacles, dtype=float).reshape(-1, 2)
+    near = obstacles.near_segment(x0, y0, x1, y1, clearance) if hasattr(obstacles, "near_segment") else None
+    if near is not None: pos = pos[near]
+    if len(pos) == 0: return False
+    vx, vy = x1 - x0, y1 - y0
+    l2 = vx * vx + vy * vy
+    if l2 < 1e-12: return False
+    t = np.clip(((pos[:, 0] - x0) * vx + (pos[:, 1] - y0) * vy) / l2, 0.0, 1.0)
+    d = np.hypot(pos[:, 0] - (x0 + t * vx), pos[:, 1] - (y0 + t * vy))
+    return bool(np.any(d < clearance))
+
+
+class OccupancyGrid:
+    """
+    整个场地的占据栅格，每个 tick 由机器人位置重建一次 (懒: 第一次查询时才建)。
+    count[c] = 覆盖格子 c 的机器人个数；给某个机器人规划时把它自己的圆盘减掉。
+    """
+
+    def __init__(self, n_robots):
+        self.n = n_robots
+        self.count = np.zeros((NY, NX), dtype=np.int16)
+        self.cells = [None] * n_robots  # 每个机器人圆盘覆盖的格子 (iy, ix) 数组
+        self.world = None
+        self.dirty = True
+        self.cache = {}                 # slot -> 本 tick 的 blocked (flat bool)
+
+    def mark_dirty(self, world):
+        self.world = world
+        self.dirty = True
+        self.cache.clear()
+
+    def rebuild(self):
+        w = self.world
+        self.count.fill(0)
+        for j in range(self.n):
+            if not w.valid[j]:
+                self.cells[j] = None
+                continue
+            x, y = w.obst_pos[j]
+            ix = int((x - GRID_X[0]) / GRID_RES)
+            iy = int((y - GRID_Y[0]) / GRID_RES)
+            c = DISC + (iy, ix)
+            c = c[(c[:, 0] >= 0) & (c[:, 0] < NY) & (c[:, 1] >= 0) & (c[:, 1] < NX)]
+            self.cells[j] = c
+            np.add.at(self.count, (c[:, 0], c[:, 1]), 1)
+        self.dirty = False
+
+    def blocked_for(self, slot):
+        """slot 号机器人眼里的障碍格 (排除自己)，flat bool 数组"""
+        b = self.cache.get(slot)
+        if b is not None: return b
+        if self.dirty: self.rebuild()
+        count = self.count.copy()
+        own = self.cells[slot] if 0 <= slot < self.n else None
+        if own is not None: np.subtract.at(count, (own[:, 0], own[:, 1]), 1)
+        b = (count > 0).ravel()
+        self.cache[slot] = b
+        return b
+
+
+class DStarLite:
+    """
+    D* Lite (Koenig & Likhachev) 在 8 邻接栅格上的增量搜索，从目标往起点搜。
+    进入障碍格的代价为无穷 (离开不受限，所以起点在别人膨胀圈里也能出来)；目标格总是可达。
+    """
+
+    def __init__(self):
+        n = NX * NY
+        self.g = [INF] * n
+        self.rhs = [INF] * n
+        self.blocked = [False] * n
+        self.queue = []
+        self.qkey = {}
+        self.km = 0.0
+        self.start = self.goal = None
+
+    def h(self, a, b):
+        ay, ax = divmod(a, NX)
+        by, bx = divmod(b, NX)
+        dx, dy = abs(ax - bx), abs(ay - by)
+        return (dx + dy) + (SQRT2 - 2.0) * min(dx, dy)
+
+    def key(self, u):
+        m = min(self.g[u], self.rhs[u])
+        return (m + self.h(self.start, u) + self.km, m)
+
+    def reset(self, start, goal, blocked):
+        n = NX * NY
+        self.g = [INF] * n
+        self.rhs = [INF] * n
+        self.blocked = blocked
+        self.blocked[goal] = False
+        self.queue = []
+        self.qkey = {}
+        self.km = 0.0
+        self.start, self.goal = start, goal
+        self.rhs[goal] = 0.0
+        self._push(goal)
+
+    def _push(self, u):
+        k = self.key(u)
+        self.qkey[u] = k
+        heapq.heappush(self.queue, (k, u))
+
+    def update_vertex(self, u):
+        g, blocked = self.g, self.blocked
+        if u != self.goal:
+            best = INF
+            for s, c in NEIGHBORS[u]:
+                if blocked[s]: continue
+                v = c + g[s]
+                if v < best: best = v
+            self.rhs[u] = best
+        if g[u] != self.rhs[u]: self._push(u)
+        else: self.qkey.pop(u, None)
+
+    def compute(self):
+        """返回展开的格子数"""
+        g, rhs, queue, qkey = self.g, self.rhs, self.queue, self.qkey
+        start = self.start
+        expanded = 0
+        while queue and expanded < MAX_EXPAND:
+            k_old, u = queue[0]
+            if qkey.get(u) != k_old:
+                heapq.heappop(queue)
+                continue
+            if not (k_old < self.key(start) or rhs[start] != g[start]): break
+            heapq.heappop(queue)
+            del qkey[u]
+            expanded += 1
+            k_new = self.key(u)
+            if k_old < k_new:
+                self._push(u)
+            elif g[u] > rhs[u]:
+                g[u] = rhs[u]
+                for p, _c in NEIGHBORS[u]: self.update_vertex(p)
+            else:
+                g[u] = INF
+                self.update_vertex(u)
+                for p, _c in NEIGHBORS[u]: self.update_vertex(p)
+        return expanded
+
+    def move_start(self, start):
+        self.km += self.h(self.start, start)
+        self.start = start
+
+    def set_blocked(self, cells, blocked):
+        """障碍格发生变化: 进入这些格子的边的代价变了，更新它们的邻居"""
+        for c in cells:
+            if c == self.goal: continue
+            self.blocked[c] = bool(blocked[c])
+        for c in cells:
+            for p, _c in NEIGHBORS[c]: self.update_vertex(p)
+
+    def path(self, max_len=200):
+        """从起点沿 g 值下降方向走到目标，走不通返回 None"""
+        u = self.start
+        if self.g[u] == INF: return None
+        out = [u]
+        g, blocked = self.g, self.blocked
+        while u != self.goal and len(out) < max_len:
+            best, nxt = INF, None
+            for s, c in NEIGHBORS[u]:
+                if blocked[s]: continue
+                v = c + g[s]
+                if v < best: best, nxt = v, s
+            if nxt is None or best == INF: return None
+            u = nxt
+            out.append(u)
+        return out
+
+
+class NavState:
+    """
+    单个机器人的导航状态: 自己的 D* Lite 搜索 + 缓存路径。
+    目标格变化 -> 重新搜索；缓存路径附近的障碍格变化 -> 增量修复；其他情况直接沿缓存路径走。
+    """
+
+    def __init__(self, grid, slot):
+        self.grid = grid
+        self.slot = slot
+        self.dstar = DStarLite()
+        self.known = None   # 搜索里用的障碍格 (flat bool)
+        self.path = None
+        self.stats = {"plans": 0, "repairs": 0, "reused": 0, "failed": 0}
+
+    def _near_path(self, changed):
+        p = np.array(self.path)
+        cy, cx = np.divmod(changed, NX)
+        py, px = np.divmod(p, NX)
+        d = np.maximum(np.abs(cy[:, None] - py[None, :]), np.abs(cx[:, None] - px[None, :]))
+        return bool((d <= NEAR_CELLS).any())
+
+    def waypoint(self, my_x, my_y, tx, ty):
+        """沿规划路径往前 LOOKAHEAD_CELLS 格的航点 (世界坐标)，规划失败返回 None"""
+        start, goal = to_cell(my_x, my_y), to_cell(tx, ty)
+        blocked = self.grid.blocked_for(self.slot)
+        ds = self.dstar
+
+        if self.path is None or ds.goal != goal:
+            self.known = blocked.copy()
+            ds.reset(start, goal, self.known.tolist())
+            ds.compute()
+            self.stats["plans"] += 1
+            self.path = ds.path()
+        else:
+            changed = np.flatnonzero(blocked != self.known)
+            if start != ds.start:
+                ds.move_start(start)
+            if changed.size and self._near_path(changed):
+                self.known = blocked.copy()
+                ds.set_blocked(changed.tolist(), self.known)
+                ds.compute()
+                self.stats["repairs"] += 1
+                self.path = ds.path()
+            elif start in self.path:
+                self.path = self.path[self.path.index(start):]
+                self.stats["reused"] += 1
+            else:
+                # 偏离了路径: g 值仍然有效，补算一下起点附近即可
+                ds.compute()
+                self.stats["repairs"] += 1
+                self.path = ds.path()
+
+        if not self.path:
+            self.path = None
+            self.stats["failed"] += 1
+            return None
+        if len(self.path) <= LOOKAHEAD_CELLS + 1: return tx, ty
+        return cell_center(self.path[LOOKAHEAD_CELLS])
+
+
+class Navigator:
+    """Supervisor / 回放持有: 一个共享栅格 + 每个机器人一个 NavState"""
+
+    def __init__(self, n_robots):
+        self.grid = OccupancyGrid(n_robots)
+        self.states = [NavState(self.grid, s) for s in range(n_robots)]
+
+    def update(self, world):
+        """每个 tick 快照定稿后调用 (栅格在第一次规划时才重建)"""
+        self.grid.mark_dirty(world)
+
+    def state(self, slot):
+        return self.states[slot]
+
+    def stats(self):
+        out = {"plans": 0, "repairs": 0, "reused": 0, "failed": 0}
+        for st in self.states:
+            for k, v in st.stats.items(): out[k] += v
+        return out
@@ -0,0 +1,52 @@
+import time
+
+
+class TickProfiler:
+    """
+    每个 tick 各阶段的耗时。begin() 在 tick 开始时调用，之后每段结束时 mark(名字)，
+    记录的是距上一次 begin / mark 的时间；end() 结束这个 tick。
+    report() 返回上次 report 以来每段的 平均 / 最大 (微秒)，然后清零。
+    """
+
+    def __init__(self):
+        self.order = []
+        self.total = {}
+        self.peak = {}
+        self.ticks = 0
+        self._last = None
+        self._tick_total = 0.0
+        self.tick_peak = 0.0
+
+    def begin(self):
+        self._last = time.perf_counter()
+        self._tick_total = 0.0
+
+    def mark(self, name):
+        now = time.perf_counter()
+        dt = now - self._last
+        self._last = now
+        self._tick_total += dt
+        if name not in self.total:
+            self.order.append(name)
+            self.total[name] = 0.0
+            self.peak[name] = 0.0
+        self.total[name] += dt
+        if dt > self.peak[name]: self.peak[name] = dt
+
+    def end(self):
+        self.ticks += 1
+        if self._tick_total > self.tick_peak: self.tick_peak = self._tick_total
+
+    def report(self):
+        """'名字=平均/最大 ...' (微秒 / tick)，没有数据返回空串"""
+        if not self.ticks: return ""
+        n = self.ticks
+        parts = [f"{k}={1e6 * self.total[k] / n:.0f}/{1e6 * self.peak[k]:.0f}" for k in self.order]
+        total = sum(self.total.values())
+        parts.append(f"total={1e6 * total / n:.0f}/{1e6 * self.tick_peak:.0f}")
+        for k in self.order:
+            self.total[k] = 0.0
+            self.peak[k] = 0.0
+        self.ticks = 0
+        self.tick_peak = 0.0
+        return " ".join(parts)
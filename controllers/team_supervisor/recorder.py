@@ -0,0 +1,141 @@
+"""
+比赛录像: 每个 tick 的世界状态写进一个预分配的 numpy 结构化数组, 数组直接 memmap 到 .npy 文件。
+
+- 写入只追加, 每 tick O(1), 循环里不分配新数组 (按列视图原地赋值)
+- 旁边的 .json 记录已写入的条数和元数据 (机器人 ID、TIME_STEP、命名空间 ...)
+- 离线分析用 load_match(), np.load(mmap_mode="r") 零拷贝读取
+
+开启方式: NAO_RECORD=<目录或 .npy 路径>, 容量 NAO_RECORD_TICKS (默认 131072 tick, 约 70 分钟仿真)
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1 << 17
+NO_CMD = 0xFF        # 本 tick 没有给该机器人下指令
+NO_ROLE = 0xFF       # 没有分配角色 (不在场)
+FLUSH_PERIOD = 1000  # 每隔多少 tick 刷一次盘 + 更新 .json 里的条数
+
+
+def record_dtype(n_slots):
+    """一条记录 = 一个 tick; 坐标用 float64, 回放时策略函数能得到和比赛中完全一样的输入"""
+    return np.dtype([
+        ("t", "f8"),                      # 仿真时间 (秒)
+        ("tick", "i4"),                   # 比赛 tick (game_steps)
+        ("ball", "f8", (2,)),
+        ("pos", "f8", (n_slots, 2)),
+        ("heading", "f8", (n_slots,)),
+        ("z_axis", "f8", (n_slots, 3)),
+        ("valid", "?", (n_slots,)),
+        ("cmd", "u1", (n_slots,)),        # 本 tick 要求的指令 opcode (protocol.Op, 含 INTERRUPT 位), NO_CMD = 无
+        ("decided", "?", (n_slots,)),     # 本 tick 是否真正跑了策略 (否则是复用 / 忙碌)
+        ("role", "u1", (n_slots,)),       # 本 tick 的角色 (tactics.ROLES 里的下标), NO_ROLE = 无
+        ("busy", "?", (n_slots,)),
+        ("recovering", "?", (n_slots,)),
+        ("fall_count", "u2", (n_slots,)),
+        ("score", "u2", (2,)),            # 蓝, 红
+    ])
+
+
+def record_path_from_env(namespace=0):
+    """NAO_RECORD 是目录时自动生成文件名; 没设置返回 None (不录)"""
+    path = os.environ.get("NAO_RECORD", "").strip()
+    if not path: return None
+    if path.endswith(".npy"): return path
+    os.makedirs(path, exist_ok=True)
+    return os.path.join(path, f"match_ns{namespace}_{time.strftime('%Y%m%d_%H%M%S')}.npy")
+
+
+def capacity_from_env():
+    try:
+        return max(1, int(os.environ.get("NAO_RECORD_TICKS", DEFAULT_CAPACITY)))
+    except ValueError:
+        return DEFAULT_CAPACITY
+
+
+def meta_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+class MatchRecorder:
+    def __init__(self, path, n_slots, capacity=None, meta=None):
+        self.path = path
+        self.capacity = capacity or capacity_from_env()
+        self.meta = dict(meta or {})
+        self.count = 0
+        self.full = False
+        self.data = np.lib.format.open_memmap(path, mode="w+", dtype=record_dtype(n_slots),
+                                              shape=(self.capacity,))
+        # 按列取视图, 写入时只是往已有内存里赋值
+        self.c = {name: self.data[name] for name in self.data.dtype.names}
+        self.cmd = np.full(n_slots, NO_CMD, dtype=np.uint8) # 本 tick 的指令, Supervisor 在 send_cmd 里填
+        self.role = np.full(n_slots, NO_ROLE, dtype=np.uint8) # 当前角色, 换角色时更新, 跨 tick 保持
+        self.write_meta()
+
+    def set_cmd(self, slot, op):
+        self.cmd[slot] = op
+
+    def set_role(self, slot, index):
+        self.role[slot] = index
+
+    def write(self, tick, world, last_decision, sched_tick, busy, recovering, fall_count, slot_ids, score):
+        """
+        追加一条记录。busy / recovering / fall_count 是 Supervisor 里按机器人 ID 的字典,
+        last_decision 是调度器里每个槽位最近一次决策的 tick (等于 sched_tick 即本 tick 跑了策略)。
+        写满后静默停止 (只提示一次)。
+        """
+        i = self.count
+        if i >= self.capacity:
+            if not self.full: print(f"[REC] {self.path} full ({self.capacity} ticks), recording stopped")
+            self.full = True
+            return
+        c = self.c
+        c["t"][i] = world.time
+        c["tick"][i] = tick
+        c["ball"][i] = world.ball
+        c["pos"][i] = world.pos
+        c["heading"][i] = world.heading
+        c["z_axis"][i] = world.z_axis
+        c["valid"][i] = world.valid
+        c["cmd"][i] = self.cmd
+        np.equal(last_decision, sched_tick, out=c["decided"][i])
+        c["role"][i] = self.role
+        for s, rid in enumerate(slot_ids):
+            if rid not in busy: continue
+            c["busy"][i, s] = busy[rid]
+            c["recovering"][i, s] = recovering[rid]
+            c["fall_count"][i, s] = fall_count[rid]
+        c["score"][i] = score
+        self.cmd.fill(NO_CMD)
+        self.count = i + 1
+        if self.count % FLUSH_PERIOD == 0: self.flush()
+
+    def write_meta(self):
+        meta = dict(self.meta, count=self.count, capacity=self.capacity,
+                    dtype=self.data.dtype.descr)
+        tmp = meta_path(self.path) + ".tmp"
+        with open(tmp, "w") as f: json.dump(meta, f)
+        os.replace(tmp, meta_path(self.path))
+
+    def flush(self):
+        self.data.flush()
+        self.write_meta()
+
+    def close(self):
+        if self.data is None: return
+        self.flush()
+        print(f"[REC] {self.count} ticks -> {self.path}")
+        self.data = None
+        self.c = None
+
+
+def load_match(path):
+    """
+    读取一场录像: 返回 (records, meta)。
+    records 是 memmap 上的切片 (只读, 零拷贝), 只包含已写入的 meta["count"] 条。
+    """
+    with open(meta_path(path)) as f: meta = json.load(f)
+    data = np.load(path, mmap_mode="r")
+    return data[:meta["count"]], meta
@@ -0,0 +1,77 @@
+import os
+import numpy as np
+
+# ================= 触发阈值 =================
+BALL_MOVE_THRESH = 0.05    # 球移动超过此距离 (m) 重新决策
+ROBOT_MOVE_THRESH = 0.05   # 机器人移动超过此距离 (m)
+ROBOT_TURN_THRESH = 0.10   # 机器人转动超过此角度 (rad)，TURN 时靠它及时停下
+DEFAULT_MAX_PERIOD = 6     # 最长多少个 tick 必须重新决策一次
+
+
+def max_period_from_env():
+    """NAO_DECISION_PERIOD: 最长决策周期 (tick)，1 表示每个 tick 都重新计算 (原来的行为)"""
+    try:
+        return max(1, int(os.environ.get("NAO_DECISION_PERIOD", DEFAULT_MAX_PERIOD)))
+    except ValueError:
+        return DEFAULT_MAX_PERIOD
+
+
+class DecisionScheduler:
+    """
+    事件驱动 + 降频的决策调度器。
+    某个机器人只有在以下情况之一发生时才重新跑策略函数:
+      1. 收到它的 DONE
+      2. 球 / 它自己移动 (或转动) 超过阈值
+      3. 距离上次决策超过 max_period 个 tick
+    其余 tick 直接复用上次的指令 (send_cmd 会把没变化的移动指令抑制掉)。
+    """
+
+    def __init__(self, n_slots, max_period=None):
+        self.max_period = max_period or max_period_from_env()
+        self.last_tick = np.full(n_slots, -10**9, dtype=np.int64)
+        self.last_pos = np.zeros((n_slots, 2))
+        self.last_heading = np.zeros(n_slots)
+        self.last_ball = np.zeros((n_slots, 2))
+        self.done = np.zeros(n_slots, dtype=bool)
+        self.cmds = ["STOP"] * n_slots
+        self.stats = {"run": 0, "reused": 0, "skipped_busy": 0}
+
+    def notify_done(self, slot):
+        self.done[slot] = True
+
+    def invalidate(self, slot):
+        """上次的决策作废 (例如换了角色)，本 tick 必须重新决策"""
+        self.done[slot] = True
+
+    def due(self, tick, world):
+        """一次性算出本 tick 所有槽位是否需要重新决策 (bool 数组)"""
+        moved = np.hypot(*(world.pos - self.last_pos).T) > ROBOT_MOVE_THRESH
+        dh = np.abs((world.heading - self.last_heading + np.pi) % (2 * np.pi) - np.pi)
+        turned = dh > ROBOT_TURN_THRESH
+        ball_moved = np.hypot(*(world.ball[None, :] - self.last_ball).T) > BALL_MOVE_THRESH
+        expired = (tick - self.last_tick) >= self.max_period
+        return self.done | moved | turned | ball_moved | expired
+
+    def commit(self, slot, tick, world, cmd):
+        """记录一次真正的决策"""
+        self.cmds[slot] = cmd
+        self.last_tick[slot] = tick
+        self.last_pos[slot] = world.pos[slot]
+        self.last_heading[slot] = world.heading[slot]
+        self.last_ball[slot] = world.ball
+        self.done[slot] = False
+        self.stats["run"] += 1
+
+    def reuse(self, slot):
+        self.stats["reused"] += 1
+        return self.cmds[slot]
+
+    def skip_busy(self, slot):
+        """忙碌 / 起身中的机器人: 策略完全不跑，下次空闲时立即重新决策"""
+        self.stats["skipped_busy"] += 1
+        self.last_tick[slot] = -10**9
+
+    def avoided_ratio(self):
+        st = self.stats
+        total = st["run"] + st["reused"] + st["skipped_busy"]
+        return (st["reused"] + st["skipped_busy"]) / total if total else 0.0
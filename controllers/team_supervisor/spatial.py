@@ -0,0 +1,143 @@
+import math
+import numpy as np
+
+# ================= 空间哈希参数 =================
+CELL_SIZE = 0.5           # 格子边长 (m)，与避障半径同量级
+HASH_X = (-5.0, 5.0)      # 覆盖范围，范围外的点归到边上的格子 (查询时边格视为无限延伸)
+HASH_Y = (-3.5, 3.5)
+
+
+class SpatialHash:
+    """
+    场地上的均匀网格空间哈希，每个 tick 由障碍物坐标重建一次。
+    点按 (行, 列) 排序后存成一个列表，同一行的格子是连续的一段，
+    所以一次查询只需要对涉及的每一行取一个切片。
+
+    candidates_*() 返回候选下标列表 (按编号升序，是真实结果的超集，只涉及附近的格子)，
+    调用方在候选上套用自己原来的精确判断，结果与全量线性扫描完全一致；
+    query_*() 是套好精确判断的版本 (numpy 数组)。
+    同一个 tick 里很多机器人会问同一条线段 (球 -> 球门)，线段查询按参数缓存到下一次 build。
+    """
+
+    def __init__(self, cell=CELL_SIZE, x_range=HASH_X, y_range=HASH_Y):
+        self.cell = cell
+        self.x0, self.y0 = x_range[0], y_range[0]
+        self.nx = max(1, int(math.ceil((x_range[1] - x_range[0]) / cell)))
+        self.ny = max(1, int(math.ceil((y_range[1] - y_range[0]) / cell)))
+        self.pos = np.zeros((0, 2))
+        self.items = []
+        self.start = [0] * (self.nx * self.ny + 1)
+        self._seg_cache = {}
+
+    def _col(self, x):
+        return min(self.nx - 1, max(0, int(math.floor((x - self.x0) / self.cell))))
+
+    def _row(self, y):
+        return min(self.ny - 1, max(0, int(math.floor((y - self.y0) / self.cell))))
+
+    def build(self, pos, valid=None):
+        """pos (n, 2)；valid 为 False 的点不进哈希"""
+        self.pos = pos
+        ids = np.arange(len(pos)) if valid is None else np.flatnonzero(valid)
+        p = pos[ids]
+        ix = np.clip(np.floor((p[:, 0] - self.x0) / self.cell), 0, self.nx - 1).astype(np.int64)
+        iy = np.clip(np.floor((p[:, 1] - self.y0) / self.cell), 0, self.ny - 1).astype(np.int64)
+        key = iy * self.nx + ix
+        order = np.argsort(key, kind="stable")
+        self.items = ids[order].tolist()
+        self.start = np.searchsorted(key[order], np.arange(self.nx * self.ny + 1)).tolist()
+        self._seg_cache.clear()
+        return self
+
+    def _rows(self, iy0, iy1, ranges):
+        """ranges(iy) -> (ix0, ix1) 或 None；收集这些行里对应列区间的点，升序返回"""
+        out = []
+        items, start, nx = self.items, self.start, self.nx
+        for iy in range(iy0, iy1 + 1):
+            r = ranges(iy)
+            if r is None: continue
+            a = start[iy * nx + r[0]]
+            b = start[iy * nx + r[1] + 1]
+            if a < b: out.extend(items[a:b])
+        out.sort()
+        return out
+
+    def candidates_radius(self, x, y, r):
+        """可能在 (x, y) 半径 r 以内的点"""
+        ix0, ix1 = self._col(x - r), self._col(x + r)
+        return self._rows(self._row(y - r), self._row(y + r), lambda iy: (ix0, ix1))
+
+    def candidates_segment(self, x0, y0, x1, y1, r):
+        """可能在线段 (x0, y0)-(x1, y1) 距离 r 以内的点: 每一行只取线段在该行 (上下各扩 r) 内那一截的 x 范围 ± r"""
+        key = (x0, y0, x1, y1, r)
+        hit = self._seg_cache.get(key)
+        if hit is not None: return hit
+        cell, oy, ny = self.cell, self.y0, self.ny
+
+        def ranges(iy):
+            lo = -math.inf if iy == 0 else oy + iy * cell - r
+            hi = math.inf if iy == ny - 1 else oy + (iy + 1) * cell + r
+            if y0 == y1:
+                if not lo <= y0 <= hi: return None
+                xa, xb = x0, x1
+            else:
+                ta, tb = (lo - y0) / (y1 - y0), (hi - y0) / (y1 - y0)
+                if ta > tb: ta, tb = tb, ta
+                ta, tb = max(ta, 0.0), min(tb, 1.0)
+                if ta > tb: return None
+                xa, xb = x0 + ta * (x1 - x0), x0 + tb * (x1 - x0)
+            if xa > xb: xa, xb = xb, xa
+            return self._col(xa - r), self._col(xb + r)
+
+        hit = self._rows(self._row(min(y0, y1) - r), self._row(max(y0, y1) + r), ranges)
+        self._seg_cache[key] = hit
+        return hit
+
+    def segment_blockers(self, x0, y0, x1, y1, r):
+        """挡住线段的点 (blocking_mask 判据，只在附近格子里算)，按参数缓存到下一次 build"""
+        key = ("blockers", x0, y0, x1, y1, r)
+        hit = self._seg_cache.get(key)
+        if hit is not None: return hit
+        c = self.candidates_segment(x0, y0, x1, y1, r)
+        if c:
+            c = np.array(c, dtype=np.int64)
+            hit = c[blocking_mask(self.pos[c], x0, y0, x1, y1, r)].tolist()
+        else:
+            hit = []
+        self._seg_cache[key] = hit
+        return hit
+
+    def query_radius(self, x, y, r):
+        """距离 (x, y) 小于 r 的点"""
+        c = np.array(self.candidates_radius(x, y, r), dtype=np.int64)
+        if len(c) == 0: return c
+        p = self.pos[c]
+        return c[np.hypot(p[:, 0] - x, p[:, 1] - y) < r]
+
+    def query_segment(self, x0, y0, x1, y1, r):
+        """到线段 (x0, y0)-(x1, y1) 的距离小于 r 的点"""
+        c = np.array(self.candidates_segment(x0, y0, x1, y1, r), dtype=np.int64)
+        if len(c) == 0: return c
+        return c[segment_distance(self.pos[c], x0, y0, x1, y1) < r]
+
+
+def segment_distance(pos, x0, y0, x1, y1):
+    """点集 pos (k, 2) 到线段的距离"""
+    vx, vy = x1 - x0, y1 - y0
+    l2 = vx * vx + vy * vy
+    if l2 < 1e-12: return np.hypot(pos[:, 0] - x0, pos[:, 1] - y0)
+    t = np.clip(((pos[:, 0] - x0) * vx + (pos[:, 1] - y0) * vy) / l2, 0.0, 1.0)
+    return np.hypot(pos[:, 0] - (x0 + t * vx), pos[:, 1] - (y0 + t * vy))
+
+
+def blocking_mask(pos, x0, y0, x1, y1, r):
+    """
+    pos 中哪些点挡住线段 (x0, y0)-(x1, y1): 投影落在线段内部 (0, 1) 且到直线的垂直距离 < r。
+    射门线检查的判据；逐元素计算，所以对全部点算和只对候选点算结果完全一样。
+    pos 可以是 (k, 2)，也可以是 (N, K, 2) 配 (N, 1) 的端点 (批量策略: 每行一条线)。
+    """
+    vx, vy = x1 - x0, y1 - y0
+    length = np.sqrt(vx * vx + vy * vy)
+    projection = ((pos[..., 0] - x0) * vx + (pos[..., 1] - y0) * vy) / (length * length)
+    dist_vertical = np.hypot(pos[..., 0] - (x0 + projection * vx), pos[..., 1] - (y0 + projection * vy))
+    return (projection > 0.0) & (projection < 1.0) & (dist_vertical < r)
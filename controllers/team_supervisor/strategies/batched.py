@@ -0,0 +1,134 @@
+"""
+各角色策略的批量版 (struct-of-arrays): 一次调用算一整队 / 两队 / 上千个离线仿真里的机器人。
+每行一个机器人，输入都是 numpy 数组 (标量会广播)，返回 movement.CMD_NAMES 的编码数组；
+逐行结果与 striker.py / goalie.py 里的标量版本 (nav=None) 相同。
+
+障碍物: obst_pos 为 (K, 2) (所有行共用，如快照里的全部机器人) 或 (N, K, 2)，
+obst_mask (N, K) 标出每行真正的障碍物 (排除自己)。
+"""
+import numpy as np
+from utils import norm2_arr, normalize_arr, wrap_pi_arr, clamp_arr
+from movement import action_to_target_arr, CMD_KICK_L, CMD_STOP
+from strategies.striker import AIM_SAMPLES, aim_points, sweep_aim_arr
+
+
+def _rows(n, v):
+    return np.broadcast_to(np.asarray(v, dtype=float), (n,))
+
+def _goal(n, goal_xy):
+    g = np.asarray(goal_xy, dtype=float)
+    if g.ndim == 1: return _rows(n, g[0]), _rows(n, g[1])
+    return g[:, 0], g[:, 1]
+
+def _take(idx, *arrays):
+    return [a[idx] for a in arrays]
+
+def _obst(idx, obst_pos, obst_mask):
+    return (obst_pos if obst_pos.ndim == 2 else obst_pos[idx]), obst_mask[idx]
+
+
+# === 前锋 (Striker) ===
+def run_striker_arr(my_x, my_y, my_theta, bx, by, goal_target_xy, obst_pos, obst_mask):
+    n = len(my_x)
+    bx, by = _rows(n, bx), _rows(n, by)
+    gx, gy = _goal(n, goal_target_xy)
+
+    # --- 0. 射门点选择: 门口扫描 (与 choose_shot_y 同一个函数)，瞄准点按球门缓存 ---
+    target_shoot_x = gx
+    aim_y = np.empty((n, AIM_SAMPLES))
+    for goal in set(zip(gx.tolist(), gy.tolist())):
+        aim_y[(gx == goal[0]) & (gy == goal[1])] = aim_points(*goal)
+    target_shoot_y = sweep_aim_arr(bx, by, gx, gy, aim_y, obst_pos, obst_mask)
+
+    # --- 1. 站位 (左脚踢球) ---
+    dir_x, dir_y = normalize_arr(target_shoot_x - bx, target_shoot_y - by)
+    desired_theta = np.arctan2(dir_y, dir_x)
+    DIST_BEHIND, OFFSET_SIDE = 0.25, 0.05
+    stand_x = bx - dir_x * DIST_BEHIND + dir_y * OFFSET_SIDE
+    stand_y = by - dir_y * DIST_BEHIND - dir_x * OFFSET_SIDE
+
+    # --- 2. 控球决策 ---
+    dist_to_ball = norm2_arr(my_x - bx, my_y - by)
+    heading_err_target = np.abs(wrap_pi_arr(np.arctan2(target_shoot_y - my_y, target_shoot_x - my_x) - my_theta))
+    heading_err_ball = np.abs(wrap_pi_arr(np.arctan2(by - my_y, bx - my_x) - my_theta))
+    control = (dist_to_ball < 0.30) & (heading_err_target < 0.8) & (heading_err_ball < 0.8)
+    dist_ball_to_goal = norm2_arr(bx - gx, by - gy)
+    in_range = dist_ball_to_goal < 1.2
+    kick = control & in_range & (norm2_arr(my_x - gx, my_y - gy) > dist_ball_to_goal)
+    dribble = control & ~in_range
+
+    # --- 3. 绕行 ---
+    vec_br_x, vec_br_y = my_x - bx, my_y - by
+    dot = vec_br_x * dir_x + vec_br_y * dir_y
+    orbit = ~kick & ~dribble & (dot > -0.15) & (norm2_arr(vec_br_x, vec_br_y) < 0.5)
+    approach = ~kick & ~dribble & ~orbit
+
+    out = np.full(n, CMD_STOP, dtype=np.int8)
+    out[kick] = CMD_KICK_L
+    for mask, mode in ((dribble, "dribble"), (orbit, "orbit"), (approach, "approach")):
+        idx = np.flatnonzero(mask)
+        if not len(idx): continue
+        mx, my, mt = _take(idx, my_x, my_y, my_theta)
+        op, om = _obst(idx, obst_pos, obst_mask)
+        if mode == "dribble":
+            out[idx] = action_to_target_arr(mx, my, mt, target_shoot_x[idx], target_shoot_y[idx], desired_theta[idx],
+                                            op, om, use_avoidance=True, is_dribbling=True, can_strafe=False)
+        elif mode == "orbit":
+            r = 0.35
+            side = np.where((vec_br_x * dir_y - vec_br_y * dir_x)[idx] > 0, 1.0, -1.0)
+            nav_x = bx[idx] + side * dir_y[idx] * r
+            nav_y = by[idx] - side * dir_x[idx] * r
+            face_ball = np.arctan2(by[idx] - my, bx[idx] - mx)
+            out[idx] = action_to_target_arr(mx, my, mt, nav_x, nav_y, face_ball, op, om, True)
+        else:
+            out[idx] = action_to_target_arr(mx, my, mt, stand_x[idx], stand_y[idx], desired_theta[idx],
+                                            op, om, use_avoidance=True, is_dribbling=False, can_strafe=True)
+    return out
+
+
+# === 后卫 (Defender) ===
+def run_defender_arr(my_x, my_y, my_theta, bx, by, goal_own_xy, obst_pos, obst_mask):
+    n = len(my_x)
+    bx, by = _rows(n, bx), _rows(n, by)
+    hx, hy = _goal(n, goal_own_xy)
+    dx, dy = bx - hx, by - hy
+    target_dist = np.minimum(3.0, norm2_arr(dx, dy) * 0.6)
+    nx, ny = normalize_arr(dx, dy)
+    target_x = hx + nx * target_dist
+    target_y = hy + ny * target_dist * 0.8
+    target_x = np.where(hx > 0, np.minimum(target_x, -1.0), np.maximum(target_x, 1.0))
+    face_angle = np.arctan2(by - target_y, bx - target_x)
+    return action_to_target_arr(my_x, my_y, my_theta, target_x, target_y, face_angle, obst_pos, obst_mask,
+                                use_avoidance=True, is_dribbling=False, can_strafe=True)
+
+
+# === 支援 (Support) ===
+def run_support_arr(my_x, my_y, my_theta, bx, by, goal_target_xy, obst_pos, obst_mask):
+    n = len(my_x)
+    bx, by = _rows(n, bx), _rows(n, by)
+    gx, gy = _goal(n, goal_target_xy)
+    nx, ny = normalize_arr(gx - bx, gy - by)
+    target_x = bx - nx * 1.0 - ny * 0.5
+    target_y = by - ny * 1.0 + nx * 0.5
+    face_angle = np.arctan2(by - target_y, bx - target_x)
+    return action_to_target_arr(my_x, my_y, my_theta, target_x, target_y, face_angle, obst_pos, obst_mask, True)
+
+
+# === 守门员 (Goalie) ===
+def run_goalie_arr(my_x, my_y, my_theta, bx, by, goal_own_xy, ball_history):
+    """ball_history 为所有行共用的球预测器 (同一个球)；落点按守门线 x 各算一次"""
+    n = len(my_x)
+    bx, by = _rows(n, bx), _rows(n, by)
+    hx, _hy = _goal(n, goal_own_xy)
+    base_x = hx + np.where(hx < 0, 0.35, -0.35)
+    desired_gk_x = np.where(hx > 0, clamp_arr(base_x, -4.5, -3.5), clamp_arr(base_x, 3.5, 4.5))
+    # 与 calculate_predicted_y 相同: 历史不够 / 球没朝这条线滚 -> 当前 y，否则截球点 y (每条守门线只算一次)
+    pred_y = by.copy()
+    if len(ball_history) >= 5:
+        for line_x in np.unique(desired_gk_x):
+            hit = ball_history.intercept(float(line_x))
+            if hit is not None: pred_y[desired_gk_x == line_x] = hit[0]
+    desired_gk_y = clamp_arr(pred_y, -1.0, 1.0)
+    gk_face = np.arctan2(by - desired_gk_y, bx - desired_gk_x)
+    return action_to_target_arr(my_x, my_y, my_theta, desired_gk_x, desired_gk_y, gk_face, None, None,
+                                use_avoidance=False, is_dribbling=False, can_strafe=True)
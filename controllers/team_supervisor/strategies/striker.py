@@ -1,39 +1,84 @@
 import math
+import numpy as np
 from utils import norm2, normalize, wrap_pi
 from movement import action_to_target
+from spatial import blocking_mask
+
+SHOT_CLEARANCE = 0.35 # 障碍物离射门线小于此距离算挡住
+AIM_HALF_WIDTH = 0.9  # 瞄准点在球门中心 ± 这么宽的范围内扫 (门柱在 ±1.3，留出余量)
+AIM_SAMPLES = 19      # 扫多少个瞄准点 (间隔 0.1 m)
+AIM_OFFSETS = np.linspace(-AIM_HALF_WIDTH, AIM_HALF_WIDTH, AIM_SAMPLES)
+_aim_cache = {}       # 球门 (gx, gy) -> 门口的瞄准点 y (AIM_SAMPLES,)
 
 # === 辅助函数：检查射门路线上是否有障碍 ===
 def is_shot_blocked(bx, by, tx, ty, obstacles):
-    vx, vy = tx - bx, ty - by
-    dist_shot = norm2(vx, vy)
-    if dist_shot < 0.01: return False
-
-    for (ox, oy) in obstacles:
-        vox, voy = ox - bx, oy - by
-        projection = (vox * vx + voy * vy) / (dist_shot * dist_shot)
-        if 0.0 < projection < 1.0:
-            closest_x = bx + projection * vx
-            closest_y = by + projection * vy
-            dist_vertical = norm2(ox - closest_x, oy - closest_y)
-            if dist_vertical < 0.35:
-                return True
-    return False
+    if norm2(tx - bx, ty - by) < 0.01: return False
+
+    # 有空间哈希时: 挡线的机器人每 tick 每条线只算一次 (附近格子里的)，这里只去掉自己
+    hits = obstacles.segment_blockers(bx, by, tx, ty, SHOT_CLEARANCE) if hasattr(obstacles, "segment_blockers") else None
+    if hits is not None: return len(hits) > 0
+
+    pos = np.asarray(obstacles, dtype=float).reshape(-1, 2)
+    if len(pos) == 0: return False
+    return bool(np.any(blocking_mask(pos, bx, by, tx, ty, SHOT_CLEARANCE)))
+
+def aim_points(gx, gy):
+    """球门口的瞄准点 y，按球门缓存"""
+    pts = _aim_cache.get((gx, gy))
+    if pts is None: pts = _aim_cache[(gx, gy)] = gy + AIM_OFFSETS
+    return pts
+
+def sweep_aim_arr(bx, by, gx, gy, aim_y, obst_pos, obst_mask):
+    """
+    门口扫描 (每行一个球 / 球门): 所有瞄准点对所有障碍物一次算出是否被挡，
+    连续没被挡的瞄准点组成一个开口，选从球看过去张角最大的开口，瞄它的中间。
+    bx, by, gx, gy: (N,)；aim_y: (N, S) 瞄准点；obst_pos: (K, 2) 或 (N, K, 2)；obst_mask: (N, K)。
+    返回射门点 y (N,)；门口全空或全被挡住时就是球门中心 gy。
+    """
+    n, m = aim_y.shape
+    pos = obst_pos[None, None] if obst_pos.ndim == 2 else obst_pos[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hit = blocking_mask(pos, bx[:, None, None], by[:, None, None], gx[:, None, None], aim_y[..., None], SHOT_CLEARANCE)
+    is_open = ~(hit & obst_mask[:, None, :]).any(axis=2)
+    # 射门线太短 (球就在门口) 的瞄准点不算被挡，与 is_shot_blocked 一致
+    is_open |= np.hypot(gx[:, None] - bx[:, None], aim_y - by[:, None]) < 0.01
+
+    partly = is_open.any(axis=1) & ~is_open.all(axis=1)
+    if not partly.any(): return np.array(gy, dtype=float)
+
+    # 每个瞄准点所在开口的首尾下标
+    col = np.arange(m)
+    pad = np.zeros((n, 1), dtype=bool)
+    first = np.maximum.accumulate(np.where(is_open & ~np.hstack([pad, is_open[:, :-1]]), col, 0), axis=1)
+    last = np.minimum.accumulate(np.where(is_open & ~np.hstack([is_open[:, 1:], pad]), col, m - 1)[:, ::-1], axis=1)[:, ::-1]
+    rows = np.arange(n)[:, None]
+    lo, hi = aim_y[rows, first], aim_y[rows, last]
+    # 张角: 开口两端各向外扩半个间隔；按 |dx| 计算，红蓝两个方向一样
+    half = 0.5 * (aim_y[:, -1:] - aim_y[:, :1]) / max(m - 1, 1)
+    dx = np.abs(gx - bx)[:, None]
+    width = np.abs(np.arctan2(hi + half - by[:, None], dx) - np.arctan2(lo - half - by[:, None], dx))
+    width = np.where(is_open, width, -1.0)
+    best = width.argmax(axis=1)
+    r = np.arange(n)
+    return np.where(partly, 0.5 * (lo[r, best] + hi[r, best]), gy)
+
+def choose_shot_y(bx, by, gx, gy, obstacles):
+    """单个前锋的门口扫描，返回射门点 y；全被挡住时打中间"""
+    pos = np.asarray(obstacles, dtype=float).reshape(-1, 2)
+    # 有空间哈希时只看球和球门之间那片区域里的障碍物 (任何一条射门线 SHOT_CLEARANCE 以内的都在里面)
+    near = obstacles.near_segment(bx, by, gx, gy, AIM_HALF_WIDTH + SHOT_CLEARANCE) if hasattr(obstacles, "near_segment") else None
+    if near is not None: pos = pos[near].reshape(-1, 2)
+    if len(pos) == 0: return gy
+    shot_y = sweep_aim_arr(np.array([bx]), np.array([by]), np.array([gx]), np.array([gy]), aim_points(gx, gy)[None],
+                           pos, np.ones((1, len(pos)), dtype=bool))
+    return float(shot_y[0])
 
 # === 前锋 (Striker) ===
-def run_striker(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles):
+def run_striker(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles, nav=None, hyst=None):
     gx, gy = goal_target_xy 
     
-    # --- 0. 智能射门点选择 ---
-    target_shoot_x, target_shoot_y = gx, gy
-    if is_shot_blocked(bx, by, gx, gy, obstacles):
-        target_left_y = gy + 0.6
-        target_right_y = gy - 0.6
-        blocked_left = is_shot_blocked(bx, by, gx, target_left_y, obstacles)
-        blocked_right = is_shot_blocked(bx, by, gx, target_right_y, obstacles)
-        
-        if not blocked_left and blocked_right: target_shoot_y = target_left_y 
-        elif blocked_left and not blocked_right: target_shoot_y = target_right_y
-        elif not blocked_left and not blocked_right: target_shoot_y = target_left_y
+    # --- 0. 智能射门点选择: 门口扫描，瞄最宽的空当 ---
+    target_shoot_x, target_shoot_y = gx, choose_shot_y(bx, by, gx, gy, obstacles)
 
     # --- 1. 计算站位 (左脚踢球逻辑) ---
     dx_shot, dy_shot = target_shoot_x - bx, target_shoot_y - by
@@ -71,7 +116,7 @@ def run_striker(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles):
         else:
             # 带球跑：开启 is_dribbling=True
             return action_to_target(my_x, my_y, my_theta, target_shoot_x, target_shoot_y, desired_theta, obstacles, 
-                                    use_avoidance=True, is_dribbling=True, can_strafe=False) # 带球时不建议侧移，容易丢球
+                                    use_avoidance=True, is_dribbling=True, can_strafe=False, nav=nav, hyst=hyst) # 带球时不建议侧移，容易丢球
 
     # --- 3. 绕行逻辑 ---
     vec_br_x, vec_br_y = my_x - bx, my_y - by
@@ -88,17 +133,25 @@ def run_striker(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles):
             nav_x = bx - dir_y * orbit_radius
             nav_y = by + dir_x * orbit_radius
         face_ball = math.atan2(by - my_y, bx - my_x)
-        return action_to_target(my_x, my_y, my_theta, nav_x, nav_y, face_ball, obstacles, True)
+        return action_to_target(my_x, my_y, my_theta, nav_x, nav_y, face_ball, obstacles, True, hyst=hyst)
 
     # --- 4. 正常跑位 (Approach) ---
     # 【关键修改】开启 can_strafe=True
     # 当机器人跑到射门点附近进行微调时，允许左右横移
     return action_to_target(my_x, my_y, my_theta, stand_x, stand_y, desired_theta, obstacles, 
-                            use_avoidance=True, is_dribbling=False, can_strafe=True)
+                            use_avoidance=True, is_dribbling=False, can_strafe=True, nav=nav, hyst=hyst)
+
+
+def striker_target(bx, by, goal_target_xy):
+    """前锋的站位 (瞄球门中心时的踢球点)，角色分配估算到达时间用"""
+    gx, gy = goal_target_xy
+    dir_x, dir_y = normalize(gx - bx, gy - by)
+    return bx - dir_x * 0.25 + dir_y * 0.05, by - dir_y * 0.25 - dir_x * 0.05
 
 
 # === 后卫 (Defender) ===
-def run_defender(my_x, my_y, my_theta, bx, by, goal_own_xy, obstacles):
+def defender_target(bx, by, goal_own_xy):
+    """后卫的封堵点: 球与自家球门连线上"""
     hx, hy = goal_own_xy
     dx = bx - hx
     dy = by - hy
@@ -113,23 +166,32 @@ def run_defender(my_x, my_y, my_theta, bx, by, goal_own_xy, obstacles):
         if target_x > -1: target_x = -1
     else:      # 蓝队
         if target_x < 1: target_x = 1
+    return target_x, target_y
+
+def run_defender(my_x, my_y, my_theta, bx, by, goal_own_xy, obstacles, nav=None, hyst=None):
+    target_x, target_y = defender_target(bx, by, goal_own_xy)
 
     face_angle = math.atan2(by - target_y, bx - target_x)
     
     # 【关键修改】开启 can_strafe=True
     # 后卫在封堵位置微调时，也允许侧移
     return action_to_target(my_x, my_y, my_theta, target_x, target_y, face_angle, obstacles, 
-                            use_avoidance=True, is_dribbling=False, can_strafe=True)
+                            use_avoidance=True, is_dribbling=False, can_strafe=True, nav=nav, hyst=hyst)
 
 
 # === 支援 (Support) ===
-def run_support(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles):
+def support_target(bx, by, goal_target_xy):
+    """支援的站位: 球后方 1 m、侧面 0.5 m"""
     gx, gy = goal_target_xy
     dx_att = gx - bx
     dy_att = gy - by
     nx, ny = normalize(dx_att, dy_att)
     target_x = bx - nx * 1.0 - ny * 0.5
     target_y = by - ny * 1.0 + nx * 0.5
+    return target_x, target_y
+
+def run_support(my_x, my_y, my_theta, bx, by, goal_target_xy, obstacles, nav=None, hyst=None):
+    target_x, target_y = support_target(bx, by, goal_target_xy)
     face_angle = math.atan2(by - target_y, bx - target_x)
     
-    return action_to_target(my_x, my_y, my_theta, target_x, target_y, face_angle, obstacles, True)
\ No newline at end of file
+    return action_to_target(my_x, my_y, my_theta, target_x, target_y, face_angle, obstacles, True, nav=nav, hyst=hyst)
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+角色分配与单个机器人的策略调用，不依赖 Webots，Supervisor 和离线回放 (tools/replay.py) 共用。
+"""
+import itertools
+import numpy as np
+from utils import clamp
+from movement import CMD_STOP, cmd_names
+from strategies import batched, goalie, striker
+from world import SELF_EPS
+
+ROLE_STRIKER = "striker"
+ROLE_DEFENDER = "defender"
+ROLE_SUPPORT = "support"
+ROLE_GOALIE = "goalie"
+
+# === 固定角色配置 ===
+# 索引对应: 0->Player1, 1->Player2, 2->Player3, 3->Player4
+# 蓝队: B1=Striker, B2=Defender, B3=Support, B4=Goalie
+BLUE_ROLES = (ROLE_STRIKER, ROLE_DEFENDER, ROLE_SUPPORT, ROLE_GOALIE)
+# 红队: R1=Defender, R2=Support, R3=Striker, R4=Goalie
+RED_ROLES = (ROLE_DEFENDER, ROLE_SUPPORT, ROLE_STRIKER, ROLE_GOALIE)
+# 角色编号 (录像里存下标)
+ROLES = (ROLE_STRIKER, ROLE_DEFENDER, ROLE_SUPPORT, ROLE_GOALIE)
+ROLE_INDEX = {r: i for i, r in enumerate(ROLES)}
+
+
+# === 动态角色分配 ===
+# 人数不够时按这个顺序保留角色，多于 4 人时多出来的轮流当后卫 / 支援
+ROLE_PRIORITY = (ROLE_STRIKER, ROLE_GOALIE, ROLE_DEFENDER, ROLE_SUPPORT)
+EXTRA_ROLES = (ROLE_DEFENDER, ROLE_SUPPORT)
+WALK_SPEED = 0.075    # 估算到达时间用的平均步行速度 (m/s)，Forwards50 约 6.8 s 走 0.5 m
+TURN_SPEED = 0.06     # 平均转身速度 (rad/s)，TurnSmall 约 2.9 s 转 10°
+TURN_NEAR = 0.3       # 离目标点比这近时不计转身时间 (可以侧移过去)
+HYSTERESIS_SEC = 6.0  # 最优分配要比当前分配总共快这么多秒才换角色，防止来回抖动
+RESOLVE_MOVE = 0.05   # 球或本队机器人自上次求解移动超过此距离 (m) 才重新求解 (代价变化远小于滞回量)
+RESOLVE_TURN = 0.10   # 或转动超过此角度 (rad)
+BRUTE_MAX = 5         # 不超过这么多人时直接枚举全部排列 (一次 numpy 求和)，比匈牙利算法的 Python 循环快
+_perm_cache = {}      # n -> 全部排列 (n!, n)
+
+
+def team_roles(is_red):
+    return RED_ROLES if is_red else BLUE_ROLES
+
+
+def role_list(n):
+    """n 个机器人的一队要分配的角色 (按优先级)"""
+    if n == len(ROLE_PRIORITY): return ROLE_PRIORITY
+    if n < len(ROLE_PRIORITY): return ROLE_PRIORITY[:n]
+    return ROLE_PRIORITY + tuple(EXTRA_ROLES[k % len(EXTRA_ROLES)] for k in range(n - len(ROLE_PRIORITY)))
+
+
+def role_target(role, bx, by, goal_own, goal_target):
+    """各角色当前想去的位置 (与各策略里的站位计算一致，不含避障 / 射门扫描 / 落点预测)"""
+    if role == ROLE_STRIKER: return striker.striker_target(bx, by, goal_target)
+    if role == ROLE_DEFENDER: return striker.defender_target(bx, by, goal_own)
+    if role == ROLE_SUPPORT: return striker.support_target(bx, by, goal_target)
+    return goalie.goalie_x(goal_own), clamp(by, -1.0, 1.0)
+
+
+def eta_matrix(x, y, theta, tx, ty):
+    """(n 机器人, m 目标) 的估算到达时间 (秒): 步行距离 + 先转向目标的时间 (很近时不转)"""
+    dx = tx[None, :] - x[:, None]
+    dy = ty[None, :] - y[:, None]
+    dist = np.hypot(dx, dy)
+    c, s = np.cos(theta)[:, None], np.sin(theta)[:, None]
+    # 朝向与目标方向的夹角 = atan2(叉积, 点积)，不用再 wrap
+    turn = np.abs(np.arctan2(c * dy - s * dx, c * dx + s * dy))
+    return dist / WALK_SPEED + np.where(dist > TURN_NEAR, turn / TURN_SPEED, 0.0)
+
+
+def solve_assignment(cost):
+    """(n, n) 代价矩阵的最小总代价分配: 小队伍枚举排列，大队伍用匈牙利算法"""
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    if n != m or n > BRUTE_MAX: return hungarian(cost)
+    perms = _perm_cache.get(n)
+    if perms is None:
+        perms = _perm_cache[n] = np.array(list(itertools.permutations(range(n))), dtype=np.int64).reshape(-1, n)
+    return perms[np.argmin(cost[np.arange(n), perms].sum(axis=1))]
+
+
+def hungarian(cost):
+    """
+    匈牙利算法 (带势函数, O(n^2 m))，cost 为 (n, m) 且 n <= m。
+    返回长度 n 的数组: 第 i 行分到的列，总代价最小。
+    """
+    cost = np.asarray(cost, dtype=float)
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j]: 第 j 列分给了哪一行 (1 起，0 = 空)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            slack = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(slack)) + 1
+            delta = slack[j1 - 1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0: break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    out = np.empty(n, dtype=np.int64)
+    for j in range(1, m + 1):
+        if p[j]: out[p[j] - 1] = j - 1
+    return out
+
+
+class RoleAssigner:
+    """
+    一队的动态角色分配: 每个 tick 按 "每个机器人到每个角色站位的估算时间" 建代价矩阵，
+    求总时间最小的分配。只有最优分配比当前分配快 HYSTERESIS_SEC 以上时才换，
+    在场人数变了 (摔出场 / 缺人) 时直接换成最优分配。初始为固定角色表。
+    和决策调度器一样，球和本队机器人都没怎么动 (相对上次求解) 时跳过求解。
+    """
+
+    def __init__(self, slots, is_red):
+        self.slots = list(slots)
+        self.idx = np.array(self.slots, dtype=np.int64)
+        fixed = team_roles(is_red) if len(self.slots) == len(BLUE_ROLES) else role_list(len(self.slots))
+        self.roles = dict(zip(self.slots, fixed))
+        self.last_ball = None
+        self.last_pos = None
+        self.last_heading = None
+        self.last_valid = None
+        self.stats = {"solves": 0, "skipped": 0, "switches": 0}
+
+    def role(self, slot):
+        return self.roles[slot]
+
+    def update(self, world, bx, by, goal_own, goal_target):
+        """重新分配，返回本次换了角色的槽位列表"""
+        if not self.changed_since_solve(world, bx, by):
+            self.stats["skipped"] += 1
+            return []
+        slots = [s for s in self.slots if world.valid[s]]
+        if not slots: return []
+        roles = role_list(len(slots))
+        targets = np.array([role_target(r, bx, by, goal_own, goal_target) for r in roles])
+        idx = np.array(slots, dtype=np.int64)
+        cost = eta_matrix(world.pos[idx, 0], world.pos[idx, 1], world.heading[idx], targets[:, 0], targets[:, 1])
+        best = solve_assignment(cost)
+        self.stats["solves"] += 1
+
+        # 当前分配还是这批角色的一个排列时才有资格保留 (重复的角色按出现顺序对应)
+        current = []
+        free = list(range(len(roles)))
+        for s in slots:
+            j = next((j for j in free if roles[j] == self.roles[s]), None)
+            if j is None: break
+            free.remove(j)
+            current.append(j)
+        rows = np.arange(len(slots))
+        if len(current) == len(slots):
+            if cost[rows, current].sum() - cost[rows, best].sum() <= HYSTERESIS_SEC: return []
+
+        changed = []
+        for i, s in enumerate(slots):
+            role = roles[best[i]]
+            if role == self.roles[s]: continue
+            self.roles[s] = role
+            changed.append(s)
+        if changed: self.stats["switches"] += 1
+        return changed
+
+    def changed_since_solve(self, world, bx, by):
+        """球 / 本队机器人相对上次求解移动或转动超过阈值，或在场名单变了；是的话记下这次的状态"""
+        pos, heading, valid = world.pos[self.idx], world.heading[self.idx], world.valid[self.idx]
+        if self.last_ball is not None and np.array_equal(valid, self.last_valid):
+            if (abs(bx - self.last_ball[0]) <= RESOLVE_MOVE and abs(by - self.last_ball[1]) <= RESOLVE_MOVE
+                    and not (np.abs(pos - self.last_pos)[valid] > RESOLVE_MOVE).any()
+                    and not (np.abs((heading - self.last_heading + np.pi) % (2 * np.pi) - np.pi)[valid] > RESOLVE_TURN).any()):
+                return False
+        self.last_ball = (bx, by)
+        self.last_pos, self.last_heading, self.last_valid = pos, heading, valid
+        return True
+
+
+def run_role(role, world, slot, bx, by, goal_own, goal_target, ball_history, nav=None, hyst=None):
+    """
+    用快照里 slot 号机器人的位姿跑一次对应角色的策略，返回指令字符串。
+    nav: 该机器人的 planner.NavState；hyst: 该机器人的 cmd_filter.CmdState (进入 / 退出阈值 + 最短保持时间)，都可选。
+    """
+    cmd = _run_role(role, world, slot, bx, by, goal_own, goal_target, ball_history, nav, hyst)
+    if hyst is not None: cmd = hyst.filter(cmd, world.time)
+    return cmd
+
+
+def _run_role(role, world, slot, bx, by, goal_own, goal_target, ball_history, nav, hyst):
+    my_x, my_y, my_theta = world.pose(slot)
+
+    if role == ROLE_GOALIE:
+        return goalie.run_goalie(my_x, my_y, my_theta, bx, by, goal_own, ball_history, hyst)
+
+    # 障碍物列表排除自己 (读快照里的两两距离矩阵)
+    my_obstacles = world.obstacles_for(slot)
+    if role == ROLE_STRIKER:
+        return striker.run_striker(my_x, my_y, my_theta, bx, by, goal_target, my_obstacles, nav, hyst)
+    if role == ROLE_DEFENDER:
+        return striker.run_defender(my_x, my_y, my_theta, bx, by, goal_own, my_obstacles, nav, hyst)
+    if role == ROLE_SUPPORT:
+        return striker.run_support(my_x, my_y, my_theta, bx, by, goal_target, my_obstacles, nav, hyst)
+    return "STOP"
+
+
+def run_roles_batch(roles, world, slots, bx, by, goal_own, goal_target, ball_history):
+    """
+    run_role 的批量版: slots[i] 号机器人按 roles[i] 的角色一次算完。
+    goal_own / goal_target 为一对坐标 (同一队) 或每行一对的 (N, 2) 数组 (两队一起)。返回指令字符串数组。
+    只给离线批量评估用 (tools/bench_batch.py 这种一次几百个局面的): 不做 nav 规划和指令滞回,
+    结果等于 run_role(nav=None, hyst=None), 直线被挡住时和 Supervisor 实际发的指令不一样。
+    Supervisor / sim2d 每个 tick 只有一个局面 8 个机器人, 批量反而更慢, 所以照旧逐个调用 run_role。
+    """
+    slots = np.asarray(slots, dtype=np.int64)
+    roles = np.asarray(roles)
+    n = len(slots)
+    goal_own = np.broadcast_to(np.asarray(goal_own, dtype=float), (n, 2))
+    goal_target = np.broadcast_to(np.asarray(goal_target, dtype=float), (n, 2))
+    x, y, theta = world.pos[slots, 0], world.pos[slots, 1], world.heading[slots]
+    # 与 obstacles_for 相同的障碍物集合: 全部机器人 (obst_pos 共用) 里排除自己 / 重合 / 缺失的
+    row = world.dist[slots]
+    mask = (row > SELF_EPS) & (row < np.inf)
+    obst = world.obst_pos
+
+    out = np.full(n, CMD_STOP, dtype=np.int8)
+    for role in (ROLE_STRIKER, ROLE_DEFENDER, ROLE_SUPPORT, ROLE_GOALIE):
+        i = np.flatnonzero(roles == role)
+        if not len(i): continue
+        if role == ROLE_GOALIE:
+            out[i] = batched.run_goalie_arr(x[i], y[i], theta[i], bx, by, goal_own[i], ball_history)
+        elif role == ROLE_STRIKER:
+            out[i] = batched.run_striker_arr(x[i], y[i], theta[i], bx, by, goal_target[i], obst, mask[i])
+        elif role == ROLE_DEFENDER:
+            out[i] = batched.run_defender_arr(x[i], y[i], theta[i], bx, by, goal_own[i], obst, mask[i])
+        else:
+            out[i] = batched.run_support_arr(x[i], y[i], theta[i], bx, by, goal_target[i], obst, mask[i])
+    return cmd_names(out)
+
+
+def run_teams_batch(world, teams, bx, by, ball_history):
+    """
+    两队 (或任意多队) 一次调用: teams 为 [(slots, roles, goal_own, goal_target), ...]，
+    只算快照里在场的机器人。返回 {slot: 指令}。和 run_roles_batch 一样不做规划 / 滞回，只用于离线评估。
+    """
+    slots, roles, own, target = [], [], [], []
+    for team_slots, team_roles_, goal_own, goal_target in teams:
+        for i, slot in enumerate(team_slots):
+            if not world.valid[slot]: continue
+            slots.append(slot)
+            roles.append(team_roles_[i])
+            own.append(goal_own)
+            target.append(goal_target)
+    if not slots: return {}
+    cmds = run_roles_batch(roles, world, slots, bx, by, own, target, ball_history)
+    return dict(zip(slots, cmds.tolist()))
@@ -1,24 +1,49 @@
 from controller import Supervisor, Display
-import socket, json, select
+import json, os, sys
 
 # 引入我们的模块
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol
+import net
+import transport
 import utils
-from strategies import goalie, striker
+from world import WorldSnapshot
+from scheduler import DecisionScheduler
+from ball_predictor import BallPredictor
+from history import WorldHistory
+from planner import Navigator
+from cmd_filter import CommandFilter
+from profiler import TickProfiler
+from recorder import MatchRecorder, record_path_from_env
+import tactics
 
 # ================= 配置区 =================
 TIME_STEP = 32
 
-# 端口映射要和 Player 端一致
-PORT = {
-    "B1": 10001, "B2": 10002, "B3": 10003, "B4": 10004,
-    "R1": 10011, "R2": 10012, "R3": 10013, "R4": 10014,
-}
-SUPERVISOR_PORT = 12000
-
 BALL_DEF = "BALL"
 BLUE_DEFS = ["BLUE1", "BLUE2", "BLUE3", "BLUE4"]
 RED_DEFS  = ["RED1", "RED2", "RED3", "RED4"]
 
+# 移动类指令 (可以被覆盖，也可以做变化抑制)
+MOVE_CMDS = ("FWD", "TURN_L", "TURN_R", "STOP", "SIDE_L", "SIDE_R")
+
+STATS_PERIOD = 1000 # 每隔多少个 tick 打印一次统计
+ROLE_ABBR = {tactics.ROLE_STRIKER: "ST", tactics.ROLE_DEFENDER: "DF", tactics.ROLE_SUPPORT: "SP", tactics.ROLE_GOALIE: "GK"}
+
+def minimap_period_ms():
+    """NAO_MINIMAP_MS: 小地图刷新周期 (毫秒)，默认每个 TIME_STEP 刷新，0 表示关闭 (无界面/跑分时用)"""
+    try:
+        return max(0, int(os.environ.get("NAO_MINIMAP_MS", TIME_STEP)))
+    except ValueError:
+        return TIME_STEP
+
+def match_duration_sec():
+    """NAO_MATCH_SEC: 比赛时长 (仿真秒)，到时打印最终比分并退出 Webots；0 表示一直跑 (默认)"""
+    try:
+        return max(0.0, float(os.environ.get("NAO_MATCH_SEC", 0)))
+    except ValueError:
+        return 0.0
+
 GOAL_RED_DEF  = "GOAL_RED_CENTER"
 GOAL_BLUE_DEF = "GOAL_BLUE_CENTER"
 
@@ -26,15 +51,25 @@ GOAL_BLUE_DEF = "GOAL_BLUE_CENTER"
 class TeamSupervisor:
     def __init__(self):
         self.robot = Supervisor()
-        self.sock_tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.seq = 0
+        self.sim_time = 0.0
+
+        # 通信端点 (NAO_TRANSPORT=udp/unix/shm)，用于发指令和接收 DONE/READY
+        self.link = transport.open_transport(transport.SUPERVISOR)
+        print(f"Transport: {type(self.link).__name__} (namespace {net.NAMESPACE})")
+        self.match_sec = match_duration_sec()
+
+        # batch 模式: 每个 tick 的指令合成一个组播数据报 (NAO_CMD_MODE=batch)
+        self.cmd_mode = net.cmd_mode()
+        self.batch = None
+        if self.cmd_mode == net.CMD_MODE_BATCH:
+            self.batch = protocol.BatchEncoder()
+        print(f"Command mode: {self.cmd_mode}")
+
+        # 变化抑制: 相同的移动指令每 keepalive_ticks 才补发一次
+        self.keepalive_ticks = net.keepalive_ticks()
+        self.tick = 0
+        self.tx_stats = {"sent": 0, "suppressed": 0, "busy": 0}
         
-        # 接收端口 (用于接收 DONE/READY 信号)
-        self.sock_rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock_rx.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock_rx.bind(("127.0.0.1", SUPERVISOR_PORT))
-        self.sock_rx.setblocking(False)
-
         # 获取 Webots 节点
         self.ball = self.robot.getFromDef(BALL_DEF)
         self.blue_nodes = [self.robot.getFromDef(d) for d in BLUE_DEFS]
@@ -48,6 +83,34 @@ class TeamSupervisor:
         print(f"Active Players: Blue={self.blue_ids}, Red={self.red_ids}")
 
         self.all_ids = self.blue_ids + self.red_ids
+
+        # 槽位: 0-3 蓝队, 4-7 红队 (与 protocol.ROBOT_IDS 顺序一致)
+        self.blue_slots = list(range(len(BLUE_DEFS)))
+        self.red_slots = list(range(len(BLUE_DEFS), len(BLUE_DEFS) + len(RED_DEFS)))
+        self.slot_ids = [f"B{i+1}" for i in range(len(BLUE_DEFS))] + [f"R{i+1}" for i in range(len(RED_DEFS))]
+
+        # 每个 tick 的世界快照 (所有位置/朝向只从 Webots 读一次)
+        self.world = WorldSnapshot(self.blue_nodes + self.red_nodes, self.ball)
+        # 球门是静态的，启动时读一次即可
+        self.blue_goal = utils.get_pos(self.goal_blue)
+        self.red_goal = utils.get_pos(self.goal_red)
+
+        # 决策调度: 只有发生变化 (DONE / 球或自己移动 / 超时) 时才重新跑策略
+        self.scheduler = DecisionScheduler(len(self.slot_ids))
+        # 指令滞回 (进入 / 退出阈值 + 最短保持时间)，避免 TURN_L / TURN_R / FWD 来回换动作 (NAO_CMD_FILTER=1 开启，默认关闭)
+        self.cmd_filter = CommandFilter(len(self.slot_ids))
+        self.slot_of = {rid: i for i, rid in enumerate(self.slot_ids)}
+        self.due = None
+
+        # 比赛录像 (NAO_RECORD=目录 或 .npy 文件)，每 tick 一条记录
+        self.recorder = None
+        rec_path = record_path_from_env(net.NAMESPACE)
+        if rec_path:
+            self.recorder = MatchRecorder(rec_path, len(self.slot_ids), meta={
+                "robot_ids": self.slot_ids, "time_step": TIME_STEP, "namespace": net.NAMESPACE,
+                "blue_goal": list(self.blue_goal), "red_goal": list(self.red_goal),
+                "cmd_filter": self.cmd_filter.enabled})
+            print(f"Recording to {rec_path}")
         
         # 状态管理
         self.busy = {rid: False for rid in self.all_ids}
@@ -55,9 +118,25 @@ class TeamSupervisor:
         self.fall_count = {rid: 0 for rid in self.all_ids}
         self.recovering = {rid: False for rid in self.all_ids}
         self.ready = {rid: False for rid in self.all_ids}
+        # 每个机器人独立的序列号 & READY 时协商出的协议版本
+        self.seq = {rid: 0 for rid in self.all_ids}
+        self.proto = {rid: protocol.PROTO_JSON for rid in self.all_ids}
+        self.last_send_tick = {rid: -1 for rid in self.all_ids}
         self.handshake_done = False
         
-        self.ball_pos_history = [] 
+        # 所有机器人 + 球的位置历史 (环形缓冲区，速度/加速度估计)，以及基于它的球轨迹预测 (守门员预判落点)
+        self.history = WorldHistory(len(self.slot_ids))
+        self.ball_pred = BallPredictor(self.history)
+        # 全局路径规划: 共享占据栅格 + 每个机器人一个增量 D* Lite (直线被挡住时才用)
+        self.nav = Navigator(len(self.slot_ids))
+        # 动态角色分配 (每队一个，代价矩阵 + 滞回)，初始为固定角色表
+        self.assigners = {False: tactics.RoleAssigner(self.blue_slots, False),
+                          True: tactics.RoleAssigner(self.red_slots, True)}
+        if self.recorder:
+            for a in self.assigners.values():
+                for slot in a.slots: self.recorder.set_role(slot, tactics.ROLE_INDEX[a.role(slot)])
+        # 每个 tick 各阶段耗时，随统计一起打印
+        self.prof = TickProfiler()
 
         # 小地图初始化
         self.display = self.robot.getDevice("minimap")
@@ -65,6 +144,11 @@ class TeamSupervisor:
         self.FIELD_WIDTH = 6.0
         self.score_blue = 0
         self.score_red = 0
+        # 刷新频率与 TIME_STEP 解耦: 每 minimap_every 个 tick 画一次，0 = 关闭
+        period_ms = minimap_period_ms()
+        self.minimap_every = max(1, round(period_ms / TIME_STEP)) if period_ms > 0 else 0
+        if not self.minimap_every: self.display = None
+        self.minimap_bg = None # 静态背景层 (球场)，第一次绘制后缓存
         if self.display:
             self.d_width = self.display.getWidth()
             self.d_height = self.display.getHeight()
@@ -72,17 +156,35 @@ class TeamSupervisor:
 
     def send_cmd(self, rid, cmd):
         """发送指令给机器人，处理忙碌锁逻辑"""
+        if self.recorder: self.recorder.set_cmd(self.slot_of[rid], protocol.cmd_to_op(cmd))
+        # 打断 (摔倒起身) 之后指令滞回从头开始
+        if cmd.startswith("INTERRUPT_"): self.cmd_filter.reset(self.slot_of[rid])
         # 判断是否是移动类指令 (可以被覆盖)
-        is_move = cmd in ["FWD", "TURN_L", "TURN_R", "STOP", "SIDE_L", "SIDE_R"]
-        was_move = self.last_sent_cmd.get(rid, "STOP") in ["FWD", "TURN_L", "TURN_R", "STOP", "SIDE_L", "SIDE_R"]
+        is_move = cmd in MOVE_CMDS
+        was_move = self.last_sent_cmd.get(rid, "STOP") in MOVE_CMDS
         
         # 如果机器人正忙(Busy=True)，且不是连续的移动指令，则不发送
-        if self.busy[rid] and not (is_move and was_move): return
-
-        self.seq += 1
-        msg = {"seq": self.seq, "id": rid, "cmd": cmd}
-        self.sock_tx.sendto(json.dumps(msg).encode("utf-8"), ("127.0.0.1", PORT[rid]))
+        if self.busy[rid] and not (is_move and was_move):
+            self.tx_stats["busy"] += 1
+            return
+
+        # 变化抑制: 移动指令没变且还没到保活周期，不发送 (Player 会自己保持执行)
+        # 原子动作 (KICK/GETUP) 每次都代表一个新动作，不做抑制
+        if (is_move and cmd == self.last_sent_cmd[rid] and self.keepalive_ticks > 0
+                and self.tick - self.last_send_tick[rid] < self.keepalive_ticks):
+            self.tx_stats["suppressed"] += 1
+            return
+
+        self.seq[rid] += 1
+        if self.proto[rid] < protocol.PROTO_BINARY:
+            data = protocol.encode_cmd_json(self.seq[rid], rid, cmd)
+            self.link.send(rid, data)
+        elif self.batch is None or not self.batch.add(self.seq[rid], rid, cmd):
+            data = protocol.encode_cmd(self.seq[rid], rid, cmd, self.sim_time)
+            self.link.send(rid, data)
         self.last_sent_cmd[rid] = cmd
+        self.last_send_tick[rid] = self.tick
+        self.tx_stats["sent"] += 1
         
         # 定义哪些指令会触发忙碌锁 (直到收到 DONE)
         busy_cmds = [
@@ -96,23 +198,54 @@ class TeamSupervisor:
         else:
             self.busy[rid] = False
 
+    def report_stats(self):
+        """打印发送统计 (发送 / 抑制 / 忙碌丢弃)"""
+        st = self.tx_stats
+        total = st["sent"] + st["suppressed"]
+        saved = 100.0 * st["suppressed"] / total if total else 0.0
+        print(f"[TX] sent={st['sent']} suppressed={st['suppressed']} ({saved:.1f}% saved) "
+              f"busy_dropped={st['busy']} keepalive={self.keepalive_ticks}")
+        sc = self.scheduler.stats
+        print(f"[SCHED] strategy runs={sc['run']} reused={sc['reused']} skipped_busy={sc['skipped_busy']} "
+              f"({100.0 * self.scheduler.avoided_ratio():.1f}% avoided) max_period={self.scheduler.max_period}")
+        nv = self.nav.stats()
+        cf = self.cmd_filter.stats()
+        print(f"[FILTER] enabled={int(self.cmd_filter.enabled)} switches={cf['switches']} prevented_restarts={cf['prevented']}")
+        print(f"[NAV] plans={nv['plans']} repairs={nv['repairs']} reused={nv['reused']} failed={nv['failed']}")
+        ra = [self.assigners[False].stats, self.assigners[True].stats]
+        print(f"[ROLES] solves={ra[0]['solves'] + ra[1]['solves']} skipped={ra[0]['skipped'] + ra[1]['skipped']} switches blue={ra[0]['switches']} red={ra[1]['switches']} "
+              f"blue={self.team_role_str(False)} red={self.team_role_str(True)}")
+        prof = self.prof.report()
+        if prof: print(f"[PROF] us/tick mean/max: {prof}")
+
+    def team_role_str(self, is_red):
+        a = self.assigners[is_red]
+        return ",".join(f"{self.slot_ids[s]}={ROLE_ABBR[a.role(s)]}" for s in a.slots)
+
+    def flush_cmds(self):
+        """batch 模式下，把本 tick 攒下的指令一次性发出 (一个 sendto)"""
+        if self.batch is None: return
+        data = self.batch.flush(self.sim_time)
+        if data: self.link.broadcast(self.all_ids, data)
+
     def poll_events(self):
         """处理机器人返回的事件 (DONE, READY)"""
-        while True:
-            r, _, _ = select.select([self.sock_rx], [], [], 0)
-            if not r: break
+        for data in self.link.recv_all():
             try:
-                data, _ = self.sock_rx.recvfrom(4096)
                 msg = json.loads(data.decode("utf-8"))
-                rid = msg.get("id", "")
-                event = msg.get("event")
-                
-                if event == "DONE":
-                    self.busy[rid] = False
-                    self.recovering[rid] = False
-                elif event == "READY":
-                    self.ready[rid] = True
-            except: break
+            except ValueError:
+                continue
+            rid = msg.get("id", "")
+            if rid not in self.busy: continue
+            event = msg.get("event")
+            
+            if event == "DONE":
+                self.busy[rid] = False
+                self.recovering[rid] = False
+                self.scheduler.notify_done(self.slot_of[rid])
+            elif event == "READY":
+                self.ready[rid] = True
+                self.proto[rid] = protocol.negotiate(msg.get("proto"))
 
     def do_handshake_if_needed(self):
         """等待所有机器人上线 (READY)"""
@@ -122,18 +255,22 @@ class TeamSupervisor:
         # 握手成功，先发两轮 STOP 确保状态同步
         for _ in range(2):
             for rid in self.all_ids: self.send_cmd(rid, "STOP")
+            self.flush_cmds()
             for _k in range(2):
                 self.robot.step(TIME_STEP)
+                self.tick += 1
+                self.sim_time = self.robot.getTime()
                 self.poll_events()
                 
         self.handshake_done = True
-        print("HANDSHAKE DONE")
+        print(f"HANDSHAKE DONE (proto={self.proto})")
         return True
 
-    def check_fall(self, node, rid):
-        """检测摔倒方向"""
-        _, z_axis = utils.get_axes(node)
-        _, front_x_axis = utils.get_axes(node) 
+    def check_fall(self, slot, rid):
+        """检测摔倒方向 (读本 tick 的快照)"""
+        z_axis = self.world.z_axis[slot]
+        # 原实现两次 get_axes 取的都是第二个返回值 (Z 轴)，这里保持一致
+        front_x_axis = z_axis
         
         # Z轴过低认为摔倒
         if z_axis[2] < 0.60: self.fall_count[rid] += 1
@@ -150,57 +287,45 @@ class TeamSupervisor:
 
     def get_all_positions(self):
         """获取场上所有机器人的位置 (用于避障)"""
-        obstacles = []
-        for n in self.blue_nodes + self.red_nodes:
-            if n: obstacles.append(utils.get_pos(n))
-        return obstacles
-
-    def assign_roles_and_compute(self, nodes, goal_own, goal_target, bx, by, obstacles, is_red):
-        """分配角色并计算指令 (固定角色分配)"""
-        active_nodes = [n for n in nodes if n]
-        if not active_nodes: return []
-        
-        cmds = ["STOP"] * len(nodes)
+        return self.world.positions()
+
+    def update_roles(self, goal_own, goal_target, bx, by, is_red):
+        """重新分配一队的角色；换了角色的机器人上次的决策作废"""
+        for slot in self.assigners[is_red].update(self.world, bx, by, goal_own, goal_target):
+            self.scheduler.invalidate(slot)
+            if self.recorder: self.recorder.set_role(slot, tactics.ROLE_INDEX[self.assigners[is_red].role(slot)])
+
+    def assign_roles_and_compute(self, slots, goal_own, goal_target, bx, by, is_red):
+        """按本队当前的角色分配计算指令，slots 为本队的槽位列表"""
+        if not any(self.world.valid[s] for s in slots): return []
         
-        # === 固定角色配置 ===
-        # 索引对应: 0->Player1, 1->Player2, 2->Player3, 3->Player4
-        if is_red:
-            # 红队: R1=Defender, R2=Support, R3=Striker, R4=Goalie
-            idx_def = 0 
-            idx_sup = 1 
-            idx_str = 2 
-            idx_gk  = 3 
-        else:
-            # 蓝队: B1=Striker, B2=Defender, B3=Support, B4=Goalie
-            idx_str = 0 
-            idx_def = 1 
-            idx_sup = 2 
-            idx_gk  = 3 
+        cmds = ["STOP"] * len(slots)
+        roles = self.assigners[is_red]
 
         # 计算指令
-        for i, node in enumerate(nodes):
-            if not node: continue
-            
-            my_x, my_y = utils.get_pos(node)
-            my_theta = utils.get_heading(node)
-            
-            # 障碍物列表排除自己
-            my_obstacles = [o for o in obstacles if utils.norm2(o[0]-my_x, o[1]-my_y) > 0.01]
-
-            if i == idx_gk:
-                cmds[i] = goalie.run_goalie(my_x, my_y, my_theta, bx, by, goal_own, self.ball_pos_history)
-            elif i == idx_str:
-                cmds[i] = striker.run_striker(my_x, my_y, my_theta, bx, by, goal_target, my_obstacles)
-            elif i == idx_def:
-                cmds[i] = striker.run_defender(my_x, my_y, my_theta, bx, by, goal_own, my_obstacles)
-            elif i == idx_sup:
-                cmds[i] = striker.run_support(my_x, my_y, my_theta, bx, by, goal_target, my_obstacles)
+        for i, slot in enumerate(slots):
+            if not self.world.valid[slot]: continue
+            rid = self.slot_ids[slot]
+
+            # 忙碌 (踢球/起身) 中的指令反正会被丢弃，策略直接不跑
+            if self.busy[rid] or self.recovering[rid]:
+                self.scheduler.skip_busy(slot)
+                continue
+            # 没有触发事件: 复用上次的决策
+            if not self.due[slot]:
+                cmds[i] = self.scheduler.reuse(slot)
+                continue
+
+            cmds[i] = tactics.run_role(roles.role(slot), self.world, slot, bx, by,
+                                       goal_own, goal_target, self.ball_pred,
+                                       self.nav.state(slot), self.cmd_filter.state(slot))
+
+            self.scheduler.commit(slot, self.tick, self.world, cmds[i])
                 
         return cmds
 
-    def update_minimap(self, bx, by):
-        if not self.display: return
-
+    def draw_minimap_background(self):
+        """绘制静态层 (草地、中线、中圈、禁区、记分栏底色)，只画一次后用 imageCopy 缓存"""
         # 背景
         self.display.setColor(0x006600)
         self.display.fillRectangle(0, 0, self.d_width, self.d_height)
@@ -219,19 +344,35 @@ class TeamSupervisor:
         x2, y2 = self.world_to_screen(self.FIELD_LENGTH/2, -BOX_WIDTH/2)
         self.display.drawRectangle(x1, y1, abs(x2-x1), abs(y2-y1))
 
+        # 记分栏底色
+        self.display.setColor(0x000000) 
+        self.display.fillRectangle(0, 0, self.d_width, 20)
+
+        self.minimap_bg = self.display.imageCopy(0, 0, self.d_width, self.d_height)
+
+    def update_minimap(self, bx, by):
+        """绘制小地图: 贴上缓存的静态层，再只画动态层 (机器人、球、文字)"""
+        if not self.display: return
+        if self.tick % self.minimap_every: return
+
+        if self.minimap_bg is None:
+            self.draw_minimap_background()
+        else:
+            self.display.imagePaste(self.minimap_bg, 0, 0, False)
+
         # 蓝队点
         self.display.setColor(0x0000FF)
-        for node in self.blue_nodes:
-            if node:
-                x, y = utils.get_pos(node)
+        for slot in self.blue_slots:
+            if self.world.valid[slot]:
+                x, y = self.world.pos_list[slot]
                 sx, sy = self.world_to_screen(x, y)
                 self.display.fillOval(sx, sy, 4, 4)
 
         # 红队点
         self.display.setColor(0xFF0000)
-        for node in self.red_nodes:
-            if node:
-                x, y = utils.get_pos(node)
+        for slot in self.red_slots:
+            if self.world.valid[slot]:
+                x, y = self.world.pos_list[slot]
                 sx, sy = self.world_to_screen(x, y)
                 self.display.fillOval(sx, sy, 4, 4)
 
@@ -241,9 +382,7 @@ class TeamSupervisor:
         self.display.fillOval(bsx, bsy, 3, 3)
 
         # 文字
-        self.display.setColor(0x000000) 
-        self.display.fillRectangle(0, 0, self.d_width, 20)
-        current_time = int(self.robot.getTime())
+        current_time = int(self.sim_time)
         score_str = f"Blue {self.score_blue} : {self.score_red} Red"
         time_str = f"Time: {current_time}s"
         self.display.setColor(0xFFFFFF) 
@@ -256,85 +395,145 @@ class TeamSupervisor:
         return max(0, min(self.d_width, sx)), max(0, min(self.d_height, sy))
 
     def run(self):
-        PHASE_1_STABILIZE = 50 
-        PHASE_2_TRIGGER_KICK = PHASE_1_STABILIZE + 10 
-        PHASE_3_WAIT_ANIMATION = PHASE_2_TRIGGER_KICK + 80 
         game_steps = 0
 
         # === 主循环：去掉了 time.time()，完全依赖 physics step ===
         while self.robot.step(TIME_STEP) != -1:
+            self.sim_time = self.robot.getTime()
+            self.tick += 1
+            self.prof.begin()
             self.poll_events()
+            self.prof.mark("poll")
             if not self.do_handshake_if_needed(): continue
 
             game_steps += 1
-            bx, by = utils.get_pos(self.ball)
-
-            # === 阶段 1: 开场表演 (可注释) ===
-            if game_steps < PHASE_1_STABILIZE:
-                for rid in self.all_ids: self.send_cmd(rid, "STOP")
-                self.update_minimap(bx, by)
-                continue 
-
-            elif game_steps < PHASE_2_TRIGGER_KICK:
-                for rid in self.all_ids: self.send_cmd(rid, "KICK_L")
-                self.update_minimap(bx, by)
-                continue 
-
-            elif game_steps < PHASE_3_WAIT_ANIMATION:
-                self.update_minimap(bx, by)
-                continue 
-            # ==============================
-            
-            # === 阶段 2: 比赛逻辑 ===
-            
-            # 计分板重置
-            if bx > 4.5:
-                self.score_red += 1
-                self.ball.getField("translation").setSFVec3f([0, 0, 0.1])
-                self.ball.resetPhysics()
-                bx, by = 0, 0
-            elif bx < -4.5:
-                self.score_blue += 1
-                self.ball.getField("translation").setSFVec3f([0, 0, 0.1])
-                self.ball.resetPhysics()
-                bx, by = 0, 0
-
-            # 获取位置信息
-            blue_goal = utils.get_pos(self.goal_blue)
-            red_goal = utils.get_pos(self.goal_red)
-            all_obstacles = self.get_all_positions()
-
-            # 计算指令 (注意 goal_target 的传参)
-            # 蓝队: Own=blue_goal(+4.5), Target=red_goal(-4.5)
-            blue_cmds = self.assign_roles_and_compute(
-                self.blue_nodes, blue_goal, red_goal, bx, by, all_obstacles, is_red=False)
-            
-            # 红队: Own=red_goal(-4.5), Target=blue_goal(+4.5)
-            red_cmds = self.assign_roles_and_compute(
-                self.red_nodes, red_goal, blue_goal, bx, by, all_obstacles, is_red=True)
-
-            # === 发送蓝队指令 ===
-            for i, rid in enumerate(self.blue_ids):
-                # 1. 检测摔倒
-                fall_cmd = self.check_fall(self.blue_nodes[i], rid)
-                if fall_cmd: 
-                    self.send_cmd(rid, "INTERRUPT_" + fall_cmd)
-                elif self.recovering[rid]:
-                    continue # 正在起身，跳过
-                else: 
-                    self.send_cmd(rid, blue_cmds[i])
-
-            # === 发送红队指令 ===
-            for i, rid in enumerate(self.red_ids):
-                fall_cmd = self.check_fall(self.red_nodes[i], rid)
-                if fall_cmd: 
-                    self.send_cmd(rid, "INTERRUPT_" + fall_cmd)
-                elif self.recovering[rid]:
-                    continue
-                else: 
-                    self.send_cmd(rid, red_cmds[i])
-            
+            self.play_tick(game_steps)
+            self.flush_cmds()
+            self.prof.mark("flush")
+            if self.recorder: self.record_tick(game_steps)
+            self.prof.mark("record")
+            self.prof.end()
+            if game_steps % STATS_PERIOD == 0: self.report_stats()
+            if self.match_sec and self.sim_time >= self.match_sec:
+                self.finish_match()
+                break
+        if self.recorder: self.recorder.close()
+
+    def record_tick(self, game_steps):
+        """把本 tick 的快照、指令和状态标志追加到录像"""
+        self.recorder.write(game_steps, self.world, self.scheduler.last_tick, self.tick,
+                            self.busy, self.recovering, self.fall_count, self.slot_ids,
+                            (self.score_blue, self.score_red))
+
+    def finish_match(self):
+        """比赛时间到: 打印最终比分 (tools/match_farm.py 解析这一行) 并退出仿真"""
+        self.report_stats()
+        print(f"[MATCH] ns={net.NAMESPACE} t={self.sim_time:.1f} "
+              f"blue={self.score_blue} red={self.score_red}", flush=True)
+        self.link.close()
+        self.robot.simulationQuit(0)
+
+    def play_tick(self, game_steps):
+        """一个仿真步内的全部决策 (指令先进入发送队列，由 run 统一 flush)"""
+        PHASE_1_STABILIZE = 50 
+        PHASE_2_TRIGGER_KICK = PHASE_1_STABILIZE + 10 
+        PHASE_3_WAIT_ANIMATION = PHASE_2_TRIGGER_KICK + 80 
+
+        # 本 tick 唯一一次读取 Webots 世界状态
+        self.world.update(self.sim_time)
+        bx, by = self.world.ball_xy()
+        self.prof.mark("world")
+
+        # 开场阶段不会进球重置，直接记入历史；比赛阶段在重置之后记
+        if game_steps < PHASE_3_WAIT_ANIMATION: self.history.observe(self.world, self.ball_pred)
+
+        # === 阶段 1: 开场表演 (可注释) ===
+        if game_steps < PHASE_1_STABILIZE:
+            for rid in self.all_ids: self.send_cmd(rid, "STOP")
+            self.update_minimap(bx, by)
+            return 
+
+        elif game_steps < PHASE_2_TRIGGER_KICK:
+            for rid in self.all_ids: self.send_cmd(rid, "KICK_L")
             self.update_minimap(bx, by)
+            return 
+
+        elif game_steps < PHASE_3_WAIT_ANIMATION:
+            self.update_minimap(bx, by)
+            return 
+        # ==============================
+        
+        # === 阶段 2: 比赛逻辑 ===
+        
+        # 计分板重置
+        if bx > 4.5:
+            self.score_red += 1
+            self.ball.getField("translation").setSFVec3f([0, 0, 0.1])
+            self.ball.resetPhysics()
+            bx, by = 0, 0
+            self.world.set_ball(bx, by)
+        elif bx < -4.5:
+            self.score_blue += 1
+            self.ball.getField("translation").setSFVec3f([0, 0, 0.1])
+            self.ball.resetPhysics()
+            bx, by = 0, 0
+            self.world.set_ball(bx, by)
+
+        # 本 tick 最终的快照进入历史 + 球预测 (进球重置会被识别为瞬移)，避障改用外推位置
+        self.history.observe(self.world, self.ball_pred)
+        self.nav.update(self.world)
+        self.prof.mark("history")
+
+        # 获取位置信息
+        blue_goal = self.blue_goal
+        red_goal = self.red_goal
+
+        # 角色分配 (换了角色的机器人本 tick 重新决策)
+        self.update_roles(blue_goal, red_goal, bx, by, is_red=False)
+        self.update_roles(red_goal, blue_goal, bx, by, is_red=True)
+        self.prof.mark("roles")
+
+        # 本 tick 哪些机器人需要重新决策
+        self.due = self.scheduler.due(self.tick, self.world)
+
+        # 计算指令 (注意 goal_target 的传参)
+        # 蓝队: Own=blue_goal(+4.5), Target=red_goal(-4.5)
+        blue_cmds = self.assign_roles_and_compute(
+            self.blue_slots, blue_goal, red_goal, bx, by, is_red=False)
+        
+        # 红队: Own=red_goal(-4.5), Target=blue_goal(+4.5)
+        red_cmds = self.assign_roles_and_compute(
+            self.red_slots, red_goal, blue_goal, bx, by, is_red=True)
+        self.prof.mark("strategy")
+
+        # === 发送蓝队指令 ===
+        for i, slot in enumerate(self.blue_slots):
+            if not self.world.valid[slot]: continue
+            rid = self.slot_ids[slot]
+            # 1. 检测摔倒
+            fall_cmd = self.check_fall(slot, rid)
+            if fall_cmd: 
+                self.send_cmd(rid, "INTERRUPT_" + fall_cmd)
+            elif self.recovering[rid]:
+                continue # 正在起身，跳过
+            else: 
+                self.send_cmd(rid, blue_cmds[i])
+
+        # === 发送红队指令 ===
+        for i, slot in enumerate(self.red_slots):
+            if not self.world.valid[slot]: continue
+            rid = self.slot_ids[slot]
+            fall_cmd = self.check_fall(slot, rid)
+            if fall_cmd: 
+                self.send_cmd(rid, "INTERRUPT_" + fall_cmd)
+            elif self.recovering[rid]:
+                continue
+            else: 
+                self.send_cmd(rid, red_cmds[i])
+        self.prof.mark("send")
+        
+        self.update_minimap(bx, by)
+        self.prof.mark("minimap")
 
 if __name__ == "__main__":
     TeamSupervisor().run()
\ No newline at end of file
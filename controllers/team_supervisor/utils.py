@@ -1,4 +1,5 @@
 import math
+import numpy as np
 
 def norm2(dx, dy):
     return math.sqrt(dx*dx + dy*dy)
@@ -16,6 +17,27 @@ def wrap_pi(a):
     while a < -math.pi: a += 2*math.pi
     return a
 
+# ===== 数组版本 (批量策略用，逐元素结果与上面的标量版本相同) =====
+def norm2_arr(dx, dy):
+    return np.sqrt(dx*dx + dy*dy)
+
+def normalize_arr(dx, dy):
+    n = norm2_arr(dx, dy)
+    ok = n >= 1e-9
+    safe = np.where(ok, n, 1.0)
+    return np.where(ok, dx/safe, 0.0), np.where(ok, dy/safe, 0.0)
+
+def clamp_arr(v, lo, hi):
+    return np.maximum(lo, np.minimum(hi, v))
+
+def wrap_pi_arr(a):
+    """闭式的 wrap_pi: 一次减去整数个 2pi (|a| <= 3pi 时与循环版逐位相同)"""
+    a = np.asarray(a, dtype=float)
+    up = np.ceil((-math.pi - a) / (2*math.pi))   # a < -pi 时要加几次
+    down = np.ceil((a - math.pi) / (2*math.pi))  # a > pi 时要减几次
+    k = np.where(a < -math.pi, up, np.where(a > math.pi, -down, 0.0))
+    return np.where(k == 0.0, a, a + k * (2*math.pi))
+
 def get_heading(node):
     """从Webots节点获取朝向角"""
     o = node.getOrientation()
@@ -0,0 +1,197 @@
+import numpy as np
+from spatial import SpatialHash
+
+# 两个机器人距离小于此值视为同一个 (用于在障碍物里排除自己)
+SELF_EPS = 0.01
+
+class ObstacleSet:
+    """
+    某个机器人视角下的障碍物 (已排除自己)。
+    pos 为障碍物坐标 (k, 2)；origin 为观察者坐标，
+    push / dist 是快照两两矩阵中对应的行 (origin - 障碍物 及其长度)，
+    避障在 origin 处计算斥力时可以直接复用，不用再算一遍。
+    spatial / mask: 本 tick 全体机器人的空间哈希，以及哪些槽位属于这个集合，
+    near() / near_segment() / segment_blockers() 用它只取附近的障碍物。
+    可以像旧的 [(x, y), ...] 列表一样迭代。
+    """
+    __slots__ = ("pos", "origin", "push", "dist", "spatial", "mask", "_rank")
+
+    def __init__(self, pos, origin=None, push=None, dist=None, spatial=None, mask=None):
+        self.pos = pos
+        self.origin = origin
+        self.push = push
+        self.dist = dist
+        self.spatial = spatial
+        self.mask = mask
+        self._rank = None
+
+    def __len__(self):
+        return len(self.pos)
+
+    def __iter__(self):
+        return iter(self.pos.tolist())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.pos if dtype is None else self.pos.astype(dtype)
+
+    def _compact(self, slots):
+        """哈希返回的槽位号 -> self.pos 的行号列表 (去掉不在集合里的)"""
+        if not slots: return slots
+        if self._rank is None:
+            self._rank = np.where(self.mask, np.cumsum(self.mask) - 1, -1).tolist()
+        rank = self._rank
+        return [rank[s] for s in slots if rank[s] >= 0]
+
+    def near(self, x, y, r):
+        """可能在 (x, y) 半径 r 以内的障碍物行号 (升序列表，超集)；没有空间哈希时返回 None"""
+        if self.spatial is None: return None
+        return self._compact(self.spatial.candidates_radius(x, y, r))
+
+    def near_segment(self, x0, y0, x1, y1, r):
+        """可能在线段 r 以内的障碍物行号 (升序列表，超集)；没有空间哈希时返回 None"""
+        if self.spatial is None: return None
+        return self._compact(self.spatial.candidates_segment(x0, y0, x1, y1, r))
+
+    def segment_blockers(self, x0, y0, x1, y1, r):
+        """挡住线段的障碍物行号 (spatial.blocking_mask 判据，精确)；没有空间哈希时返回 None"""
+        if self.spatial is None: return None
+        return self._compact(self.spatial.segment_blockers(x0, y0, x1, y1, r))
+
+class WorldSnapshot:
+    """
+    一个仿真步内的世界状态 (所有机器人 + 球)。
+    每个 step 只调用一次 update()，每个节点只读一次 getPosition / getOrientation，
+    同一个 tick 内的所有模块 (决策、摔倒检测、小地图) 都读这里，保证看到的是同一份数据。
+    数组按机器人槽位 (slot) 索引，顺序与 BLUE_DEFS + RED_DEFS 一致，缺失的节点 valid=False。
+    """
+
+    def __init__(self, nodes, ball):
+        self.nodes = list(nodes)
+        self.ball_node = ball
+        n = len(self.nodes)
+
+        self.valid = np.array([nd is not None for nd in self.nodes], dtype=bool)
+        self.slots = [i for i, nd in enumerate(self.nodes) if nd is not None]
+
+        # 预分配，update() 里原地写入
+        self.orient = np.zeros((n, 9))
+        self.pos = np.zeros((n, 2))
+        self.heading = np.zeros(n)
+        self.z_axis = np.zeros((n, 3))
+        self.z_axis[:, 2] = 1.0
+        self.ball = np.zeros(2)
+        self.time = 0.0
+
+        # 两两矩阵: push[i, j] = pos[i] - pos[j] (j 对 i 的斥力方向)，dist[i, j] 为其长度
+        # 缺失的机器人距离记为 inf
+        self.push = np.zeros((n, n, 2))
+        self.dist = np.full((n, n), np.inf)
+
+        # 避障用的障碍物位置: 默认就是当前位置；predict_obstacles() 可以换成外推后的位置
+        self._pred_pos = np.zeros((n, 2))
+        self._pred_push = np.zeros((n, n, 2))
+        self._pred_dist = np.zeros((n, n))
+        self.obst_pos, self.obst_push, self.obst_dist = self.pos, self.push, self.dist
+
+        # 障碍物的空间哈希: 每 tick 障碍物坐标定下来后，第一次查询时重建一次
+        # use_spatial=False 时障碍物集合不带哈希，查询退回全量扫描 (结果相同)
+        self.use_spatial = True
+        self._spatial = SpatialHash()
+        self._spatial_dirty = True
+
+        # Python float 版本 (策略代码是标量运算，用 float 比 numpy 标量快得多)
+        self.pos_list = [(0.0, 0.0)] * n
+        self.heading_list = [0.0] * n
+
+    def update(self, t):
+        """从 Webots 读取一次所有节点状态"""
+        self.time = t
+        for i in self.slots:
+            node = self.nodes[i]
+            p = node.getPosition()
+            self.pos[i, 0] = p[0]
+            self.pos[i, 1] = p[1]
+            self.orient[i] = node.getOrientation()
+
+        # 朝向角 & Z 轴 (与 utils.get_heading / utils.get_axes 相同的公式)
+        np.arctan2(self.orient[:, 3], self.orient[:, 0], out=self.heading)
+        self.z_axis[:, 0] = self.orient[:, 2]
+        self.z_axis[:, 1] = self.orient[:, 5]
+        self.z_axis[:, 2] = self.orient[:, 8]
+
+        if self.ball_node:
+            bp = self.ball_node.getPosition()
+            self.ball[0] = bp[0]
+            self.ball[1] = bp[1]
+
+        self.refresh()
+
+    def load_state(self, t, ball, pos, heading, z_axis, valid):
+        """不经过 Webots，直接用录像里的一条记录填充快照 (离线回放用)"""
+        self.time = float(t)
+        self.ball[:] = ball
+        self.pos[:] = pos
+        self.heading[:] = heading
+        self.z_axis[:] = z_axis
+        self.valid[:] = valid
+        self.slots = np.flatnonzero(self.valid).tolist()
+        self.refresh()
+
+    def refresh(self):
+        """由 pos / heading 重建 Python float 副本和两两矩阵"""
+        self.pos_list = [tuple(p) for p in self.pos.tolist()]
+        self.heading_list = self.heading.tolist()
+        self.update_pairwise()
+
+    def update_pairwise(self):
+        """所有机器人两两之间的向量和距离，每 tick 算一次 (O(n^2)，但都在 numpy 里完成)"""
+        np.subtract(self.pos[:, None, :], self.pos[None, :, :], out=self.push)
+        np.hypot(self.push[..., 0], self.push[..., 1], out=self.dist)
+        invalid = ~self.valid
+        self.dist[invalid, :] = np.inf
+        self.dist[:, invalid] = np.inf
+        self.obst_pos, self.obst_push, self.obst_dist = self.pos, self.push, self.dist
+        self._spatial_dirty = True
+
+    def predict_obstacles(self, pred_pos):
+        """
+        避障时使用其他机器人的外推位置 pred_pos (n, 2) (来自 WorldHistory)。
+        选哪些机器人当障碍物仍按当前距离判断，只是坐标和斥力向量换成外推后的。
+        """
+        self._pred_pos[:] = pred_pos
+        np.subtract(self.pos[:, None, :], self._pred_pos[None, :, :], out=self._pred_push)
+        np.hypot(self._pred_push[..., 0], self._pred_push[..., 1], out=self._pred_dist)
+        self.obst_pos, self.obst_push, self.obst_dist = self._pred_pos, self._pred_push, self._pred_dist
+        self._spatial_dirty = True
+
+    def spatial(self):
+        """本 tick 障碍物坐标 (obst_pos) 的空间哈希"""
+        if self._spatial_dirty:
+            self._spatial.build(self.obst_pos, self.valid)
+            self._spatial_dirty = False
+        return self._spatial
+
+    def obstacles_for(self, slot):
+        """slot 号机器人的障碍物 (排除自己以及与自己重合的点)，直接取距离矩阵的一行做筛选"""
+        row = self.dist[slot]
+        mask = (row > SELF_EPS) & (row < np.inf)
+        return ObstacleSet(self.obst_pos[mask], origin=self.pos_list[slot],
+                           push=self.obst_push[slot, mask], dist=self.obst_dist[slot, mask],
+                           spatial=self.spatial() if self.use_spatial else None, mask=mask)
+
+    def set_ball(self, x, y):
+        """本 tick 内手动改了球的位置 (进球重置) 时同步快照"""
+        self.ball[0] = x
+        self.ball[1] = y
+
+    def ball_xy(self):
+        return float(self.ball[0]), float(self.ball[1])
+
+    def pose(self, slot):
+        """返回 (x, y, theta)，均为 Python float"""
+        x, y = self.pos_list[slot]
+        return x, y, self.heading_list[slot]
+
+    def positions(self):
+        """所有在场机器人的位置列表 (用于避障)"""
+        return [self.pos_list[i] for i in self.slots]
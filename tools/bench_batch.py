@@ -0,0 +1,167 @@
+"""
+批量策略基准: 随机生成很多个 4v4 局面 (每个局面 8 个机器人 + 1 个球), 比较
+"Supervisor 实际走的路径 (逐个机器人 tactics.run_role, 带 Navigator 全局规划和按 NAO_CMD_FILTER 的指令滞回)" 与
+"所有局面的所有机器人一次批量调用 (strategies/batched.py)" 的耗时, 以及两边指令不同的机器人数。
+批量版没有规划和滞回, 直线被挡住 (规划生效) 时指令会不一样, 所以这个数只是报告, 不算错。
+随机局面之间没有连续性, 规划每次都从头搜索, 比比赛里 (路径可以复用) 慢; 同样的工作量 (nav=None, hyst=None) 的标量耗时也一起打印。
+
+另外核对批量版与不带规划 / 滞回的 run_role (nav=None, hyst=None) 逐行完全一致 (向量化本身对不对), 不一致就失败退出。
+
+用法:
+    python tools/bench_batch.py [--worlds 1 100 500] [--rounds 5] [--seed 0]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+import tactics
+from ball_predictor import BallPredictor
+from cmd_filter import CommandFilter
+from movement import CMD_STOP, cmd_names
+from planner import Navigator
+from strategies import batched
+from world import SELF_EPS, WorldSnapshot
+
+N_ROBOTS = 8
+BLUE_GOAL, RED_GOAL = (4.5, 0.0), (-4.5, 0.0)
+# 槽位 0-3 蓝队, 4-7 红队 (与 protocol.ROBOT_IDS 一致)
+ROLES = tactics.team_roles(False) + tactics.team_roles(True)
+GOAL_OWN = np.array([BLUE_GOAL] * 4 + [RED_GOAL] * 4)
+GOAL_TARGET = np.array([RED_GOAL] * 4 + [BLUE_GOAL] * 4)
+
+
+def random_worlds(rng, m):
+    """m 个局面: 球 (m, 2), 机器人位置 (m, 8, 2), 朝向 (m, 8)；一半机器人围在球附近 (触发控球 / 绕行 / 避障)"""
+    ball = rng.uniform((-4.2, -2.8), (4.2, 2.8), size=(m, 2))
+    pos = rng.uniform((-4.5, -3.0), (4.5, 3.0), size=(m, N_ROBOTS, 2))
+    near = rng.random((m, N_ROBOTS)) < 0.5
+    pos[near] = (ball[:, None, :] + rng.normal(0.0, 0.35, size=(m, N_ROBOTS, 2)))[near]
+    heading = rng.uniform(-math.pi, math.pi, size=(m, N_ROBOTS))
+    return ball, pos, heading
+
+
+def ball_predictor(rng):
+    """所有局面共用的球预测器: 喂一段滚动的球轨迹，让守门员的落点预测有时生效"""
+    bp = BallPredictor()
+    x, y = rng.uniform(-2, 2, 2)
+    vx, vy = rng.uniform(-1.5, 1.5, 2)
+    for k in range(10):
+        bp.update(k * 0.032, x + vx * k * 0.032, y + vy * k * 0.032)
+    return bp
+
+
+def run_scalar(worlds, ball, pos, heading, bp, navs=None, filters=None):
+    """
+    逐个机器人 run_role。给了 navs / filters (每个局面一套 Navigator / CommandFilter) 就和 Supervisor 一样带规划和滞回,
+    否则 nav=None, hyst=None。局面之间没有连续性, 滞回状态每个局面先清空
+    """
+    out = []
+    z = np.tile((0.0, 0.0, 1.0), (N_ROBOTS, 1))
+    valid = np.ones(N_ROBOTS, bool)
+    for w, world in enumerate(worlds):
+        world.load_state(0.0, ball[w], pos[w], heading[w], z, valid)
+        bx, by = world.ball_xy()
+        nav = navs[w] if navs else None
+        hyst = filters[w] if filters else None
+        if nav: nav.update(world)
+        for slot in range(N_ROBOTS):
+            if hyst: hyst.reset(slot)
+            out.append(tactics.run_role(ROLES[slot], world, slot, bx, by,
+                                        tuple(GOAL_OWN[slot]), tuple(GOAL_TARGET[slot]), bp,
+                                        nav.state(slot) if nav else None, hyst.state(slot) if hyst else None))
+    return out
+
+
+def run_batched(ball, pos, heading, bp):
+    """所有局面拼成 m*8 行，每行的障碍物是同一局面的其他机器人"""
+    m = len(ball)
+    x, y, theta = pos[..., 0].ravel(), pos[..., 1].ravel(), heading.ravel()
+    bx, by = np.repeat(ball[:, 0], N_ROBOTS), np.repeat(ball[:, 1], N_ROBOTS)
+    obst = np.repeat(pos, N_ROBOTS, axis=0)                       # (m*8, 8, 2)
+    d = np.hypot(x[:, None] - obst[..., 0], y[:, None] - obst[..., 1])
+    mask = (d > SELF_EPS) & (d < np.inf)
+    roles = np.tile(ROLES, m)
+    own, target = np.tile(GOAL_OWN, (m, 1)), np.tile(GOAL_TARGET, (m, 1))
+
+    out = np.full(m * N_ROBOTS, CMD_STOP, dtype=np.int8)
+    for role, fn in ((tactics.ROLE_STRIKER, batched.run_striker_arr),
+                     (tactics.ROLE_DEFENDER, batched.run_defender_arr),
+                     (tactics.ROLE_SUPPORT, batched.run_support_arr)):
+        i = np.flatnonzero(roles == role)
+        goal = target[i] if role != tactics.ROLE_DEFENDER else own[i]
+        out[i] = fn(x[i], y[i], theta[i], bx[i], by[i], goal, obst[i], mask[i])
+    i = np.flatnonzero(roles == tactics.ROLE_GOALIE)
+    out[i] = batched.run_goalie_arr(x[i], y[i], theta[i], bx[i], by[i], own[i], bp)
+    return cmd_names(out).tolist()
+
+
+def check_world_api(ball, pos, heading, bp):
+    """tactics.run_teams_batch (Supervisor 形式: 一个快照、两队一次调用) 与 run_role 逐个对比"""
+    bad = 0
+    world = WorldSnapshot([None] * N_ROBOTS, None)
+    teams = ((range(4), tactics.team_roles(False), BLUE_GOAL, RED_GOAL),
+             (range(4, 8), tactics.team_roles(True), RED_GOAL, BLUE_GOAL))
+    for w in range(len(ball)):
+        world.load_state(0.0, ball[w], pos[w], heading[w], np.tile((0.0, 0.0, 1.0), (N_ROBOTS, 1)), np.ones(N_ROBOTS, bool))
+        bx, by = world.ball_xy()
+        got = tactics.run_teams_batch(world, teams, bx, by, bp)
+        for slot in range(N_ROBOTS):
+            want = tactics.run_role(ROLES[slot], world, slot, bx, by,
+                                    tuple(GOAL_OWN[slot]), tuple(GOAL_TARGET[slot]), bp)
+            bad += got[slot] != want
+    return bad
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--worlds", type=int, nargs="+", default=[1, 100, 500])
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+    bp = ball_predictor(rng)
+
+    print(f"cmd filter {'on' if CommandFilter(N_ROBOTS).enabled else 'off'} (NAO_CMD_FILTER), global planner on\n")
+    print(f"{'worlds':>6} {'robots':>7} {'production/s':>13} {'no-plan/s':>10} {'batched/s':>10} "
+          f"{'vs prod':>8} {'vs no-plan':>10} {'differs':>8} {'mismatch':>9}")
+    bad = 0
+    for m in args.worlds:
+        worlds = [WorldSnapshot([None] * N_ROBOTS, None) for _ in range(m)]
+        navs = [Navigator(N_ROBOTS) for _ in range(m)]
+        filters = [CommandFilter(N_ROBOTS) for _ in range(m)]
+        t_s = t_r = t_b = 0.0
+        differs = mismatch = 0
+        for _ in range(args.rounds):
+            ball, pos, heading = random_worlds(rng, m)
+            t0 = time.perf_counter()
+            a = run_scalar(worlds, ball, pos, heading, bp, navs, filters)
+            t1 = time.perf_counter()
+            b = run_batched(ball, pos, heading, bp)
+            t2 = time.perf_counter()
+            t_s += t1 - t0
+            t_b += t2 - t1
+            ref = run_scalar(worlds, ball, pos, heading, bp)
+            t_r += time.perf_counter() - t2
+            differs += sum(u != v for u, v in zip(a, b))
+            mismatch += sum(u != v for u, v in zip(ref, b))
+            mismatch += check_world_api(ball[:20], pos[:20], heading[:20], bp)
+        n = m * N_ROBOTS * args.rounds
+        bad += mismatch
+        print(f"{m:6d} {m * N_ROBOTS:7d} {n / t_s:13.0f} {n / t_r:10.0f} {n / t_b:10.0f} "
+              f"{t_s / t_b:7.1f}x {t_r / t_b:9.1f}x {differs / n:7.1%} {mismatch:9d}")
+    print("\nproduction: run_role per robot with the planner and NAO_CMD_FILTER, as the supervisor calls it;"
+          " no-plan: run_role with nav=None, hyst=None (the same work as the batch)")
+    print("differs: robots whose batched command is not what the supervisor would send (no planner / hysteresis in the batch)")
+    print("mismatch: rows where the batch differs from run_role with nav=None, hyst=None (must be 0)")
+    if bad: sys.exit("batched strategy output differs from the scalar strategies")
+
+
+if __name__ == "__main__":
+    main()
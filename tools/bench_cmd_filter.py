@@ -0,0 +1,117 @@
+"""
+指令滞回基准: 在 sim2d 的运动学模型里让一个机器人从随机位姿走到随机目标点 (并转向指定朝向),
+同一批场景分别用 "固定阈值" 和 "cmd_filter 滞回 + 最短保持时间" 各跑一遍, 比较到达时间、
+动作启动次数和其中换了动作的次数 (Player 每换一个动作都要从头播放)。
+
+每个 tick 都重新决策 (最容易来回抖动的情况), 指令没变时按保活周期才重发, 与 Supervisor 相同。
+到达: 离目标 < REACH_DIST 且朝向误差 < REACH_FACE 连续保持 REACH_HOLD 秒。
+
+结果只反映 sim2d 的运动模型: 每个动作的位移是从动作文件算出的运动学轨迹, 没有和 Webots / 真机对过, 而且模型里很多场景在时限内根本到不了。
+只能用来看滞回有没有减少换动作的次数, 不能拿到达时间当作真机上的改进; 要下结论得在 Webots 里量。
+
+用法:
+    python tools/bench_cmd_filter.py [--scenarios 100] [--timeout 120] [--seed 0] [--motion-noise 0.1]
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+import net
+import protocol
+from cmd_filter import CmdState
+from movement import action_to_target
+from utils import wrap_pi
+
+from sim2d import field
+
+REACH_DIST = 0.2
+REACH_FACE = 0.6
+REACH_HOLD = 1.0
+# (名字, is_dribbling, can_strafe, 目标距离范围 m)
+SCENARIOS = (
+    ("approach", False, True, (1.0, 3.0)),
+    ("dribble", True, False, (1.0, 3.0)),
+    ("adjust", False, True, (0.1, 0.6)),
+)
+
+
+def run_one(kind, start, target, face, timeout, use_filter, seed, noise):
+    """返回 (到达时间 或 None, 动作启动次数, 换动作次数, 被挡住的切换数)"""
+    _name, dribbling, strafe, _rng = kind
+    f = field.Field2D(seed=seed, motion_noise=noise, robots=("B1",))
+    p = f.players[0]
+    b = p.body
+    b.x, b.y, b.heading = start
+    f.ball.x = f.ball.y = 100.0 # 球放到场外，不碰
+    hyst = CmdState() if use_filter else None
+    keepalive = net.keepalive_ticks()
+    last_cmd, last_sent, seq = None, -10**9, 0
+    starts = switches = 0
+    started = None
+    reached_since = None
+    tx, ty = target
+    for k in range(int(timeout * 1000 / field.TIME_STEP)):
+        f.step(field.TIME_STEP)
+        if p.current_action is not None and p.action_start == f.time:
+            starts += 1
+            if started is not None and p.current_action != started: switches += 1
+            started = p.current_action
+
+        ok = math.hypot(tx - b.x, ty - b.y) < REACH_DIST and abs(wrap_pi(face - b.heading)) < REACH_FACE
+        if not ok:
+            reached_since = None
+        elif reached_since is None:
+            reached_since = f.time
+        elif f.time - reached_since >= REACH_HOLD:
+            return reached_since, starts, switches, hyst.stats["prevented"] if hyst else 0
+
+        cmd = action_to_target(b.x, b.y, b.heading, tx, ty, face, [], use_avoidance=False,
+                               is_dribbling=dribbling, can_strafe=strafe, hyst=hyst)
+        if hyst is not None: cmd = hyst.filter(cmd, f.time)
+        if cmd != last_cmd or k - last_sent >= keepalive:
+            seq += 1
+            f.deliver(p.rid, protocol.encode_cmd_json(seq, p.rid, cmd))
+            last_cmd, last_sent = cmd, k
+    return None, starts, switches, hyst.stats["prevented"] if hyst else 0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", type=int, default=100, help="每类场景的个数")
+    ap.add_argument("--timeout", type=float, default=120.0, help="单个场景最长仿真秒数")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--motion-noise", type=float, default=field.DEFAULT_MOTION_NOISE)
+    args = ap.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print("sim2d motion model only (kinematic odometry of the motion files, not measured in Webots)\n")
+    print(f"{'scenario':<9} {'filter':>6} {'reached':>8} {'mean s':>7} {'median s':>9} "
+          f"{'starts':>7} {'switches':>9} {'prevented':>10}")
+    for kind in SCENARIOS:
+        cases = []
+        for _ in range(args.scenarios):
+            start = (*rng.uniform((-3.0, -2.0), (3.0, 2.0)), rng.uniform(-math.pi, math.pi))
+            d, a = rng.uniform(*kind[3]), rng.uniform(-math.pi, math.pi)
+            target = (start[0] + d * math.cos(a), start[1] + d * math.sin(a))
+            cases.append((start, target, rng.uniform(-math.pi, math.pi), int(rng.integers(1 << 30))))
+        res = {use: [run_one(kind, s, t, fc, args.timeout, use, sd, args.motion_noise) for s, t, fc, sd in cases]
+               for use in (False, True)}
+        times = {use: np.array([r[0] if r[0] is not None else np.nan for r in rs]) for use, rs in res.items()}
+        # 平均时间只算两种模式都到达了的场景，超时的另外计数
+        both = ~np.isnan(times[False]) & ~np.isnan(times[True])
+        for use in (False, True):
+            rs, t = res[use], times[use]
+            tb = t[both] if both.any() else np.array([math.nan])
+            print(f"{kind[0]:<9} {'on' if use else 'off':>6} {int((~np.isnan(t)).sum()):4d}/{len(rs):<3d} "
+                  f"{np.mean(tb):7.1f} {np.median(tb):9.1f} {sum(r[1] for r in rs):7d} "
+                  f"{sum(r[2] for r in rs):9d} {sum(r[3] for r in rs):10d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+步态速度基准: 在 sim2d 里让一个机器人持续执行同一个移动指令 (按保活周期重发, 与 Supervisor 相同),
+分别关闭 / 打开移动动作衔接 (NAO_LOCO_CHAIN), 比较稳态速度 (m/s 或 rad/s) 和动作启动次数。
+
+sim2d 的 SimMotion 按 Webots Motion 的语义播放 (没播完时 play() 不重新开始), 位移按动作文件的运动学轨迹逐帧施加,
+所以不衔接时 "Player 的动作已结束、动作文件还在播 / 重新从站立姿态起步" 的空档会体现在速度里。
+--switch 秒: 每隔这么久在 FWD 和 TURN_L 之间切换一次, 看换动作时的损失。
+
+输出的速度是模型估计, 不是测量: 它由 sim2d/gait.py 从动作文件算出的位移轨迹 (假设脚不打滑) 决定,
+衔接开 / 关的差别也是这个模型的结果。真实的效果要在 Webots 里量:
+
+--webots: 改为从 Webots 比赛录像 (NAO_RECORD) 里量。Supervisor 读到的机器人位置里, 找出每个机器人同一条移动指令
+连续保持至少 --min-stretch 秒 (没在踢球 / 起身) 的时段, 累计这些时段里沿朝向的前进量、横移量和转角, 除以时长。
+录像按所在目录分组 (例如 NAO_LOCO_CHAIN=0 的比赛录到 rec/chain_off, 默认的录到 rec/chain_on), 每组一张表。
+Player 的 NAO_LOCO_CHAIN 不在录像里, 分组要自己保证。
+
+用法:
+    python tools/bench_gait.py [--sec 120] [--warmup 10] [--switch 0]
+    python tools/bench_gait.py --webots rec/chain_off/*.npy rec/chain_on/*.npy [--min-stretch 5]
+"""
+import argparse
+import math
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+import net
+import protocol
+from recorder import NO_CMD, load_match
+
+from sim2d import field
+
+
+def run_one(cmds, sec, warmup, switch, chain):
+    """返回 (线速度 m/s, 角速度 rad/s, 统计期内动作启动次数)"""
+    f = field.Field2D(seed=0, motion_noise=0.0, chain=chain, robots=("B1",))
+    p = f.players[0]
+    b = p.body
+    b.x, b.y, b.heading = 0.0, 0.0, 0.0
+    f.ball.x = f.ball.y = 100.0 # 球放到场外，不碰
+    keepalive = net.keepalive_ticks()
+    last_cmd, last_sent, seq = None, -10**9, 0
+    starts = 0
+    sx = sy = th = 0.0
+    for k in range(int((warmup + sec) * 1000 / field.TIME_STEP)):
+        px, py, ph = b.x, b.y, b.heading
+        f.step(field.TIME_STEP)
+        if f.time > warmup:
+            sx += b.x - px
+            sy += b.y - py
+            th += (b.heading - ph + math.pi) % (2 * math.pi) - math.pi
+            if p.current_action is not None and p.action_start == f.time: starts += 1
+        # 累计位移，机器人拉回中圈，避免走到场边被挡住
+        if math.hypot(b.x, b.y) > 2.0: b.x = b.y = 0.0
+        cmd = cmds[int(f.time // switch) % len(cmds)] if switch else cmds[0]
+        if cmd != last_cmd or k - last_sent >= keepalive:
+            seq += 1
+            f.deliver(p.rid, protocol.encode_cmd_json(seq, p.rid, cmd))
+            last_cmd, last_sent = cmd, k
+    return math.hypot(sx, sy) / sec, abs(th) / sec, starts
+
+
+def measure_recording(path, min_stretch, totals):
+    """
+    一场录像里每个机器人保持同一条移动指令的时段 (>= min_stretch 秒), 按指令累计进 totals:
+    cmd -> [时段数, 秒, 前进 m, 横移 m, 转角 rad] (位移在上一 tick 的机器人坐标系里算, 躯干晃动前后抵消)
+    """
+    rec, _meta = load_match(path)
+    if len(rec) < 2: return
+    t = rec["t"]
+    for slot in range(rec["pos"].shape[1]):
+        op = rec["cmd"][:, slot]
+        ok = rec["valid"][:, slot] & ~rec["busy"][:, slot] & ~rec["recovering"][:, slot]
+        x, y, h = rec["pos"][:, slot, 0], rec["pos"][:, slot, 1], rec["heading"][:, slot]
+        held, start = None, 0
+        for k in range(len(rec) + 1):
+            # 当前保持的指令: 有新指令就换, 踢球 / 起身 / 不在场就断开
+            cmd = held
+            if k == len(rec) or not ok[k]: cmd = None
+            elif op[k] != NO_CMD: cmd = protocol.op_to_cmd(int(op[k]))
+            if cmd == held: continue
+            if held in field.LOCO_CMDS and t[k - 1] - t[start] >= min_stretch:
+                c, sn = np.cos(h[start:k - 1]), np.sin(h[start:k - 1])
+                dx, dy = np.diff(x[start:k]), np.diff(y[start:k])
+                acc = totals[held]
+                acc[0] += 1
+                acc[1] += t[k - 1] - t[start]
+                acc[2] += float(np.sum(dx * c + dy * sn))
+                acc[3] += float(np.sum(-dx * sn + dy * c))
+                acc[4] += float(np.sum((np.diff(h[start:k]) + np.pi) % (2 * np.pi) - np.pi))
+            held, start = cmd, k
+
+
+def main_webots(paths, min_stretch):
+    groups = defaultdict(list)
+    for path in paths: groups[os.path.basename(os.path.dirname(os.path.abspath(path)))].append(path)
+    print(f"measured from match recordings (supervisor positions, movement commands held >= {min_stretch:g} s)\n")
+    print(f"{'group':<16} {'cmd':<7} {'runs':>5} {'sec':>7} {'fwd m/s':>8} {'side m/s':>9} {'rad/s':>7}")
+    for name, files in groups.items():
+        totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+        for path in files: measure_recording(path, min_stretch, totals)
+        for cmd in field.LOCO_CMDS:
+            n, sec, fwd, side, turn = totals[cmd]
+            if not n: continue
+            print(f"{name:<16} {cmd:<7} {n:5d} {sec:7.0f} {fwd / sec:8.3f} {side / sec:9.3f} {turn / sec:7.3f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sec", type=float, default=120.0, help="统计时长 (仿真秒)")
+    ap.add_argument("--warmup", type=float, default=10.0, help="开头不计入的秒数 (起步)")
+    ap.add_argument("--switch", type=float, default=0.0, help=">0 时 FWD / TURN_L 每隔这么多秒切换一次")
+    ap.add_argument("--webots", nargs="+", metavar="NPY", help="从 Webots 比赛录像量速度 (按所在目录分组)")
+    ap.add_argument("--min-stretch", type=float, default=5.0, help="--webots: 同一移动指令至少保持这么多秒才统计")
+    args = ap.parse_args()
+    if args.webots: return main_webots(args.webots, args.min_stretch)
+
+    cases = [(c,) for c in field.LOCO_CMDS]
+    if args.switch: cases = [("FWD", "TURN_L")]
+    print("sim2d model estimate (kinematic odometry of the motion files), not a measured speed; use --webots to measure\n")
+    print(f"{'cmd':<12} {'chain':>5} {'m/s':>7} {'rad/s':>7} {'starts':>7}")
+    for cmds in cases:
+        for chain in (False, True):
+            v, w, starts = run_one(cmds, args.sec, args.warmup, args.switch, chain)
+            print(f"{'/'.join(cmds):<12} {'on' if chain else 'off':>5} {v:7.3f} {w:7.3f} {starts:7d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+反应延迟基准: 用 headless_sim 跑完整比赛 (Supervisor + 策略不变), NAO_LOCO_PREEMPT 取 0 / 1 / 2
+(不抢占 / 只为踢球和 STOP 抢占 / 移动动作之间也抢占) 各跑一遍, 统计每条新指令从 Player 收到到开始执行的时间,
+按踢球 / STOP 和移动指令分开打印直方图。
+
+只统计换了的指令 (保活重发、已经在执行的指令不算), 打断 (起身) 不算。
+
+用法:
+    python tools/bench_preempt.py [--matches 2] [--match-sec 300] [--seed 0] [--fall-rate 0.0]
+"""
+import argparse
+import os
+
+import numpy as np
+
+import headless_sim
+import motion_file
+from sim2d import field
+
+BINS = (0.0, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, np.inf)
+
+
+def collect(mode, args):
+    os.environ["NAO_LOCO_PREEMPT"] = str(mode)
+    lat, kicks = {"kick/stop": [], "loco": []}, 0
+    for k in range(args.matches):
+        _sup, f, _wall = headless_sim.run_match(args.seed + k, args.match_sec, args.fall_rate)
+        for p in f.players:
+            for cmd, dt in p.latencies: lat["loco" if cmd in field.LOCO_CMDS else "kick/stop"].append(dt)
+        kicks += f.kicks
+    return {g: np.array(v) for g, v in lat.items()}, kicks
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=2)
+    ap.add_argument("--match-sec", type=float, default=300.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--fall-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    labels = [f"<{hi:g}s" if np.isfinite(hi) else f">={lo:g}s" for lo, hi in zip(BINS, BINS[1:])]
+    print(f"{'preempt':<8} {'cmds':<10} {'n':>5} " + " ".join(f"{s:>7}" for s in labels)
+          + f" {'mean':>6} {'p50':>6} {'p90':>6} {'p99':>6} {'kicks':>6}")
+    for mode in (motion_file.PREEMPT_OFF, motion_file.PREEMPT_ATOMIC, motion_file.PREEMPT_LOCO):
+        groups, kicks = collect(mode, args)
+        for g, lat in groups.items():
+            if not len(lat): continue
+            hist, _ = np.histogram(lat, bins=BINS)
+            pct = 100.0 * hist / len(lat)
+            q = np.percentile(lat, (50, 90, 99))
+            print(f"{mode:<8d} {g:<10} {len(lat):5d} " + " ".join(f"{v:6.1f}%" for v in pct)
+                  + f" {lat.mean():6.2f} {q[0]:6.2f} {q[1]:6.2f} {q[2]:6.2f} {kicks:6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+指令协议基准测试: 每个 tick (8 个机器人) 的编码 / 解码开销, JSON vs 二进制。
+
+用法:
+    python tools/bench_protocol.py [--ticks 20000] [--backlog 3]
+
+--backlog 模拟 Player 每帧缓冲区里积压的包数 (其中只有最后一条是有效的)。
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "controllers", "common"))
+import protocol
+
+CMDS = ["FWD", "TURN_L", "TURN_R", "SIDE_L", "SIDE_R", "STOP", "KICK_L", "INTERRUPT_GETUP_FRONT"]
+
+
+def bench(label, fn, ticks):
+    t0 = time.perf_counter()
+    fn(ticks)
+    dt = time.perf_counter() - t0
+    print(f"{label:<32} {dt / ticks * 1e6:8.2f} us/tick")
+    return dt
+
+
+def encode_json(ticks):
+    enc = protocol.encode_cmd_json
+    for k in range(ticks):
+        for i, rid in enumerate(protocol.ROBOT_IDS):
+            enc(k, rid, CMDS[(k + i) % len(CMDS)])
+
+
+def encode_binary(ticks):
+    enc = protocol.encode_cmd
+    for k in range(ticks):
+        t = k * 0.032
+        for i, rid in enumerate(protocol.ROBOT_IDS):
+            enc(k, rid, CMDS[(k + i) % len(CMDS)], t)
+
+
+def make_decoder(encode, backlog):
+    # 每个机器人每帧收到 backlog 个包, 模拟 poll_cmd 读空缓冲区
+    frames = []
+    for k in range(64):
+        frames.append([[encode(k * backlog + j, rid, CMDS[(k + j) % len(CMDS)])
+                        for j in range(backlog)] for rid in protocol.ROBOT_IDS])
+
+    def decode(ticks):
+        latest = [-1] * len(protocol.ROBOT_IDS)
+        for k in range(ticks):
+            frame = frames[k % len(frames)]
+            if k % len(frames) == 0:
+                latest = [-1] * len(protocol.ROBOT_IDS)
+            for i, datagrams in enumerate(frame):
+                _msg, latest[i] = protocol.latest_cmd(datagrams, latest[i])
+    return decode
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ticks", type=int, default=20000)
+    ap.add_argument("--backlog", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"robots={len(protocol.ROBOT_IDS)} ticks={args.ticks} backlog={args.backlog}")
+    print(f"packet size: json~{len(protocol.encode_cmd_json(123456, 'B1', 'TURN_L'))} B, "
+          f"binary={protocol.CMD_HEADER.size} B")
+    ej = bench("encode json", encode_json, args.ticks)
+    eb = bench("encode binary", encode_binary, args.ticks)
+    dj = bench("decode json (poll_cmd)", make_decoder(protocol.encode_cmd_json, args.backlog), args.ticks)
+    db = bench("decode binary (poll_cmd)", make_decoder(
+        lambda s, r, c: protocol.encode_cmd(s, r, c, 0.0), args.backlog), args.ticks)
+    print(f"speedup: encode x{ej / eb:.1f}, decode x{dj / db:.1f}")
+
+
+if __name__ == "__main__":
+    main()
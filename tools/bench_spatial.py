@@ -0,0 +1,102 @@
+"""
+空间哈希基准: 随机摆放 N 个机器人, 对每个机器人做一次避障斥力 + 三次射门线检查 (与 run_striker 相同),
+比较 "空间哈希 (每 tick 重建一次)" 与 "全量线性扫描" 的耗时, 并逐条核对两边结果完全一致。
+
+用法:
+    python tools/bench_spatial.py [--robots 8 22 100] [--ticks 200] [--seed 0]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+from movement import AVOID_RADIUS, get_avoidance_heading
+from spatial import segment_distance
+from strategies.striker import SHOT_CLEARANCE, is_shot_blocked
+from world import WorldSnapshot
+
+GOAL = (4.5, 0.0)
+
+
+def random_state(rng, n):
+    # 往球周围扎堆, 与比赛里的分布更像 (一半均匀, 一半在球附近)
+    ball = rng.uniform((-4.0, -2.5), (4.0, 2.5))
+    pos = rng.uniform((-4.5, -3.0), (4.5, 3.0), size=(n, 2))
+    k = n // 2
+    pos[:k] = ball + rng.normal(0.0, 0.6, size=(k, 2))
+    heading = rng.uniform(-np.pi, np.pi, n)
+    return ball, pos, heading
+
+
+def run_queries(world, obstacle_sets, ball):
+    bx, by = ball
+    out = []
+    for slot, obs in obstacle_sets:
+        x, y, _ = world.pose(slot)
+        out.append(get_avoidance_heading(x, y, bx, by, obs))
+        for gy in (0.0, 0.6, -0.6):
+            out.append(is_shot_blocked(bx, by, GOAL[0], gy, obs))
+    return out
+
+
+def check_queries(world, ball):
+    """哈希的精确查询 vs 暴力结果"""
+    sh = world.spatial()
+    pos = world.obst_pos
+    ids = np.flatnonzero(world.valid)
+    bx, by = ball
+    for slot in world.slots:
+        x, y, _ = world.pose(slot)
+        want = ids[np.hypot(pos[ids, 0] - x, pos[ids, 1] - y) < AVOID_RADIUS]
+        if not np.array_equal(sh.query_radius(x, y, AVOID_RADIUS), want): return False
+    for gy in (0.0, 0.6, -0.6):
+        want = ids[segment_distance(pos[ids], bx, by, GOAL[0], gy) < SHOT_CLEARANCE]
+        if not np.array_equal(sh.query_segment(bx, by, GOAL[0], gy, SHOT_CLEARANCE), want): return False
+    return True
+
+
+def bench(n, ticks, seed):
+    """返回 (哈希 ms/tick, 线性 ms/tick, 不一致的 tick 数)；每 tick 的计时都包含快照刷新和障碍物集合的构建"""
+    rng = np.random.default_rng(seed)
+    world = WorldSnapshot([None] * n, None)
+    z = np.tile((0.0, 0.0, 1.0), (n, 1))
+    valid = np.ones(n, bool)
+    elapsed = {True: 0.0, False: 0.0}
+    mismatches = 0
+    for k in range(ticks):
+        ball, pos, heading = random_state(rng, n)
+        results = {}
+        for use in (True, False):
+            world.use_spatial = use
+            t0 = time.perf_counter()
+            world.load_state(k * 0.032, ball, pos, heading, z, valid)
+            sets = [(s, world.obstacles_for(s)) for s in world.slots]
+            results[use] = run_queries(world, sets, ball)
+            elapsed[use] += time.perf_counter() - t0
+        if results[True] != results[False] or not check_queries(world, ball): mismatches += 1
+    return elapsed[True] / ticks, elapsed[False] / ticks, mismatches
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--robots", type=int, nargs="+", default=[8, 22, 100])
+    ap.add_argument("--ticks", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'robots':>6} {'hash ms/tick':>13} {'linear ms/tick':>15} {'speedup':>8} {'mismatch':>9}")
+    bad = 0
+    for n in args.robots:
+        th, tl, mm = bench(n, args.ticks, args.seed)
+        bad += mm
+        print(f"{n:6d} {th * 1e3:13.3f} {tl * 1e3:15.3f} {tl / th:7.2f}x {mm:9d}")
+    if bad: sys.exit("spatial hash results differ from the linear scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Player 启动基准: 同时起 8 个进程 (和一场比赛的 8 个 Player 一样, 各用自己的机器人 ID), 每个进程构造一个真正的
+nao_player.NaoPlayer (在 controllers/nao_player 目录下, 和 Webots 启动控制器时一样), 报告构造耗时、
+其中建移动动作衔接表的耗时、常驻内存 (VmRSS) 增量, 以及 8 个进程的合计。比较三种情况:
+    eager     启动时为每个指令动作都创建 Motion (原来的做法, 其余和 lazy 相同)
+    lazy      动作索引 + 第一次用到才创建 Motion (默认配置: 衔接和抢占都开)
+    no-chain  lazy 并且 NAO_LOCO_CHAIN=0 NAO_LOCO_PREEMPT=0 (不建衔接表)
+构造完再实际用到 FWD / TURN_L 两个动作 (一场比赛开头最常见的), 这部分单独计时。
+Robot / Motion 用 sim2d.controller 的替身 (Motion 构造时把整个文件读进内存解析), 没有 Webots 也能跑;
+真实 Webots Motion 在 C 里解析, 绝对值会更小, 但随文件个数增长的趋势相同。通信端点照常打开 (NAO_TRANSPORT)。
+
+用法:
+    python tools/bench_startup.py [--procs 8] [--cold]      (--cold: 先删掉动作索引缓存)
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+import types
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, "..")
+PLAYER_DIR = os.path.join(ROOT, "controllers", "nao_player")
+MOTION_DIR = os.path.join(PLAYER_DIR, "motions") # nao_player.MOTION_DIR
+sys.path.insert(0, os.path.join(ROOT, "controllers", "common"))
+sys.path.insert(0, PLAYER_DIR)
+
+MODES = ("eager", "lazy", "no-chain")
+FIRST_USE = ("FWD", "TURN_L")
+
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for ln in f:
+            if ln.startswith("VmRSS:"): return int(ln.split()[1])
+    return 0
+
+
+def child(mode, rid):
+    from sim2d import controller
+    controller.install(types.SimpleNamespace(time=0.0, nodes={})) # Player 只用到 getTime
+    sys.modules["controller"] = controller
+    import motion_file
+    os.chdir(PLAYER_DIR)
+    sys.argv = [sys.argv[0], rid]
+    if mode == "no-chain": os.environ.update(NAO_LOCO_CHAIN="0", NAO_LOCO_PREEMPT="0")
+    if mode == "eager":
+        class EagerMotions(motion_file.LazyMotions):
+            def __init__(self, paths, factory, setup=None):
+                super().__init__(paths, factory, setup)
+                for key in self.paths: self[key]
+        motion_file.LazyMotions = EagerMotions
+    chain_ms = [0.0]
+    from_files = motion_file.ChainTable.from_files
+    def timed_from_files(files, motion_dir):
+        t = time.perf_counter()
+        table = from_files(files, motion_dir)
+        chain_ms[0] += 1e3 * (time.perf_counter() - t)
+        return table
+    motion_file.ChainTable.from_files = timed_from_files
+    import nao_player
+
+    rss0 = rss_kb()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # 启动日志不混进结果
+        player = nao_player.NaoPlayer()
+    t1 = time.perf_counter()
+    created = player.motion.loaded()
+    for cmd in FIRST_USE: player.motion[cmd]
+    t2 = time.perf_counter()
+    print(json.dumps({"init_ms": 1e3 * (t1 - t0), "chain_ms": chain_ms[0], "first_use_ms": 1e3 * (t2 - t1),
+                      "rss_kb": rss_kb() - rss0, "created": created}))
+
+
+def run(mode, procs):
+    import protocol
+    env = dict(os.environ, PYTHONPATH=HERE)
+    t0 = time.perf_counter()
+    ps = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--child", mode,
+                            protocol.ROBOT_IDS[k % len(protocol.ROBOT_IDS)]],
+                           stdout=subprocess.PIPE, text=True, env=env) for k in range(procs)]
+    out = [json.loads(p.communicate()[0]) for p in ps]
+    return out, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=8)
+    ap.add_argument("--cold", action="store_true", help="先删除动作索引缓存 (第一次启动的情况)")
+    ap.add_argument("--child", nargs=2, metavar=("MODE", "RID"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child: return child(*args.child)
+
+    import motion_file
+    print(f"{'mode':<8} {'procs':>5} {'init ms':>15} {'chain ms':>9} {'first use ms':>13} {'Motion/proc':>12} "
+          f"{'RSS +KB/proc':>13} {'RSS +KB total':>14} {'wall s':>7}")
+    for mode in MODES:
+        if args.cold:
+            try: os.remove(os.path.join(MOTION_DIR, motion_file.INDEX_FILE))
+            except OSError: pass
+        out, wall = run(mode, args.procs)
+        init = [o["init_ms"] for o in out]
+        rss = [o["rss_kb"] for o in out]
+        print(f"{mode:<8} {len(out):5d} {sum(init) / len(init):7.1f} /{max(init):6.1f} "
+              f"{sum(o['chain_ms'] for o in out) / len(out):9.1f} "
+              f"{sum(o['first_use_ms'] for o in out) / len(out):13.1f} {out[0]['created']:12d} "
+              f"{sum(rss) / len(rss):13.0f} {sum(rss):14d} {wall:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+传输层微基准: 同一台机器上对比 udp / unix / shm 三种后端。
+
+- 吞吐: 单进程内 SUP -> B1 连续发送, 每 burst 条消息读空一次 (模拟每 tick 读空收件箱)
+- 延迟: 两个进程 ping-pong, 双方忙等 recv_all, 统计往返时间 (RTT)
+
+用法:
+    python tools/bench_transport.py [--msgs 200000] [--pings 20000] [--backends udp,unix,shm]
+"""
+import argparse
+import multiprocessing as mp
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "controllers", "common"))
+import protocol
+import transport
+
+PAYLOAD = protocol.encode_cmd(1, "B1", "FWD", 0.0)
+
+# 忙等时让出 CPU, 单核机器上也能让对端进程跑起来
+_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+
+def bench_throughput(backend, msgs, burst=8):
+    rx = transport.open_transport("B1", backend)
+    tx = transport.open_transport(transport.SUPERVISOR, backend)
+    try:
+        got = 0
+        t0 = time.perf_counter()
+        for _ in range(msgs // burst):
+            for _k in range(burst): tx.send("B1", PAYLOAD)
+            got += len(rx.recv_all())
+        dt = time.perf_counter() - t0
+    finally:
+        tx.close()
+        rx.close()
+    return got / dt, got
+
+
+def _echo(backend, n, ready):
+    link = transport.open_transport("B1", backend)
+    ready.set()
+    done = 0
+    while done < n:
+        _yield()
+        for data in link.recv_all():
+            while not link.send(transport.SUPERVISOR, data): _yield()
+            done += 1
+    link.close()
+
+
+def bench_latency(backend, pings):
+    ready = mp.Event()
+    link = transport.open_transport(transport.SUPERVISOR, backend)
+    child = mp.Process(target=_echo, args=(backend, pings, ready))
+    child.start()
+    ready.wait()
+    rtts = []
+    try:
+        for _ in range(pings):
+            t0 = time.perf_counter()
+            while not link.send("B1", PAYLOAD): _yield()
+            while not link.recv_all(): _yield()
+            rtts.append(time.perf_counter() - t0)
+    finally:
+        child.join()
+        link.close()
+    rtts.sort()
+    return statistics.median(rtts), rtts[int(len(rtts) * 0.99) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--msgs", type=int, default=200000)
+    ap.add_argument("--pings", type=int, default=20000)
+    ap.add_argument("--backends", default=",".join(transport.BACKENDS))
+    args = ap.parse_args()
+
+    print(f"{'backend':<8} {'msgs/s':>12} {'recv':>8} {'rtt p50 us':>11} {'rtt p99 us':>11}")
+    for backend in args.backends.split(","):
+        rate, got = bench_throughput(backend, args.msgs)
+        p50, p99 = bench_latency(backend, args.pings)
+        print(f"{backend:<8} {rate:12.0f} {got:8d} {p50 * 1e6:11.1f} {p99 * 1e6:11.1f}")
+
+
+if __name__ == "__main__":
+    main()
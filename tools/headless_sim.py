@@ -0,0 +1,82 @@
+"""
+无界面比赛: 用 tools/sim2d 的二维运动学球场代替 Webots, 跑未修改的 TeamSupervisor + 策略代码,
+每个机器人跑真正的 nao_player.NaoPlayer, 位移来自动作文件的运动学里程计 (sim2d/gait.py)。
+
+不受实时限制, 单核每秒一千多个 tick (约 25-50 倍实时, 看机器), 用于批量测试 / 调参。
+Supervisor 的打印默认关掉, 每场只输出比分、踢球次数、球滚过的距离、在不动的球边待得最久的机器人和速度。
+一场下来一脚球都没踢说明比赛卡住了, 比分没有意义: 打印警告, 返回 1。球边的时间长说明是策略在球边卡住了 (站着不动或原地转来转去)。
+
+用法:
+    python tools/headless_sim.py --matches 4 --match-sec 300 [--seed 0] [--fall-rate 0.01] [--motion-noise 0.1] [--verbose]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+
+from sim2d import controller, field, link
+
+sys.modules["controller"] = controller # 让 team_supervisor 的 "from controller import ..." 拿到替身
+
+
+def run_match(seed, match_sec, fall_rate=0.0, motion_noise=field.DEFAULT_MOTION_NOISE, verbose=False):
+    """跑一场, 返回 (TeamSupervisor, Field2D, 墙钟秒数)"""
+    f = field.Field2D(seed=seed, fall_rate=fall_rate, max_time=match_sec, motion_noise=motion_noise)
+    controller.install(f)
+    link.register(f)
+    os.environ["NAO_TRANSPORT"] = link.BACKEND_SIM
+    os.environ.setdefault("NAO_MINIMAP_MS", "0")
+    import team_supervisor
+
+    out = None if verbose else io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(out) if out else contextlib.nullcontext():
+        sup = team_supervisor.TeamSupervisor()
+        sup.run()
+    return sup, f, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=1)
+    ap.add_argument("--match-sec", type=float, default=300.0, help="每场仿真时长 (秒)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--fall-rate", type=float, default=0.0, help="走路时每秒摔倒的概率")
+    ap.add_argument("--motion-noise", type=float, default=field.DEFAULT_MOTION_NOISE,
+                    help="步态噪声 (位移的相对标准差), 0 = 完全确定")
+    ap.add_argument("--verbose", action="store_true", help="显示 Supervisor 的打印")
+    args = ap.parse_args()
+
+    total_ticks = 0
+    total_wall = 0.0
+    stuck = 0
+    for k in range(args.matches):
+        sup, f, wall = run_match(args.seed + k, args.match_sec, args.fall_rate,
+                                 args.motion_noise, args.verbose)
+        total_ticks += f.steps
+        total_wall += wall
+        rid = max(f.parked, key=f.parked.get)
+        print(f"match {k:3d} seed={args.seed + k}: blue {sup.score_blue} : {sup.score_red} red | "
+              f"{f.steps} ticks, {f.kicks} kicks, ball rolled {f.ball_travel:.1f} m, "
+              f"{rid} next to the still ball {f.parked[rid]:.0f}s, {f.steps / wall:.0f} ticks/s "
+              f"({f.time / wall:.0f}x real time)", flush=True)
+        if not f.kicks:
+            stuck += 1
+            print(f"WARNING: match {k} (seed {args.seed + k}) had no kicks in {f.time:.0f}s, "
+                  f"the score says nothing about the strategy", file=sys.stderr, flush=True)
+    print(f"\n{args.matches} matches, {total_ticks} ticks in {total_wall:.1f}s "
+          f"({total_ticks / total_wall:.0f} ticks/s)")
+    if stuck:
+        print(f"WARNING: {stuck} of {args.matches} matches had no kicks", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+并行比赛农场: 在同一台机器上同时跑多场无界面的 Webots 比赛, 收集每场比分。
+
+每场比赛占用一个命名空间 (NAO_NAMESPACE), 所有端口 / unix socket / shm 名字互不冲突;
+Supervisor 跑满 NAO_MATCH_SEC 仿真秒后打印 "[MATCH] ... blue=X red=Y" 并退出 Webots。
+
+用法:
+    python tools/match_farm.py --matches 16 --jobs 8 --match-sec 300
+    python tools/match_farm.py --webots /usr/local/webots/webots --env NAO_CMD_MODE=batch
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "controllers", "common"))
+import net
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+WORLD = os.path.join(ROOT, "worlds", "soccer_4v4.wbt")
+WEBOTS_FLAGS = ["--mode=fast", "--no-rendering", "--batch", "--minimize", "--stdout", "--stderr"]
+
+RESULT_RE = re.compile(r"\[MATCH\] ns=(\d+) t=([\d.]+) blue=(\d+) red=(\d+)")
+
+
+def find_webots(path=None):
+    if path: return path
+    home = os.environ.get("WEBOTS_HOME")
+    if home:
+        for rel in ("webots", os.path.join("Contents", "MacOS", "webots"), os.path.join("msys64", "mingw64", "bin", "webots.exe")):
+            cand = os.path.join(home, rel)
+            if os.path.exists(cand): return cand
+    return shutil.which("webots")
+
+
+class Match:
+    """一场正在运行的比赛 (一个 Webots 进程)"""
+
+    def __init__(self, index, ns, webots, world, match_sec, extra_env, log_dir):
+        self.index = index
+        self.ns = ns
+        self.t0 = time.perf_counter()
+        self.result = None
+        env = dict(os.environ, NAO_NAMESPACE=str(ns), NAO_MATCH_SEC=str(match_sec), NAO_MINIMAP_MS="0")
+        env.update(extra_env)
+        self.log_path = os.path.join(log_dir, f"match_{index:03d}.log")
+        self.log = open(self.log_path, "w")
+        self.proc = subprocess.Popen([webots] + WEBOTS_FLAGS + [world], env=env,
+                                     stdout=self.log, stderr=subprocess.STDOUT)
+
+    def poll(self):
+        if self.proc.poll() is None: return False
+        self.log.close()
+        self.wall = time.perf_counter() - self.t0
+        with open(self.log_path, errors="replace") as f:
+            for m in RESULT_RE.finditer(f.read()):
+                self.result = (float(m.group(2)), int(m.group(3)), int(m.group(4)))
+        return True
+
+    def kill(self):
+        if self.proc.poll() is None: self.proc.kill()
+        self.proc.wait()
+        self.log.close()
+
+
+def parse_env(items):
+    env = {}
+    for item in items:
+        k, _, v = item.partition("=")
+        env[k] = v
+    return env
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--matches", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="同时运行的比赛数")
+    ap.add_argument("--match-sec", type=float, default=300.0, help="每场比赛的仿真时长 (秒)")
+    ap.add_argument("--webots", default=None, help="webots 可执行文件 (默认 $WEBOTS_HOME 或 PATH)")
+    ap.add_argument("--world", default=WORLD)
+    ap.add_argument("--logs", default=os.path.join(ROOT, "match_logs"))
+    ap.add_argument("--env", action="append", default=[], help="传给控制器的额外环境变量 KEY=VALUE")
+    args = ap.parse_args()
+
+    webots = find_webots(args.webots)
+    if not webots:
+        sys.exit("webots not found: pass --webots or set WEBOTS_HOME")
+    jobs = max(1, min(args.jobs, args.matches, net.MAX_NAMESPACE + 1))
+    os.makedirs(args.logs, exist_ok=True)
+    extra_env = parse_env(args.env)
+
+    free_ns = list(range(jobs))
+    running, done = [], []
+    next_index = 0
+    t0 = time.perf_counter()
+    try:
+        while next_index < args.matches or running:
+            # 有空闲命名空间就开新比赛
+            while free_ns and next_index < args.matches:
+                ns = free_ns.pop(0)
+                running.append(Match(next_index, ns, webots, args.world, args.match_sec, extra_env, args.logs))
+                next_index += 1
+            for m in [m for m in running if m.poll()]:
+                running.remove(m)
+                free_ns.append(m.ns)
+                done.append(m)
+                res = f"blue {m.result[1]} : {m.result[2]} red" if m.result else f"no result (exit {m.proc.returncode}, see {m.log_path})"
+                print(f"match {m.index:3d} ns={m.ns:<2d} {m.wall:7.1f}s  {res}", flush=True)
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        for m in running: m.kill()
+        raise
+
+    scored = [m.result for m in done if m.result]
+    wall = time.perf_counter() - t0
+    print(f"\n{len(scored)}/{args.matches} matches finished in {wall:.1f}s ({jobs} parallel)")
+    if scored:
+        blue = sum(r[1] for r in scored)
+        red = sum(r[2] for r in scored)
+        wins = sum(r[1] > r[2] for r in scored)
+        losses = sum(r[1] < r[2] for r in scored)
+        sim = sum(r[0] for r in scored)
+        print(f"goals blue {blue} red {red} | blue W/D/L {wins}/{len(scored) - wins - losses}/{losses}"
+              f" | {sim / wall:.1f} sim-s per wall-s")
+
+
+if __name__ == "__main__":
+    main()
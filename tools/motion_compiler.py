@@ -0,0 +1,192 @@
+"""
+动作编译器: 从现有的 .motion 文件生成变体 (输出格式和 create_stand_file 相同, 都用 motion_file.write_motion)。
+
+每个输入文件、每个 --speed 依次:
+    1. 去掉开头 / 结尾的静止保持段 (第一帧之前的空档, 和第一帧 / 最后一帧姿态相同的连续关键帧), 只留 --hold 秒 (--no-trim 关闭);
+    2. 时间轴除以 speed (1.25 = 快 25%);
+    3. 关键帧对齐到 TIME_STEP (32 ms) 的整数倍: 每帧时间取最近的控制周期, 关节角从原轨迹 (关键帧之间线性插值) 重新采样,
+       所以对齐不会让任何一段变快; 最后一帧向后取整, 终点姿态不变;
+    4. 检查关节速度是否超过电机最大速度 (motion_file.MAX_VELOCITY): 每个关节在任意一个控制周期里要转的最大角度 / 周期
+       (不受采样相位影响, speed 越大只会越大)。起身这类动作原本就有电机跟不上的跳变,
+       所以每个关节只要求不超过 max(1, 原速播放时这个关节的值), 结果随 speed 单调。
+
+超限的变体不写出 (--force 照写), 有超限时返回 1。输出文件名: 原名_x速度百分比.motion (Forwards50_x125.motion)。
+
+用法:
+    python tools/motion_compiler.py controllers/nao_player/motions/Forwards50.motion --speed 1.1 1.25 [--out DIR]
+    python tools/motion_compiler.py controllers/nao_player/motions/GetUpFront.motion [--hold 0.096] [--dry-run]
+"""
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+import motion_file
+
+TIME_STEP = 32   # ms，和 Player 的控制周期相同
+HOLD_TOL = 1e-3  # 关节角差小于此值 (rad) 算同一个姿态
+HOLD_SEC = 0.096 # 裁剪后保持段留下的秒数 (3 个控制周期，给电机到位的时间)
+
+
+def same_pose(a, b, tol=HOLD_TOL):
+    """两帧姿态相同 (不控制的关节两边都不控制才算相同)"""
+    na, nb = np.isnan(a), np.isnan(b)
+    return bool(np.all(na == nb) and np.all(np.abs(a[~na] - b[~na]) < tol))
+
+
+def subclip(clip, idx, times):
+    return motion_file.MotionClip(clip.name, clip.joints, times, clip.values[idx],
+                                  poses=[clip.poses[i] for i in idx])
+
+
+def trim_holds(clip, hold=HOLD_SEC):
+    """开头 / 结尾的静止保持段缩短到 hold 秒，返回新 clip"""
+    v, t, n = clip.values, clip.times, len(clip.times)
+    k = 0
+    while k + 1 < n and same_pose(v[k + 1], v[0]): k += 1
+    m = n - 1
+    while m > k and same_pose(v[m - 1], v[-1]): m -= 1
+    # 开头 (包括第一帧之前的空档): 保持段的最后一帧 (k) 挪到 hold 秒，前面补上第 0 帧
+    if t[k] > hold:
+        idx, times = list(range(k, m + 1)), t[k:m + 1] - (t[k] - hold)
+        if hold > 0: idx, times = [0] + idx, np.concatenate(([0.0], times))
+    else:
+        idx, times = list(range(m + 1)), t[:m + 1]
+    # 结尾: 到达最后姿态的那一帧 (m) 之后只再保持 hold 秒
+    if m < n - 1 and hold > 0:
+        idx, times = idx + [n - 1], np.concatenate((times, [times[-1] + min(hold, t[-1] - t[m])]))
+    return subclip(clip, idx, times)
+
+
+def scale_time(clip, speed):
+    return subclip(clip, list(range(len(clip.times))), clip.times / speed)
+
+
+def sample(clip, t):
+    """
+    原轨迹在时间 t (数组) 处的关节角: 关键帧之间线性插值，动作开头 / 结尾之外保持首 / 末帧；
+    中途才开始 (或提前结束) 控制的关节，控制之外是 NaN
+    """
+    values = np.full((len(t), len(clip.joints)), np.nan)
+    for i in range(len(clip.joints)):
+        v = clip.values[:, i]
+        ok = ~np.isnan(v)
+        if not ok.any(): continue
+        tt = clip.times[ok]
+        lo = -np.inf if ok[0] else tt[0] - 1e-9
+        hi = np.inf if ok[-1] else tt[-1] + 1e-9
+        inside = (t >= lo) & (t <= hi)
+        values[inside, i] = np.interp(t[inside], tt, v[ok])
+    return values
+
+
+def collinear(a, b, mid, ta, tb, tm, tol=HOLD_TOL):
+    """a -> b 线性插值在 tm 时刻能否代替 mid 这一帧"""
+    na = np.isnan(a)
+    if not (np.array_equal(na, np.isnan(b)) and np.array_equal(na, np.isnan(mid))): return False
+    w = (tm - ta) / (tb - ta)
+    return bool(np.all(np.abs(a[~na] + w * (b[~na] - a[~na]) - mid[~na]) < tol))
+
+
+def align(clip, step=TIME_STEP / 1000.0):
+    """
+    关键帧对齐到 step 的整数倍: 先在每个控制周期采样原轨迹 (Webots 每个周期就是这样取目标角的)，
+    再去掉能由前后两帧线性插值得到的帧。最后一帧向后取整，终点姿态不变。
+    """
+    n = math.ceil(clip.times[-1] / step - 1e-9)
+    t = np.arange(n + 1) * step
+    values = sample(clip, t)
+    keep = [0]
+    for j in range(2, n + 1):
+        a = keep[-1]
+        if not all(collinear(values[a], values[j], values[m], t[a], t[j], t[m]) for m in range(a + 1, j)):
+            keep.append(j - 1)
+    if n: keep.append(n)
+    src = np.searchsorted(clip.times, t[keep] + 1e-9, side="right") - 1 # 姿态名取当时正在播的那一帧
+    return motion_file.MotionClip(clip.name, clip.joints, t[keep], values[keep],
+                                  poses=[clip.poses[max(i, 0)] for i in src])
+
+
+def compile_clip(clip, speed, trim=True, hold=HOLD_SEC):
+    out = trim_holds(clip, hold) if trim else clip
+    return align(scale_time(out, speed))
+
+
+def tick_usage(clip, speed=1.0, step=TIME_STEP / 1000.0):
+    """
+    按 speed 播放时每个关节在一个控制周期里最多要转的角度 / 周期，占电机最大速度的比例 {关节: (比例, 时间)}。
+    周期从哪一刻开始都算 (取最坏的相位)，所以 speed 越大结果只会越大，不会随采样相位忽高忽低。
+    """
+    h = step * speed # 一个控制周期在原动作时间轴上的长度
+    usage = {}
+    for i, j in enumerate(clip.joints):
+        vmax = motion_file.max_velocity(j)
+        if vmax is None: continue
+        v = clip.values[:, i]
+        ok = ~np.isnan(v)
+        t, v = clip.times[ok], v[ok]
+        if len(t) < 2: continue
+        # 分段线性轨迹在窗口里的最大落差，只可能在窗口的一端碰到关键帧时取到
+        best, at = 0.0, 0.0
+        for u in np.concatenate((t, t - h)):
+            lo, hi = max(u, t[0]), min(u + h, t[-1])
+            if hi < lo: continue
+            vals = np.concatenate((np.interp([lo, hi], t, v), v[(t >= lo) & (t <= hi)]))
+            if vals.max() - vals.min() > best: best, at = vals.max() - vals.min(), hi
+        usage[j] = (best / step / vmax, at / speed)
+    return usage
+
+
+def check_speed(clip, speed):
+    """
+    (是否超限, 比例, 关节, 时间)。每个关节和原速播放比: 不超过 max(1, 原速时这个关节的比例) 才算没超，
+    超限时返回超得最多的关节，否则返回峰值。speed 越大每个关节只会越快，所以结果随 speed 单调。
+    """
+    ref, cur = tick_usage(clip), tick_usage(clip, speed)
+    over = {j: u for j, u in cur.items() if u[0] > max(1.0, ref[j][0]) + 1e-9}
+    pick = over or cur
+    if not pick: return False, 0.0, None, 0.0
+    j = max(pick, key=lambda k: pick[k][0] / (max(1.0, ref[k][0]) if over else 1.0))
+    return bool(over), pick[j][0], j, pick[j][1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("files", nargs="+", help=".motion 文件")
+    ap.add_argument("--speed", type=float, nargs="+", default=[1.0], help="播放速度倍数，可以给多个")
+    ap.add_argument("--hold", type=float, default=HOLD_SEC, help="裁剪后开头 / 结尾保持段留下的秒数")
+    ap.add_argument("--no-trim", action="store_true", help="不裁剪静止保持段")
+    ap.add_argument("--out", help="输出目录 (默认和输入文件相同)")
+    ap.add_argument("--force", action="store_true", help="速度超限也写出")
+    ap.add_argument("--dry-run", action="store_true", help="只打印，不写文件")
+    args = ap.parse_args()
+    if any(speed <= 0 for speed in args.speed): ap.error("--speed 必须大于 0")
+
+    print(f"{'motion':<24} {'speed':>5} {'dur s':>13} {'frames':>9} {'peak vel':>9}  joint")
+    bad = 0
+    for path in args.files:
+        clip = motion_file.load_motion(path)
+        for p in clip.problems: print(f"{clip.name}: ! {p}")
+        src = clip if args.no_trim else trim_holds(clip, args.hold) # 速度检查按裁剪后、对齐前的各段
+        for speed in args.speed:
+            out = compile_clip(clip, speed, not args.no_trim, args.hold)
+            out.name = f"{clip.name}_x{int(round(speed * 100))}"
+            over, peak, joint, at = check_speed(src, speed)
+            ok = not over
+            bad += over
+            print(f"{clip.name:<24} {speed:5.2f} {clip.duration:6.3f}>{out.duration:6.3f} "
+                  f"{len(clip.times):4d}>{len(out.times):4d} {100 * peak:8.0f}%  "
+                  f"{joint or '-'} @{at:.2f}s{'' if ok else '  TOO FAST'}")
+            if args.dry_run or not (ok or args.force): continue
+            dst = os.path.join(args.out or os.path.dirname(os.path.abspath(path)), out.name + ".motion")
+            motion_file.write_motion(dst, out)
+            print(f"    -> {dst}")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
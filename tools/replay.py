@@ -0,0 +1,123 @@
+"""
+离线回放: 把录像 (NAO_RECORD 录的 .npy) 里每个 tick 的世界状态喂给当前的策略代码,
+和录像里当时发出的指令逐条对比, 不需要启动 Webots。
+
+角色用录像里记下的 (动态角色分配), 旧录像没有 role 列时用固定角色表。
+只对比录像中真正跑了策略的 (decided) 机器人; 摔倒起身 (INTERRUPT_*) 的指令不属于策略, 跳过对比
+(策略照样要跑一遍: 路径规划的增量搜索状态要和比赛时一致)。
+
+用法:
+    python tools/replay.py match_logs/*.npy [--show 20] [--strict]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import Counter
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "controllers", "team_supervisor"))
+import protocol
+import tactics
+from ball_predictor import BallPredictor
+from history import WorldHistory
+from cmd_filter import CommandFilter
+from planner import Navigator
+from recorder import NO_CMD, NO_ROLE, load_match
+from world import WorldSnapshot
+
+
+def replay(path, show=0):
+    """回放一场比赛, 返回 (tick 数, 对比次数, 各角色统计 {role: [checked, diff]}, 耗时)"""
+    rec, meta = load_match(path)
+    ids = meta["robot_ids"]
+    blue_goal, red_goal = tuple(meta["blue_goal"]), tuple(meta["red_goal"])
+    blue_slots = [s for s, rid in enumerate(ids) if rid.startswith("B")]
+    red_slots = [s for s, rid in enumerate(ids) if rid.startswith("R")]
+    teams = (
+        (blue_slots, tactics.team_roles(False), blue_goal, red_goal),
+        (red_slots, tactics.team_roles(True), red_goal, blue_goal),
+    )
+
+    world = WorldSnapshot([None] * len(ids), None)
+    # 与 Supervisor 一样每个 tick 把最终快照记入历史 (球预测、障碍物外推)
+    history = WorldHistory(len(ids))
+    ball_pred = BallPredictor(history)
+    nav = Navigator(len(ids))
+    # 指令滞回与录像时的开关一致 (旧录像没有这一项 = 关闭)；摔倒起身的打断会让它从头开始
+    cmd_filter = CommandFilter(len(ids), enabled=meta.get("cmd_filter", False))
+    has_role = "role" in rec.dtype.names
+    stats = {}
+    checked = 0
+    shown = 0
+
+    t0 = time.perf_counter()
+    for r in rec:
+        world.load_state(r["t"], r["ball"], r["pos"], r["heading"], r["z_axis"], r["valid"])
+        bx, by = world.ball_xy()
+        history.observe(world, ball_pred)
+        nav.update(world)
+        decided = r["decided"]
+        ops = r["cmd"]
+        for slots, roles, goal_own, goal_target in teams:
+            for i, slot in enumerate(slots):
+                op = int(ops[slot])
+                interrupted = op != NO_CMD and op & protocol.INTERRUPT_FLAG
+                role = roles[i]
+                if has_role and r["role"][slot] != NO_ROLE: role = tactics.ROLES[r["role"][slot]]
+                if decided[slot]:
+                    cmd = tactics.run_role(role, world, slot, bx, by, goal_own, goal_target, ball_pred,
+                                           nav.state(slot), cmd_filter.state(slot))
+                if interrupted: cmd_filter.reset(slot)
+                if not decided[slot] or op == NO_CMD or interrupted: continue
+                st = stats.setdefault(role, [0, 0])
+                st[0] += 1
+                checked += 1
+                if protocol.cmd_to_op(cmd) == op: continue
+                st[1] += 1
+                if shown < show:
+                    shown += 1
+                    print(f"  tick {int(r['tick']):6d} t={float(r['t']):8.3f} {ids[slot]} {role:<8} "
+                          f"recorded {protocol.op_to_cmd(op):<8} now {cmd}")
+    return len(rec), checked, stats, time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("recordings", nargs="+", help=".npy 录像文件 (支持通配符)")
+    ap.add_argument("--show", type=int, default=10, help="每场最多打印多少条不一致")
+    ap.add_argument("--strict", action="store_true", help="有任何不一致时返回非零退出码")
+    args = ap.parse_args()
+
+    paths = sorted({p for pat in args.recordings for p in glob.glob(pat)})
+    if not paths: sys.exit("no recordings found")
+
+    total_ticks = total_checked = total_diff = 0
+    total_sec = 0.0
+    per_role = Counter()
+    per_role_diff = Counter()
+    for path in paths:
+        ticks, checked, stats, sec = replay(path, args.show)
+        diff = sum(v[1] for v in stats.values())
+        print(f"{os.path.basename(path)}: {ticks} ticks, {checked} decisions, {diff} diffs, "
+              f"{ticks / sec if sec else 0:.0f} ticks/s")
+        total_ticks += ticks
+        total_checked += checked
+        total_diff += diff
+        total_sec += sec
+        for role, (c, d) in stats.items():
+            per_role[role] += c
+            per_role_diff[role] += d
+
+    print(f"\n{len(paths)} matches, {total_ticks} ticks in {total_sec:.2f}s "
+          f"({total_ticks / total_sec if total_sec else 0:.0f} ticks/s)")
+    for role in sorted(per_role):
+        print(f"  {role:<8} {per_role[role]:8d} decisions {per_role_diff[role]:6d} diffs")
+    print(f"  {'total':<8} {total_checked:8d} decisions {total_diff:6d} diffs")
+    if args.strict and total_diff: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
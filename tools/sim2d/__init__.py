@@ -0,0 +1,4 @@
+"""
+无界面二维替身仿真: 用 numpy / 纯 Python 代替 Webots, 直接跑未修改的 TeamSupervisor。
+入口见 tools/headless_sim.py。
+"""
@@ -0,0 +1,86 @@
+"""
+Webots `controller` 模块的替身, 只实现 TeamSupervisor 用到的接口 (外加 Player 启动基准用的 Motion)。
+使用前先 install(field), 再把本模块放进 sys.modules["controller"]。
+"""
+_field = None
+
+
+def install(field):
+    global _field
+    _field = field
+
+
+class Display:
+    """小地图替身: 所有绘图调用都是空操作"""
+
+    def __init__(self, width=300, height=200):
+        self.width, self.height = width, height
+
+    def getWidth(self): return self.width
+    def getHeight(self): return self.height
+    def imageCopy(self, x, y, w, h): return object()
+    def imagePaste(self, ir, x, y, blend=False): pass
+    def imageDelete(self, ir): pass
+
+    def __getattr__(self, name):
+        # setColor / fillRectangle / drawText ... 全部忽略
+        return lambda *args, **kwargs: None
+
+
+class Supervisor:
+    def __init__(self):
+        if _field is None: raise RuntimeError("sim2d.controller.install(field) not called")
+        self.field = _field
+        self.display = Display()
+
+    def step(self, ms):
+        return self.field.step(ms)
+
+    def getTime(self):
+        return self.field.time
+
+    def getBasicTimeStep(self):
+        return 32
+
+    def getFromDef(self, name):
+        return self.field.nodes.get(name)
+
+    def getDevice(self, name):
+        return self.display if name == "minimap" else None
+
+    def getName(self):
+        return "TEAM_SUPERVISOR"
+
+    def simulationQuit(self, status):
+        self.field.quit = True
+
+
+Robot = Supervisor
+
+
+class Motion:
+    """
+    Webots Motion 替身: 和 Webots 一样构造时把整个动作文件读进内存 (每帧一行关节角),
+    只用来衡量启动时间 / 内存, 不驱动机器人。
+    """
+
+    def __init__(self, path):
+        self.frames = []
+        self.duration_ms = 0
+        self.loop = False
+        try:
+            with open(path) as f:
+                f.readline()
+                for ln in f:
+                    cols = ln.strip().split(",")
+                    if not cols[0][:1].isdigit(): continue
+                    mm, ss, ms = cols[0].split(":")
+                    self.duration_ms = (int(mm) * 60 + int(ss)) * 1000 + int(ms)
+                    self.frames.append([float(v) if v not in ("*", "") else None for v in cols[2:]])
+        except OSError:
+            pass
+
+    def getDuration(self): return self.duration_ms
+    def setLoop(self, loop): self.loop = loop
+    def play(self): pass
+    def stop(self): pass
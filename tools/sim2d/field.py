@@ -0,0 +1,477 @@
+"""
+二维运动学球场: 8 个机器人 + 1 个球, 代替 Webots 物理引擎。
+
+- Player: 每个机器人跑真正的 nao_player.NaoPlayer (最新指令、打断、串行执行、移动保持、衔接 / 抢占、DONE/READY),
+  Robot / Motion 换成 SimRobot / SimMotion, 收发走进程内的 sim 传输 (link.py), 所以 Supervisor 和 Player 代码都不用改。
+  SimPlayer 只是在它外面加统计 (反应延迟、动作开始时间)。
+- 机器人位移: 移动动作的位移轨迹来自动作文件本身 (gait.py 按腿部关节角做正运动学的里程计: Forwards50 一次约 0.50 m,
+  小转身约 13°, 横移约 0.07 m), 按播放进度逐帧施加, 所以起步 / 收步段、衔接时从中间开始播都和动作文件一致。
+  踢球 / 起身不产生位移。时长取动作文件的最后一个关键帧 (与 Player 相同的时长表)。
+- 动作播放: SimMotion 模仿 Webots Motion (play() 在动作没播完时不重新开始, 播完了才从头播; setTime 定位),
+  多个 Motion 同时在播时由最后 play() 的那个驱动机器人。
+- 球: 匀减速滚动, 边线反弹, 球门口 (|y| < GOAL_HALF_WIDTH) 可以越过底线。
+  机器人碰球分两部分: 脚前 (身体前方 FOOT_REACH、半宽 FOOT_HALF_WIDTH 的方框) 把球沿朝向推出去, 其余部分按半径 BODY_RADIUS 的圆径向推开;
+  两个机器人从两边夹住球时球从侧面挤出去。
+"""
+import contextlib
+import io
+import math
+import os
+import re
+import sys
+
+import numpy as np
+
+import motion_file
+from sim2d import controller, gait
+from sim2d.link import SimTransport
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+sys.path.insert(0, os.path.join(ROOT, "controllers", "nao_player"))
+sys.modules.setdefault("controller", controller) # nao_player 的 "from controller import ..." 拿到替身
+import nao_player
+
+WORLD_FILE = os.path.join(ROOT, "worlds", "soccer_4v4.wbt")
+MOTION_DIR = nao_player.MOTION_DIR
+
+TIME_STEP = 32
+
+# ================= 场地 (RoboCup kid size) =================
+FIELD_HALF_LENGTH = 4.5
+FIELD_HALF_WIDTH = 3.0
+GOAL_HALF_WIDTH = 1.3
+GOAL_DEPTH = 0.6
+BORDER = 0.7              # 场外可走区域
+
+ROBOT_RADIUS = 0.15       # 机器人之间的碰撞半径
+BODY_RADIUS = 0.10        # 身体 (两条腿) 碰球的半径, 比 ROBOT_RADIUS 小: 站在球后 0.25 m 的踢球点不会碰到球
+FOOT_REACH = 0.10         # 脚尖在身体中心前方的距离
+FOOT_HALF_WIDTH = 0.10    # 两只脚并排的半宽
+SQUEEZE_SPEED = 0.3       # 球被两个机器人夹住时从侧面挤出去的速度 (m/s)
+BALL_RADIUS = 0.07
+BALL_DECEL = 0.8          # 滚动摩擦减速度 (m/s^2)
+WALL_RESTITUTION = 0.5
+PUSH_GAIN = 1.2           # 机器人推球时球获得的速度倍数
+
+# 射门: 球在脚前这个范围内, 动作播放到 KICK_AT 进度时把球踢出去
+KICK_CLIP = nao_player.MOTION_FILES["KICK_L"]
+KICK_REACH = 0.35
+KICK_HALF_WIDTH = 0.15
+KICK_SPEED = 3.0
+KICK_AT = 0.4
+
+# 步态噪声: 每次播放的位移按 (1 + N(0, noise)) 缩放, 再加上横向 / 转角漂移 (真实步态不会每次都一样)
+DEFAULT_MOTION_NOISE = 0.1
+DRIFT_SIDE = 0.3          # 横向漂移 = noise * DRIFT_SIDE * |前进量|
+DRIFT_TURN = 0.05         # 转角漂移 (rad) = noise * DRIFT_TURN, 每次播放
+DRIFT_STEP = 0.3          # 原地动作 (转身等) 挪脚带来的位置漂移 (m) = noise * DRIFT_STEP, 前后左右各一份
+INPLACE_DIST = 0.05       # 整段位移小于此值 (m) 的移动动作算原地动作
+
+PARK_DIST = 0.5           # 球没动而机器人在这个距离以内的时间记作 "在球边耗着" (站着不动或原地转来转去), 策略卡住时会很长
+
+FALL_PITCH = 1.4          # 摔倒后的俯仰角 (rad), Z 轴分量 cos(1.4) ~ 0.17 < 0.6
+MAX_ACTION_SEC = 6.0      # 与 NaoPlayer.max_action_sec 相同: 读不到动作文件时的时长
+
+LOCO_CMDS = nao_player.LOCO_CMDS
+# 产生位移的动作文件 (移动指令用的那些); 起身 / 踢球时机器人原地不动
+LOCO_CLIPS = {nao_player.MOTION_FILES[cmd] for cmd in LOCO_CMDS}
+
+ROBOT_DEFS = {"BLUE1": "B1", "BLUE2": "B2", "BLUE3": "B3", "BLUE4": "B4",
+              "RED1": "R1", "RED2": "R2", "RED3": "R3", "RED4": "R4"}
+
+_tracks = {}
+
+
+def clip_track(name):
+    """动作文件 name 的位移轨迹 (times, x, y, heading), 只有 LOCO_CLIPS 有; 每个进程只算一次"""
+    if name not in _tracks:
+        try:
+            _tracks[name] = gait.odometry(motion_file.load_motion(os.path.join(MOTION_DIR, name + ".motion")))
+        except (OSError, ValueError, IndexError):
+            _tracks[name] = None
+    return _tracks[name]
+
+
+def axis_angle_heading(ax, ay, az, angle):
+    """Webots rotation (轴角) -> 绕 Z 的朝向角"""
+    n = math.sqrt(ax * ax + ay * ay + az * az) or 1.0
+    ax, ay, az = ax / n, ay / n, az / n
+    c, s = math.cos(angle), math.sin(angle)
+    r00 = c + ax * ax * (1 - c)
+    r10 = ay * ax * (1 - c) + az * s
+    return math.atan2(r10, r00)
+
+
+def read_world(path=WORLD_FILE):
+    """从 .wbt 里读出 DEF 节点的初始 (x, y, heading)"""
+    with open(path) as f: text = f.read()
+    out = {}
+    for m in re.finditer(r"DEF (\w+) \w+ \{(.*?)\n\}", text, re.S):
+        body = m.group(2)
+        t = re.search(r"^  translation (\S+) (\S+) (\S+)", body, re.M)
+        r = re.search(r"^  rotation (\S+) (\S+) (\S+) (\S+)", body, re.M)
+        x, y = (float(t.group(1)), float(t.group(2))) if t else (0.0, 0.0)
+        h = axis_angle_heading(*map(float, r.groups())) if r else 0.0
+        out[m.group(1)] = (x, y, h)
+    return out
+
+
+class TranslationField:
+    """Webots Field 替身, 只支持 translation"""
+
+    def __init__(self, body):
+        self.body = body
+
+    def setSFVec3f(self, v):
+        self.body.x, self.body.y = float(v[0]), float(v[1])
+
+    def getSFVec3f(self):
+        return [self.body.x, self.body.y, self.body.z]
+
+
+class SimBody:
+    """球场上的一个物体 (机器人 / 球 / 球门标记), 实现 Webots Node 的相关接口"""
+
+    def __init__(self, x, y, heading=0.0, z=0.0):
+        self.x, self.y, self.heading, self.z = x, y, heading, z
+        self.pitch = 0.0
+        self.vx = self.vy = 0.0
+
+    def getPosition(self):
+        return [self.x, self.y, self.z]
+
+    def getOrientation(self):
+        # Rz(heading) * Ry(pitch), 行优先 3x3
+        ch, sh = math.cos(self.heading), math.sin(self.heading)
+        cp, sp = math.cos(self.pitch), math.sin(self.pitch)
+        return [ch * cp, -sh, ch * sp,
+                sh * cp, ch, sh * sp,
+                -sp, 0.0, cp]
+
+    def getField(self, name):
+        return TranslationField(self) if name == "translation" else None
+
+    def resetPhysics(self):
+        self.vx = self.vy = 0.0
+
+
+class SimMotion:
+    """
+    Webots Motion 替身: 播放进度 + 位移轨迹 (track 为 None 时不产生位移)。
+    play() 和 Webots 一样: 正在播就继续，播完了才从头开始。
+    """
+
+    def __init__(self, robot, name, duration, track=None):
+        self.robot = robot
+        self.name = name
+        self.duration = duration
+        self.track = track
+        self.elapsed = 0.0
+        self.playing = False
+
+    def play(self):
+        if self.elapsed >= self.duration: self.elapsed = 0.0
+        self.playing = True
+        self.robot.on_play(self)
+
+    def stop(self):
+        self.playing = False
+
+    def getTime(self):
+        return int(round(self.elapsed * 1000))
+
+    def setTime(self, ms):
+        self.elapsed = min(max(0.0, ms / 1000.0), self.duration)
+
+    def getDuration(self):
+        return int(round(self.duration * 1000))
+
+    def setLoop(self, loop):
+        pass
+
+    def pose_at(self, t):
+        times, x, y, h = self.track
+        return np.interp(t, times, x), np.interp(t, times, y), np.interp(t, times, h)
+
+    def step(self, dt):
+        """播放 dt 秒，返回 (开始时刻, 结束时刻); 没在播返回 None"""
+        if not self.playing: return None
+        a = self.elapsed
+        self.elapsed = min(a + dt, self.duration)
+        if self.elapsed >= self.duration: self.playing = False
+        return a, self.elapsed
+
+
+class SimRobot:
+    """一个 Player 的 Webots Robot 替身: 时间取球场时钟, 它创建的 SimMotion 驱动球场上的 body"""
+
+    def __init__(self, rid, body, field):
+        self.rid = rid
+        self.body = body
+        self.field = field
+        self.active = None           # 最后 play() 的动作 (不衔接时 Player 的动作结束后它可能还在播)
+        self.noise = np.zeros(7)     # 这次播放的步态噪声
+        self.kicked = False
+        self.fallen = False
+
+    def getTime(self):
+        return self.field.time
+
+    def getName(self):
+        return self.rid
+
+    def make_motion(self, path):
+        """NaoPlayer 的 Motion 工厂"""
+        name = os.path.splitext(os.path.basename(path))[0]
+        duration = self.field.durations.get(name, MAX_ACTION_SEC)
+        return SimMotion(self, name, duration, clip_track(name) if name in LOCO_CLIPS else None)
+
+    def on_play(self, m):
+        if m.elapsed == 0.0: self.kicked = False
+        self.active = m
+        sigma = self.field.motion_noise
+        self.noise = self.field.rng.standard_normal(7) * sigma if sigma else np.zeros(7)
+
+    def advance(self, dt):
+        """按当前动作的播放进度移动机器人, 返回本步位移 (dx, dy) (世界坐标)"""
+        b = self.body
+        m = self.active
+        span = m.step(dt) if m is not None else None
+        if span is None: return 0.0, 0.0
+        if m.name.startswith("GetUp") and not m.playing: self.fallen = False; b.pitch = 0.0
+        if self.fallen: return 0.0, 0.0
+        t0, t1 = span
+        if m.name == KICK_CLIP and not self.kicked and t1 >= KICK_AT * m.duration:
+            self.kicked = True
+            self.field.try_kick(b)
+        if m.track is None: return 0.0, 0.0
+
+        # 轨迹在 t0 -> t1 之间的位移, 换到 t0 时刻的机器人坐标系
+        x0, y0, h0 = m.pose_at(t0)
+        x1, y1, h1 = m.pose_at(t1)
+        c0, s0 = math.cos(h0), math.sin(h0)
+        fx = c0 * (x1 - x0) + s0 * (y1 - y0)
+        fy = -s0 * (x1 - x0) + c0 * (y1 - y0)
+        fth = h1 - h0
+        n = self.noise
+        frac = (t1 - t0) / m.duration if m.duration > 0 else 0.0
+        step = DRIFT_STEP * frac if math.hypot(m.track[1][-1], m.track[2][-1]) < INPLACE_DIST else 0.0
+        fx, fy, fth = (fx * (1 + n[0]) + n[5] * step,
+                       fy * (1 + n[1]) + n[2] * DRIFT_SIDE * abs(fx) + n[6] * step,
+                       fth * (1 + n[3]) + n[4] * DRIFT_TURN * frac)
+
+        c, s = math.cos(b.heading), math.sin(b.heading)
+        dx = fx * c - fy * s
+        dy = fx * s + fy * c
+        b.x += dx
+        b.y += dy
+        b.heading = (b.heading + fth + math.pi) % (2 * math.pi) - math.pi
+
+        # 走路时随机摔倒
+        rate = self.field.fall_rate
+        if rate and self.field.rng.random() < rate * dt:
+            self.fallen = True
+            b.pitch = FALL_PITCH
+        return dx, dy
+
+
+class SimPlayer(nao_player.NaoPlayer):
+    """球场上的一个 nao_player.NaoPlayer, 外加反应延迟 / 动作开始时间的统计"""
+
+    def __init__(self, rid, body, field):
+        self.body = body
+        self.field = field
+        self.sim_robot = SimRobot(rid, body, field)
+        self.waiting = None          # (指令, 收到的时间): 收到了但还没开始执行的新指令
+        self.last_recv = None
+        self.latencies = []          # 每条新指令 (指令, 从收到到开始执行的秒数)
+        self.action_start = 0.0
+        with contextlib.redirect_stdout(io.StringIO()): # 启动日志不打印
+            super().__init__(rid, self.sim_robot, self.sim_robot.make_motion, SimTransport(rid, field))
+        # 衔接 / 抢占按球场的设置 (默认取环境变量, 和 Player 一样)
+        self.chain, self.preempt = field.chain, field.preempt
+        if self.chain_table is None and (self.chain or self.preempt): self.chain_table = field.chain_table()
+
+    def poll_cmd(self):
+        msg = super().poll_cmd()
+        cmd = (msg.get("cmd") or "STOP") if msg else None
+        if cmd and not cmd.startswith("INTERRUPT_"):
+            # 反应延迟只统计换了的指令 (保活重发不算)，已经在执行的指令不用等
+            if cmd == self.current_action: self.waiting = None
+            elif cmd != self.last_recv: self.waiting = (cmd, self.field.time)
+            self.last_recv = cmd
+        return msg
+
+    def interrupt_action(self, cmd):
+        self.waiting = self.last_recv = None
+        super().interrupt_action(cmd)
+
+    def start_action(self, cmd, at=0.0):
+        now = self.field.time
+        if self.waiting is not None and self.waiting[0] == cmd:
+            self.latencies.append((cmd, now - self.waiting[1]))
+            self.waiting = None
+        self.action_start = now
+        super().start_action(cmd, at)
+
+
+class Field2D:
+    def __init__(self, seed=0, fall_rate=0.0, max_time=None, motion_noise=DEFAULT_MOTION_NOISE,
+                 world_path=WORLD_FILE, chain=None, preempt=None, robots=None):
+        """robots: 只放这些机器人 ID 上场 (默认 world 文件里的全部 8 个)"""
+        self.rng = np.random.default_rng(seed)
+        self.fall_rate = fall_rate
+        self.motion_noise = motion_noise
+        self.max_time = max_time
+        self.steps = 0
+        self.time = 0.0
+        self.quit = False
+        self.durations = motion_file.duration_table(MOTION_DIR) # 动作名 -> 秒, 和 Player 的时长表同源
+        self.chain = motion_file.chain_enabled() if chain is None else chain
+        self.preempt = motion_file.preempt_mode() if preempt is None else preempt
+        self._chain_table = None
+        self.inboxes = {}        # 传输端点名 -> 收到的数据报
+
+        init = read_world(world_path)
+        self.nodes = {}
+        self.players = []
+        for name, (x, y, h) in init.items():
+            if name in ROBOT_DEFS:
+                body = SimBody(x, y, h, z=0.33)
+                if robots is None or ROBOT_DEFS[name] in robots:
+                    self.players.append(SimPlayer(ROBOT_DEFS[name], body, self))
+            else:
+                body = SimBody(x, y, h)
+            self.nodes[name] = body
+        self.ball = self.nodes.setdefault("BALL", SimBody(0.0, 0.0, z=BALL_RADIUS))
+        self.by_rid = {p.rid: p for p in self.players}
+        self.kicks = 0
+        self.ball_travel = 0.0   # 球一共滚 / 被推了多远 (m)
+        self.parked = {p.rid: 0.0 for p in self.players} # 每个机器人在不动的球边 (PARK_DIST 以内) 的秒数
+
+    def chain_table(self):
+        """衔接表 (球场的衔接 / 抢占设置和环境变量不同时给 Player 用), 所有 Player 共用一份"""
+        if self._chain_table is None:
+            self._chain_table = motion_file.ChainTable.from_files(
+                {cmd: nao_player.MOTION_FILES[cmd] for cmd in LOCO_CMDS}, MOTION_DIR)
+        return self._chain_table
+
+    def deliver(self, name, data):
+        """发给传输端点 name (机器人 ID 或 transport.SUPERVISOR)"""
+        self.inboxes.setdefault(name, []).append(data)
+
+    def take(self, name):
+        """取走端点 name 收到的全部数据报"""
+        return self.inboxes.pop(name, [])
+
+    def try_kick(self, body):
+        """球在脚前的踢球区内就踢出去"""
+        c, s = math.cos(body.heading), math.sin(body.heading)
+        rx, ry = self.ball.x - body.x, self.ball.y - body.y
+        fwd = rx * c + ry * s
+        side = -rx * s + ry * c
+        if 0.0 < fwd < KICK_REACH and abs(side) < KICK_HALF_WIDTH:
+            self.ball.vx = KICK_SPEED * c
+            self.ball.vy = KICK_SPEED * s
+            self.kicks += 1
+
+    def step(self, ms):
+        """推进 ms 毫秒: 机器人动作 -> 碰撞 -> 球 -> 各 Player 的控制循环。结束时返回 -1"""
+        if self.quit or (self.max_time is not None and self.time >= self.max_time): return -1
+        dt = ms / 1000.0
+        x0, y0 = self.ball.x, self.ball.y
+        moves = [p.sim_robot.advance(dt) for p in self.players]
+        self.collide(moves, dt)
+        self.roll_ball(dt)
+        self.ball_travel += math.hypot(self.ball.x - x0, self.ball.y - y0)
+        if self.ball.x == x0 and self.ball.y == y0:
+            for p in self.players:
+                if math.hypot(p.body.x - x0, p.body.y - y0) < PARK_DIST: self.parked[p.rid] += dt
+        self.steps += 1
+        self.time = self.steps * ms / 1000.0
+        for p in self.players: p.control_step()
+        return 0
+
+    def collide(self, moves, dt):
+        """机器人之间互相推开; 机器人碰到球把球推走 (脚前沿朝向, 其余径向), 两边夹住的球从侧面挤出去"""
+        bodies = [p.body for p in self.players]
+        n = len(bodies)
+        for i in range(n):
+            a = bodies[i]
+            for j in range(i + 1, n):
+                b = bodies[j]
+                dx, dy = b.x - a.x, b.y - a.y
+                d = math.hypot(dx, dy)
+                if 1e-9 < d < 2 * ROBOT_RADIUS:
+                    push = (2 * ROBOT_RADIUS - d) / 2 / d
+                    a.x -= dx * push; a.y -= dy * push
+                    b.x += dx * push; b.y += dy * push
+            a.x = max(-FIELD_HALF_LENGTH - BORDER, min(FIELD_HALF_LENGTH + BORDER, a.x))
+            a.y = max(-FIELD_HALF_WIDTH - BORDER, min(FIELD_HALF_WIDTH + BORDER, a.y))
+
+        ball = self.ball
+        touching = [body for body, move in zip(bodies, moves) if self.push_ball(body, move, dt)]
+        if len(touching) >= 2:
+            # 夹住了: 沿两个机器人连线的垂直方向挤出去, 往球已经偏的那一边
+            a, b = touching[0], touching[1]
+            dx, dy = b.x - a.x, b.y - a.y
+            d = math.hypot(dx, dy) or 1.0
+            nx, ny = -dy / d, dx / d
+            side = (ball.x - a.x) * nx + (ball.y - a.y) * ny
+            if side < 0 or (side == 0 and self.rng.random() < 0.5): nx, ny = -nx, -ny
+            v_ball = ball.vx * nx + ball.vy * ny
+            if v_ball < SQUEEZE_SPEED:
+                ball.vx += (SQUEEZE_SPEED - v_ball) * nx
+                ball.vy += (SQUEEZE_SPEED - v_ball) * ny
+
+    def push_ball(self, body, move, dt):
+        """一个机器人碰球: 把球挪到接触面外面, 球沿推的方向至少获得机器人的推进速度 (乘 PUSH_GAIN)。碰到了返回 True"""
+        ball = self.ball
+        mx, my = move
+        c, s = math.cos(body.heading), math.sin(body.heading)
+        rx, ry = ball.x - body.x, ball.y - body.y
+        fwd = rx * c + ry * s
+        side = -rx * s + ry * c
+        front = FOOT_REACH + BALL_RADIUS
+        if 0.0 < fwd < front and abs(side) < FOOT_HALF_WIDTH:
+            # 脚前: 沿朝向推
+            ball.x += (front - fwd) * c
+            ball.y += (front - fwd) * s
+            nx, ny = c, s
+        else:
+            d = math.hypot(rx, ry)
+            reach = BODY_RADIUS + BALL_RADIUS
+            if d >= reach or d < 1e-9: return False
+            nx, ny = rx / d, ry / d
+            ball.x = body.x + nx * reach
+            ball.y = body.y + ny * reach
+        v_push = (mx * nx + my * ny) / dt * PUSH_GAIN
+        v_ball = ball.vx * nx + ball.vy * ny
+        if v_push > v_ball:
+            ball.vx += (v_push - v_ball) * nx
+            ball.vy += (v_push - v_ball) * ny
+        return True
+
+    def roll_ball(self, dt):
+        b = self.ball
+        speed = math.hypot(b.vx, b.vy)
+        if speed > 0.0:
+            k = max(0.0, speed - BALL_DECEL * dt) / speed
+            b.vx *= k; b.vy *= k
+        b.x += b.vx * dt
+        b.y += b.vy * dt
+
+        lim_y = FIELD_HALF_WIDTH - BALL_RADIUS
+        if abs(b.y) > lim_y:
+            b.y = math.copysign(lim_y, b.y)
+            b.vy = -b.vy * WALL_RESTITUTION
+        lim_x = FIELD_HALF_LENGTH - BALL_RADIUS
+        if abs(b.x) > lim_x:
+            if abs(b.y) < GOAL_HALF_WIDTH - BALL_RADIUS:
+                # 进了球门, 停在网里 (Supervisor 会发现 |x| > 4.5 并重置)
+                if abs(b.x) > FIELD_HALF_LENGTH + GOAL_DEPTH:
+                    b.x = math.copysign(FIELD_HALF_LENGTH + GOAL_DEPTH, b.x)
+                    b.vx = b.vy = 0.0
+            else:
+                b.x = math.copysign(lim_x, b.x)
+                b.vx = -b.vx * WALL_RESTITUTION
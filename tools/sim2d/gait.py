@@ -0,0 +1,95 @@
+"""
+动作文件的运动学里程计: 按腿部关节角做正运动学, 算出播放动作时躯干在地面上的位移轨迹。
+
+每一帧取较低的那只脚作为支撑脚 (贴地不滑动), 躯干的位移就是支撑脚在躯干坐标系里位移的反方向,
+转角取支撑脚绕竖直轴的转角变化。腿长等尺寸来自 defendertest/utils/kinematics_constants.py (Kofinas 的 NAO 运动学)。
+假设躯干保持竖直、脚不打滑, 所以是动作本身 "应该" 走出的位移; 和动作文件名对得上
+(Forwards50 约 0.50 m, TurnLeft40 / 60 约 40° / 59°)。
+
+用法:
+    python tools/sim2d/gait.py controllers/nao_player/motions/*.motion
+"""
+import math
+import os
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "controllers", "common"))
+sys.path.insert(0, os.path.join(HERE, "..", "..", "controllers", "defendertest", "utils"))
+import kinematics_constants as kc
+import motion_file
+
+LEG_JOINTS = ("HipYawPitch", "HipRoll", "HipPitch", "KneePitch", "AnklePitch", "AnkleRoll")
+
+
+def rotation(axis, angle):
+    """绕单位化的 axis 转 angle 的旋转矩阵"""
+    x, y, z = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+    c, s = math.cos(angle), math.sin(angle)
+    C = 1.0 - c
+    return np.array([[c + x * x * C, x * y * C - z * s, x * z * C + y * s],
+                     [y * x * C + z * s, c + y * y * C, y * z * C - x * s],
+                     [z * x * C - y * s, z * y * C + x * s, c + z * z * C]])
+
+
+def foot_pose(angles, left):
+    """腿部 6 个关节角 (LEG_JOINTS 顺序) -> 脚底在躯干坐标系里的位置 (m) 和朝向 (3x3)"""
+    yaw_pitch, roll, pitch, knee, ankle_pitch, ankle_roll = angles
+    side = 1.0 if left else -1.0
+    R = rotation((0.0, 1.0, -side), yaw_pitch) @ rotation((1, 0, 0), roll) @ rotation((0, 1, 0), pitch)
+    p = np.array([0.0, side * kc.HipOffsetY, -kc.HipOffsetZ]) + R @ (0.0, 0.0, -kc.ThighLength)
+    R = R @ rotation((0, 1, 0), knee)
+    p = p + R @ (0.0, 0.0, -kc.TibiaLength)
+    R = R @ rotation((0, 1, 0), ankle_pitch) @ rotation((1, 0, 0), ankle_roll)
+    p = p + R @ (0.0, 0.0, -kc.FootHeight)
+    return p / 1000.0, R
+
+
+def odometry(clip):
+    """
+    每个关键帧时躯干相对第 0 帧的位移 (times, x, y, heading): 动作开始时的机器人坐标系, 前 x 左 y, 逆时针为正。
+    没有腿部关节的动作 (踢球以外的上身动作等) 位移全是 0; 某一帧不控制的关节沿用上一帧的值 (一开始按 0)。
+    """
+    n = len(clip.times)
+    out = np.zeros((n, 3))
+    cols = {s: [clip.col.get(s + j) for j in LEG_JOINTS] for s in "LR"}
+    if all(c is None for c in cols["L"] + cols["R"]): return clip.times.copy(), out[:, 0], out[:, 1], out[:, 2]
+    cur = {s: [0.0] * len(LEG_JOINTS) for s in "LR"}
+    prev = None
+    x = y = h = 0.0
+    for i in range(n):
+        feet = {}
+        for s in "LR":
+            for k, c in enumerate(cols[s]):
+                if c is not None and not np.isnan(clip.values[i, c]): cur[s][k] = clip.values[i, c]
+            feet[s] = foot_pose(cur[s], s == "L")
+        if prev is not None:
+            # 支撑脚: 这两帧里较低的那只 (z 更小)
+            s = "L" if min(feet["L"][0][2], prev["L"][0][2]) < min(feet["R"][0][2], prev["R"][0][2]) else "R"
+            (p0, R0), (p1, R1) = prev[s], feet[s]
+            dx, dy = p0[0] - p1[0], p0[1] - p1[1]
+            c, sn = math.cos(h), math.sin(h)
+            x += c * dx - sn * dy
+            y += sn * dx + c * dy
+            h += math.atan2(R0[1, 0], R0[0, 0]) - math.atan2(R1[1, 0], R1[0, 0])
+        prev = feet
+        out[i] = x, y, h
+    return clip.times.copy(), out[:, 0], out[:, 1], out[:, 2]
+
+
+def main(paths):
+    print(f"{'motion':<20} {'dur s':>6} {'dx m':>7} {'dy m':>7} {'dth deg':>8}")
+    for path in paths:
+        try:
+            clip = motion_file.load_motion(path)
+        except (OSError, ValueError) as e:
+            print(f"{os.path.basename(path)}: {e}")
+            continue
+        _t, x, y, h = odometry(clip)
+        print(f"{clip.name:<20} {clip.duration:6.2f} {x[-1]:7.3f} {y[-1]:7.3f} {math.degrees(h[-1]):8.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,25 @@
+"""
+进程内 "sim" 传输后端: 每个端点 (Supervisor / 各 Player) 在 Field2D 里有一个收件箱,
+send 直接放进对方的收件箱, recv_all 取走自己的。
+"""
+import transport
+
+BACKEND_SIM = "sim"
+
+
+class SimTransport(transport.Transport):
+    def __init__(self, name, field):
+        super().__init__(name)
+        self.field = field
+
+    def send(self, dest, data):
+        self.field.deliver(dest, data)
+        return True
+
+    def recv_all(self):
+        return self.field.take(self.name)
+
+
+def register(field):
+    """把 sim 后端注册到 transport, 之后 open_transport(backend="sim") 都连到这个 field"""
+    transport.register_backend(BACKEND_SIM, lambda name, batch=False: SimTransport(name, field))